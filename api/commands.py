@@ -16,7 +16,10 @@ from langchain.embeddings import OpenAIEmbeddings
 from werkzeug.exceptions import NotFound
 
 from core.embedding.cached_embedding import CacheEmbedding
+from core.helper import encrypter
+from core.index.full_text_index.full_text_index import FullTextIndex
 from core.index.index import IndexBuilder
+from core.index.keyword_table_index.keyword_table_index import KeywordTableIndex
 from core.model_providers.model_factory import ModelFactory
 from core.model_providers.models.embedding.openai_embedding import OpenAIEmbedding
 from core.model_providers.models.entity.model_params import ModelType
@@ -27,7 +30,7 @@ from libs.helper import email as email_validate
 from extensions.ext_database import db
 from libs.rsa import generate_key_pair
 from models.account import InvitationCode, Tenant, TenantAccountJoin
-from models.dataset import Dataset, DatasetQuery, Document, DatasetCollectionBinding
+from models.dataset import Dataset, DatasetQuery, Document, DatasetCollectionBinding, DatasetKeywordTable
 from models.model import Account, AppModelConfig, App, MessageAnnotation, Message
 import secrets
 import base64
@@ -117,6 +120,8 @@ def reset_encrypt_key_pair():
     db.session.query(ProviderModel).delete()
     db.session.commit()
 
+    encrypter.invalidate_decrypted_tokens(tenant.id)
+
     click.echo(click.style('Congratulations! '
                            'the asymmetric key pair of workspace {} has been reset.'.format(tenant.id), fg='green'))
 
@@ -776,6 +781,76 @@ def add_annotation_question_field_value():
                 click.style(f'Congratulations! add annotation question value successful. Deal count {message_annotation_deal_count}', fg='green'))
 
 
+@click.command('convert-dataset-keyword-tables', help='Convert legacy dataset keyword tables into keyword postings.')
+def convert_dataset_keyword_tables():
+    click.echo(click.style('Start convert dataset keyword tables.', fg='green'))
+    convert_count = 0
+    posting_count = 0
+
+    while True:
+        dataset_ids = db.session.query(DatasetKeywordTable.dataset_id).distinct().limit(50).all()
+        if not dataset_ids:
+            break
+
+        for dataset_id, in dataset_ids:
+            dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
+            if not dataset:
+                # dataset already removed, drop the orphan keyword table
+                db.session.query(DatasetKeywordTable).filter(DatasetKeywordTable.dataset_id == dataset_id).delete()
+                db.session.commit()
+                continue
+
+            try:
+                click.echo('Converting dataset keyword table: {}'.format(dataset.id))
+                posting_count += KeywordTableIndex(dataset).migrate_legacy_keyword_table()
+                convert_count += 1
+            except Exception as e:
+                db.session.rollback()
+                click.echo(
+                    click.style('Convert dataset keyword table error: {} {}'.format(e.__class__.__name__, str(e)),
+                                fg='red'))
+                return
+
+    click.echo(click.style('Congratulations! Converted {} dataset keyword tables into {} postings.'
+                           .format(convert_count, posting_count), fg='green'))
+
+
+@click.command('build-dataset-full-text-indexes', help='Build the bm25 full-text indexes of existing qdrant datasets.')
+def build_dataset_full_text_indexes():
+    click.echo(click.style('Start build dataset full-text indexes.', fg='green'))
+    build_count = 0
+    segment_count = 0
+
+    page = 1
+    while True:
+        try:
+            datasets = db.session.query(Dataset).filter(Dataset.indexing_technique == 'high_quality') \
+                .order_by(Dataset.created_at.desc()).paginate(page=page, per_page=50)
+        except NotFound:
+            break
+
+        page += 1
+        for dataset in datasets:
+            vector_type = dataset.index_struct_dict['type'] if dataset.index_struct_dict \
+                else current_app.config.get('VECTOR_STORE')
+            if vector_type != 'qdrant':
+                continue
+
+            try:
+                click.echo('Building dataset full-text index: {}'.format(dataset.id))
+                segment_count += FullTextIndex(dataset).build()
+                build_count += 1
+            except Exception as e:
+                db.session.rollback()
+                click.echo(
+                    click.style('Build dataset full-text index error: {} {}'.format(e.__class__.__name__, str(e)),
+                                fg='red'))
+                continue
+
+    click.echo(click.style('Congratulations! Built {} dataset full-text indexes with {} segments.'
+                           .format(build_count, segment_count), fg='green'))
+
+
 def register_commands(app):
     app.cli.add_command(reset_password)
     app.cli.add_command(reset_email)
@@ -791,3 +866,5 @@ def register_commands(app):
     app.cli.add_command(migrate_default_input_to_dataset_query_variable)
     app.cli.add_command(add_qdrant_full_text_index)
     app.cli.add_command(add_annotation_question_field_value)
+    app.cli.add_command(convert_dataset_keyword_tables)
+    app.cli.add_command(build_dataset_full_text_indexes)
@@ -27,6 +27,7 @@ DEFAULTS = {
     'FILES_URL': '',
     'STORAGE_TYPE': 'local',
     'STORAGE_LOCAL_PATH': 'storage',
+    'S3_MAX_POOL_CONNECTIONS': 50,
     'CHECK_UPDATE_URL': 'https://updates.dify.ai',
     'DEPLOY_ENV': 'PRODUCTION',
     'SQLALCHEMY_POOL_SIZE': 30,
@@ -53,8 +54,28 @@ DEFAULTS = {
     'UPLOAD_FILE_BATCH_LIMIT': 5,
     'UPLOAD_IMAGE_FILE_SIZE_LIMIT': 10,
     'OUTPUT_MODERATION_BUFFER_SIZE': 300,
+    'OUTPUT_MODERATION_MAX_WORKERS': 20,
+    'OUTPUT_MODERATION_TENANT_MAX_CONCURRENCY': 4,
     'MULTIMODAL_SEND_IMAGE_FORMAT': 'base64',
-    'INVITE_EXPIRY_HOURS': 72
+    'INVITE_EXPIRY_HOURS': 72,
+    'EMBEDDING_CACHE_LRU_SIZE': 0,
+    'TOKENIZER_CACHE_LRU_SIZE': 10000,
+    'APP_MODEL_CONFIG_CACHE_SIZE': 1000,
+    'PUB_TEXT_FLUSH_INTERVAL': 20,
+    'PUB_TEXT_FLUSH_SIZE': 32,
+    'PUB_STOPPED_CHECK_INTERVAL': 200,
+    'GENERATE_TASK_MAX_WORKERS': 200,
+    'GENERATE_TASK_MAX_QUEUE_SIZE': 200,
+    'GENERATE_TASK_QUEUE_TIMEOUT': 30,
+    'INDEXING_MAX_WORKERS': 4,
+    'EXTRACTION_CACHE_MAX_SIZE': 1024,
+    'DATASET_RETRIEVAL_MAX_WORKERS': 32,
+    'DATASET_RETRIEVAL_TIMEOUT': 10,
+    'DATASET_RETRIEVAL_REQUEST_TIMEOUT': 30,
+    'DATASET_RETRIEVAL_EARLY_CUTOFF_SCORE': 0,
+    'NOTION_FETCH_MAX_WORKERS': 4,
+    'NOTION_RATE_LIMIT': 3,
+    'NOTION_BLOCK_CACHE_TTL': 604800,
 }
 
 
@@ -184,6 +205,7 @@ class Config:
         self.S3_ACCESS_KEY = get_env('S3_ACCESS_KEY')
         self.S3_SECRET_KEY = get_env('S3_SECRET_KEY')
         self.S3_REGION = get_env('S3_REGION')
+        self.S3_MAX_POOL_CONNECTIONS = int(get_env('S3_MAX_POOL_CONNECTIONS'))
 
         # ------------------------
         # Vector Store Configurations.
@@ -237,6 +259,30 @@ class Config:
         # Dataset Configurations.
         self.CLEAN_DAY_SETTING = get_env('CLEAN_DAY_SETTING')
 
+        # max number of document chunks embedded and upserted to the vector store concurrently while indexing
+        self.INDEXING_MAX_WORKERS = int(get_env('INDEXING_MAX_WORKERS'))
+
+        # max total size in MB of the extracted documents cached in storage by file content hash, 0 to disable
+        self.EXTRACTION_CACHE_MAX_SIZE = int(get_env('EXTRACTION_CACHE_MAX_SIZE'))
+
+        # shared pool used to retrieve from the datasets of a multi dataset retriever concurrently
+        self.DATASET_RETRIEVAL_MAX_WORKERS = int(get_env('DATASET_RETRIEVAL_MAX_WORKERS'))
+        # seconds a dataset of a multi dataset retrieval may run, queue wait excluded, slower ones are skipped
+        self.DATASET_RETRIEVAL_TIMEOUT = float(get_env('DATASET_RETRIEVAL_TIMEOUT'))
+        # seconds a multi dataset retrieval waits for all its datasets, queue wait included
+        self.DATASET_RETRIEVAL_REQUEST_TIMEOUT = float(get_env('DATASET_RETRIEVAL_REQUEST_TIMEOUT'))
+        # stop waiting for slower datasets once top_k hits reach this score, 0 to disable
+        self.DATASET_RETRIEVAL_EARLY_CUTOFF_SCORE = float(get_env('DATASET_RETRIEVAL_EARLY_CUTOFF_SCORE'))
+
+        # max number of embeddings kept in the process-local LRU in front of the embeddings table, 0 to disable
+        self.EMBEDDING_CACHE_LRU_SIZE = int(get_env('EMBEDDING_CACHE_LRU_SIZE'))
+
+        # max number of token counts kept in the process-local LRU of the tokenizers, 0 to disable
+        self.TOKENIZER_CACHE_LRU_SIZE = int(get_env('TOKENIZER_CACHE_LRU_SIZE'))
+
+        # max number of parsed app model configs kept per process, 0 to parse them on every request
+        self.APP_MODEL_CONFIG_CACHE_SIZE = int(get_env('APP_MODEL_CONFIG_CACHE_SIZE'))
+
         # File upload Configurations.
         self.UPLOAD_FILE_SIZE_LIMIT = int(get_env('UPLOAD_FILE_SIZE_LIMIT'))
         self.UPLOAD_FILE_BATCH_LIMIT = int(get_env('UPLOAD_FILE_BATCH_LIMIT'))
@@ -244,6 +290,24 @@ class Config:
 
         # Moderation in app Configurations.
         self.OUTPUT_MODERATION_BUFFER_SIZE = int(get_env('OUTPUT_MODERATION_BUFFER_SIZE'))
+        # max number of threads moderating the streaming outputs of the process
+        self.OUTPUT_MODERATION_MAX_WORKERS = int(get_env('OUTPUT_MODERATION_MAX_WORKERS'))
+        # max number of output moderations of a workspace running at a time
+        self.OUTPUT_MODERATION_TENANT_MAX_CONCURRENCY = int(get_env('OUTPUT_MODERATION_TENANT_MAX_CONCURRENCY'))
+
+        # Streaming publish Configurations.
+        # LLM tokens are coalesced into one redis message per flush interval (ms) or flush size (tokens),
+        # the stop flag of a task is refreshed from redis every stopped check interval (ms).
+        self.PUB_TEXT_FLUSH_INTERVAL = int(get_env('PUB_TEXT_FLUSH_INTERVAL'))
+        self.PUB_TEXT_FLUSH_SIZE = int(get_env('PUB_TEXT_FLUSH_SIZE'))
+        self.PUB_STOPPED_CHECK_INTERVAL = int(get_env('PUB_STOPPED_CHECK_INTERVAL'))
+
+        # Generate task Configurations.
+        # max concurrent generate workers per process, max tasks waiting for a worker,
+        # and how long (s) a request waits for a queue slot before it is rejected.
+        self.GENERATE_TASK_MAX_WORKERS = int(get_env('GENERATE_TASK_MAX_WORKERS'))
+        self.GENERATE_TASK_MAX_QUEUE_SIZE = int(get_env('GENERATE_TASK_MAX_QUEUE_SIZE'))
+        self.GENERATE_TASK_QUEUE_TIMEOUT = float(get_env('GENERATE_TASK_QUEUE_TIMEOUT'))
 
         # Notion integration setting
         self.NOTION_CLIENT_ID = get_env('NOTION_CLIENT_ID')
@@ -251,6 +315,12 @@ class Config:
         self.NOTION_INTEGRATION_TYPE = get_env('NOTION_INTEGRATION_TYPE')
         self.NOTION_INTERNAL_SECRET = get_env('NOTION_INTERNAL_SECRET')
         self.NOTION_INTEGRATION_TOKEN = get_env('NOTION_INTEGRATION_TOKEN')
+        # max concurrent block requests of a notion import
+        self.NOTION_FETCH_MAX_WORKERS = int(get_env('NOTION_FETCH_MAX_WORKERS'))
+        # average requests per second per notion integration, notion allows 3
+        self.NOTION_RATE_LIMIT = float(get_env('NOTION_RATE_LIMIT'))
+        # seconds the block trees of unchanged notion pages are cached for syncs, 0 to disable
+        self.NOTION_BLOCK_CACHE_TTL = int(get_env('NOTION_BLOCK_CACHE_TTL'))
 
         # ------------------------
         # Platform Configurations.
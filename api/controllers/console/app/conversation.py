@@ -94,6 +94,9 @@ class CompletionConversationApi(Resource):
             error_out=False
         )
 
+        Conversation.prefetch(conversations.items, 'annotation', 'user_feedback_stats', 'admin_feedback_stats',
+                              'first_message')
+
         return conversations
 
 
@@ -216,6 +219,9 @@ class ChatConversationApi(Resource):
             error_out=False
         )
 
+        Conversation.prefetch(conversations.items, 'annotated', 'message_count', 'user_feedback_stats',
+                              'admin_feedback_stats', 'first_message')
+
         return conversations
 
 
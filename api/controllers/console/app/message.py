@@ -91,6 +91,7 @@ class ChatMessageListApi(Resource):
                 has_more = True
 
         history_messages = list(reversed(history_messages))
+        Message.prefetch(history_messages, 'feedbacks', 'annotation')
 
         return InfiniteScrollPagination(
             data=history_messages,
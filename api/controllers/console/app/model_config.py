@@ -10,8 +10,6 @@ from controllers.console.setup import setup_required
 from controllers.console.wraps import account_initialization_required
 from libs.login import login_required
 from events.app_event import app_model_config_was_updated
-from extensions.ext_database import db
-from models.model import AppModelConfig
 from services.app_model_config_service import AppModelConfigService
 
 
@@ -34,16 +32,7 @@ class ModelConfigResource(Resource):
             mode=app.mode
         )
 
-        new_app_model_config = AppModelConfig(
-            app_id=app.id,
-        )
-        new_app_model_config = new_app_model_config.from_model_config_dict(model_configuration)
-
-        db.session.add(new_app_model_config)
-        db.session.flush()
-
-        app.app_model_config_id = new_app_model_config.id
-        db.session.commit()
+        new_app_model_config = AppModelConfigService.update_app_model_config(app, model_configuration)
 
         app_model_config_was_updated.send(
             app,
@@ -163,6 +163,7 @@ class DatasetDocumentListApi(Resource):
         paginated_documents = query.paginate(
             page=page, per_page=limit, max_per_page=100, error_out=False)
         documents = paginated_documents.items
+        Document.prefetch(documents, 'hit_count')
         if fetch:
             for document in documents:
                 completed_segments = DocumentSegment.query.filter(DocumentSegment.completed_at.isnot(None),
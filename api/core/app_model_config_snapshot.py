@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from flask import current_app
+
+from extensions.ext_redis import redis_client
+
+# parsed attributes of AppModelConfig held by a snapshot
+SNAPSHOT_ATTRIBUTES = [
+    'model_dict',
+    'suggested_questions_list',
+    'suggested_questions_after_answer_dict',
+    'speech_to_text_dict',
+    'retriever_resource_dict',
+    'annotation_reply_dict',
+    'more_like_this_dict',
+    'sensitive_word_avoidance_dict',
+    'external_data_tools_list',
+    'user_input_form_list',
+    'agent_mode_dict',
+    'chat_prompt_config_dict',
+    'completion_prompt_config_dict',
+    'dataset_configs_dict',
+    'file_upload_dict',
+]
+
+# json columns a snapshot is parsed from, an in-memory change of one of them needs a new snapshot
+SOURCE_COLUMNS = [
+    'model', 'suggested_questions', 'suggested_questions_after_answer', 'speech_to_text', 'retriever_resource',
+    'more_like_this', 'sensitive_word_avoidance', 'external_data_tools', 'user_input_form', 'agent_mode',
+    'chat_prompt_config', 'completion_prompt_config', 'dataset_configs', 'file_upload',
+]
+
+
+class FrozenDict(dict):
+    """dict that raises on modification, copies of it are plain dicts."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('app model config snapshot is read-only, use the *_dict properties of AppModelConfig '
+                        'to get a copy that can be modified')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return dict, (thaw(self),)
+
+
+class FrozenList(list):
+    """list that raises on modification, copies of it are plain lists."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('app model config snapshot is read-only, use the *_list properties of AppModelConfig '
+                        'to get a copy that can be modified')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return list, (thaw(self),)
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    elif isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    elif isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+class AppModelConfigSnapshot:
+    """
+    Parsed, read-only app model config.
+
+    Holds the values of the *_dict / *_list properties of AppModelConfig, parsed once per config version
+    instead of on every access. Dicts and lists of a snapshot raise on modification.
+    """
+    __slots__ = SNAPSHOT_ATTRIBUTES
+
+    def __init__(self, values: dict):
+        for name in SNAPSHOT_ATTRIBUTES:
+            object.__setattr__(self, name, freeze(values[name]))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('app model config snapshot is read-only')
+
+    @classmethod
+    def from_model_config(cls, app_model_config) -> 'AppModelConfigSnapshot':
+        return cls({name: getattr(app_model_config, name) for name in SNAPSHOT_ATTRIBUTES})
+
+    def to_dict(self) -> dict:
+        return {name: thaw(getattr(self, name)) for name in SNAPSHOT_ATTRIBUTES}
+
+
+class AppModelConfigSnapshotCache:
+    """
+    Snapshots of app model configs, keyed by (app_model_config_id, sha256 of the json columns),
+    in a process-local TTL cache in front of a redis hash per app.
+
+    The key only depends on the columns, so copies of a config (see `AppModelConfig.copy`) share its snapshot.
+    annotation_reply_dict comes from the annotation setting of the app, the setting changes call `invalidate`,
+    other processes see the change once their local entry expires after LOCAL_TTL seconds.
+    Configs without an id get a snapshot of their own.
+    """
+    LOCAL_TTL = 60
+    REDIS_TTL = 86400
+    REDIS_KEY = 'app_model_config_snapshot:{app_id}'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local: Optional[TTLCache] = None
+
+    def get(self, app_model_config) -> AppModelConfigSnapshot:
+        # memoized on the instance, until one of its json columns is assigned
+        source = tuple(getattr(app_model_config, column) for column in SOURCE_COLUMNS)
+        memo = app_model_config.__dict__.get('_snapshot')
+        if memo is not None and memo[0] == source:
+            return memo[1]
+
+        snapshot = self._get_shared(app_model_config, source)
+        app_model_config.__dict__['_snapshot'] = (source, snapshot)
+        return snapshot
+
+    def _get_shared(self, app_model_config, source: tuple) -> AppModelConfigSnapshot:
+        if not app_model_config.id or not app_model_config.app_id:
+            return AppModelConfigSnapshot.from_model_config(app_model_config)
+
+        local = self._get_local()
+        if local is None:
+            return AppModelConfigSnapshot.from_model_config(app_model_config)
+
+        digest = hashlib.sha256(json.dumps(source).encode()).hexdigest()
+        field = f'{app_model_config.id}:{digest}'
+        local_key = (app_model_config.app_id, field)
+        snapshot = local.get(local_key)
+        if snapshot is not None:
+            return snapshot
+
+        redis_key = self.REDIS_KEY.format(app_id=app_model_config.app_id)
+        snapshot = self._load(redis_key, field)
+        if snapshot is None:
+            snapshot = AppModelConfigSnapshot.from_model_config(app_model_config)
+            self._save(redis_key, field, snapshot)
+
+        with self._lock:
+            local[local_key] = snapshot
+
+        return snapshot
+
+    def invalidate(self, app_id: str):
+        """Drop the snapshots of the app, called when its config or annotation setting changes."""
+        try:
+            redis_client.delete(self.REDIS_KEY.format(app_id=app_id))
+        except Exception:
+            logging.exception(f"Failed to invalidate app model config snapshots of app {app_id}")
+
+        if self._local is not None:
+            with self._lock:
+                for local_key in [key for key in self._local.keys() if key[0] == app_id]:
+                    self._local.pop(local_key, None)
+
+    def _get_local(self) -> Optional[TTLCache]:
+        if self._local is None:
+            max_size = int(current_app.config.get('APP_MODEL_CONFIG_CACHE_SIZE') or 0)
+            if max_size <= 0:
+                return None
+
+            with self._lock:
+                if self._local is None:
+                    self._local = TTLCache(maxsize=max_size, ttl=self.LOCAL_TTL)
+
+        return self._local
+
+    @staticmethod
+    def _load(redis_key: str, field: str) -> Optional[AppModelConfigSnapshot]:
+        try:
+            data = redis_client.hget(redis_key, field)
+            return AppModelConfigSnapshot(json.loads(data)) if data else None
+        except Exception:
+            logging.exception(f"Failed to load app model config snapshot {field}")
+            return None
+
+    def _save(self, redis_key: str, field: str, snapshot: AppModelConfigSnapshot):
+        try:
+            pipeline = redis_client.pipeline()
+            pipeline.hset(redis_key, field, json.dumps(snapshot.to_dict()))
+            pipeline.expire(redis_key, self.REDIS_TTL)
+            pipeline.execute()
+        except Exception:
+            logging.exception(f"Failed to save app model config snapshot {field}")
+
+
+app_model_config_snapshot_cache = AppModelConfigSnapshotCache()
@@ -1,9 +1,8 @@
+import json
 import logging
-import threading
-import time
 from typing import Any, Dict, List, Union, Optional
 
-from flask import Flask, current_app
+from flask import current_app
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.schema import LLMResult, BaseMessage
 from pydantic import BaseModel
@@ -14,8 +13,9 @@ from core.conversation_message_task import ConversationMessageTask, Conversation
 from core.model_providers.models.entity.message import to_prompt_messages, PromptMessage, LCHumanMessageWithFiles, \
     ImagePromptMessageFile
 from core.model_providers.models.llm.base import BaseLLM
-from core.moderation.base import ModerationOutputsResult, ModerationAction
+from core.moderation.base import ModerationOutputsResult, ModerationAction, ModerationOutputsStream
 from core.moderation.factory import ModerationFactory
+from core.moderation.output_moderation_scheduler import get_output_moderation_scheduler
 
 
 class ModerationRule(BaseModel):
@@ -38,7 +38,7 @@ class LLMCallbackHandler(BaseCallbackHandler):
 
     def init_output_moderation(self):
         app_model_config = self.conversation_message_task.app_model_config
-        sensitive_word_avoidance_dict = app_model_config.sensitive_word_avoidance_dict
+        sensitive_word_avoidance_dict = app_model_config.snapshot.sensitive_word_avoidance_dict
 
         if sensitive_word_avoidance_dict and sensitive_word_avoidance_dict.get("enabled"):
             self.output_moderation_handler = OutputModerationHandler(
@@ -96,7 +96,7 @@ class LLMCallbackHandler(BaseCallbackHandler):
 
     def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
         if self.output_moderation_handler:
-            self.output_moderation_handler.stop_thread()
+            self.output_moderation_handler.stop()
 
             self.llm_message.completion = self.output_moderation_handler.moderation_completion(
                 completion=response.generations[0][0].text,
@@ -124,18 +124,19 @@ class LLMCallbackHandler(BaseCallbackHandler):
         self.conversation_message_task.save_message(self.llm_message)
 
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        if self.output_moderation_handler and self.output_moderation_handler.should_direct_output():
-            # stop subscribe new token when output moderation should direct output
-            ex = ConversationTaskInterruptException()
-            self.on_llm_error(error=ex)
-            raise ex
+        if self.output_moderation_handler:
+            # streaming moderations review the token before it is published
+            self.output_moderation_handler.append_new_token(token)
+
+            if self.output_moderation_handler.should_direct_output():
+                # stop subscribe new token when output moderation should direct output
+                ex = ConversationTaskInterruptException()
+                self.on_llm_error(error=ex)
+                raise ex
 
         try:
             self.conversation_message_task.append_message_text(token)
             self.llm_message.completion += token
-
-            if self.output_moderation_handler:
-                self.output_moderation_handler.append_new_token(token)
         except ConversationTaskStoppedException as ex:
             self.on_llm_error(error=ex)
             raise ex
@@ -145,7 +146,7 @@ class LLMCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Do nothing."""
         if self.output_moderation_handler:
-            self.output_moderation_handler.stop_thread()
+            self.output_moderation_handler.stop()
 
         if isinstance(error, ConversationTaskStoppedException):
             if self.conversation_message_task.streaming:
@@ -164,18 +165,18 @@ class LLMCallbackHandler(BaseCallbackHandler):
 
 
 class OutputModerationHandler(BaseModel):
-    DEFAULT_BUFFER_SIZE: int = 300
-
     tenant_id: str
     app_id: str
 
     rule: ModerationRule
     on_message_replace_func: Any
 
-    thread: Optional[threading.Thread] = None
-    thread_running: bool = True
+    running: bool = True
+    started: bool = False
+    outputs_stream: Optional[ModerationOutputsStream] = None
+    batch_key: Optional[str] = None
     buffer: str = ''
-    is_final_chunk: bool = False
+    moderated_length: int = 0
     final_output: Optional[str] = None
 
     class Config:
@@ -190,12 +191,66 @@ class OutputModerationHandler(BaseModel):
     def append_new_token(self, token: str):
         self.buffer += token
 
-        if not self.thread:
-            self.thread = self.start_thread()
+        if not self.started:
+            self.started = True
+            self.outputs_stream = self.moderation_stream(tenant_id=self.tenant_id, app_id=self.app_id)
+            if not self.outputs_stream:
+                self.batch_key = self.moderation_batch_key()
+
+        if self.outputs_stream:
+            if self.final_output is None:
+                self.stream_moderation(token)
+            return
+
+        # the moderation only reviews whole texts, review the buffer on the shared scheduler as it grows
+        scheduler = get_output_moderation_scheduler(current_app._get_current_object())
+        if self.should_moderate(scheduler.buffer_size):
+            scheduler.submit(self)
+
+    def should_moderate(self, buffer_size: int) -> bool:
+        return self.running and self.final_output is None and len(self.buffer) - self.moderated_length >= buffer_size
+
+    def get_batch_key(self) -> Optional[str]:
+        """
+        Outputs with the same batch key can be reviewed in one batch request, None if the moderation has no batches.
+        """
+        return self.batch_key
+
+    def stream_moderation(self, token: str):
+        try:
+            result = self.outputs_stream.append(token)
+        except Exception as e:
+            logging.error("Moderation Output error: %s", e)
+            return
+
+        if not result.flagged:
+            return
+
+        if result.action == ModerationAction.DIRECT_OUTPUT:
+            final_output = result.preset_response
+            self.final_output = final_output
+        else:
+            final_output = result.text
+
+        # trigger replace event
+        self.on_message_replace_func(final_output)
+
+    def on_moderation_result(self, moderation_buffer: str, result: Optional[ModerationOutputsResult]):
+        if not result or not result.flagged:
+            return
+
+        if result.action == ModerationAction.DIRECT_OUTPUT:
+            final_output = result.preset_response
+            self.final_output = final_output
+        else:
+            final_output = result.text + self.buffer[len(moderation_buffer):]
+
+        # trigger replace event
+        if self.running:
+            self.on_message_replace_func(final_output)
 
     def moderation_completion(self, completion: str, public_event: bool = False) -> str:
         self.buffer = completion
-        self.is_final_chunk = True
 
         result = self.moderation(
             tenant_id=self.tenant_id,
@@ -216,58 +271,42 @@ class OutputModerationHandler(BaseModel):
 
         return final_output
 
-    def start_thread(self) -> threading.Thread:
-        buffer_size = int(current_app.config.get('MODERATION_BUFFER_SIZE', self.DEFAULT_BUFFER_SIZE))
-        thread = threading.Thread(target=self.worker, kwargs={
-            'flask_app': current_app._get_current_object(),
-            'buffer_size': buffer_size if buffer_size > 0 else self.DEFAULT_BUFFER_SIZE
-        })
-
-        thread.start()
-
-        return thread
-
-    def stop_thread(self):
-        if self.thread and self.thread.is_alive():
-            self.thread_running = False
-
-    def worker(self, flask_app: Flask, buffer_size: int):
-        with flask_app.app_context():
-            current_length = 0
-            while self.thread_running:
-                moderation_buffer = self.buffer
-                buffer_length = len(moderation_buffer)
-                if not self.is_final_chunk:
-                    chunk_length = buffer_length - current_length
-                    if 0 <= chunk_length < buffer_size:
-                        time.sleep(1)
-                        continue
-
-                current_length = buffer_length
-
-                result = self.moderation(
-                    tenant_id=self.tenant_id,
-                    app_id=self.app_id,
-                    moderation_buffer=moderation_buffer
-                )
+    def stop(self):
+        self.running = False
+
+    def moderation(self, tenant_id: str, app_id: str, moderation_buffer: str) -> Optional[ModerationOutputsResult]:
+        try:
+            moderation_factory = ModerationFactory(
+                name=self.rule.type,
+                app_id=app_id,
+                tenant_id=tenant_id,
+                config=self.rule.config
+            )
 
-                if not result or not result.flagged:
-                    continue
+            result: ModerationOutputsResult = moderation_factory.moderation_for_outputs(moderation_buffer)
+            return result
+        except Exception as e:
+            logging.error("Moderation Output error: %s", e)
 
-                if result.action == ModerationAction.DIRECT_OUTPUT:
-                    final_output = result.preset_response
-                    self.final_output = final_output
-                else:
-                    final_output = result.text + self.buffer[len(moderation_buffer):]
+        return None
 
-                # trigger replace event
-                if self.thread_running:
-                    self.on_message_replace_func(final_output)
+    def moderation_batch(self, tenant_id: str, app_id: str,
+                         moderation_buffers: List[str]) -> List[Optional[ModerationOutputsResult]]:
+        try:
+            moderation_factory = ModerationFactory(
+                name=self.rule.type,
+                app_id=app_id,
+                tenant_id=tenant_id,
+                config=self.rule.config
+            )
 
-                if result.action == ModerationAction.DIRECT_OUTPUT:
-                    break
+            return moderation_factory.moderation_for_outputs_batch(moderation_buffers)
+        except Exception as e:
+            logging.error("Moderation Output error: %s", e)
 
-    def moderation(self, tenant_id: str, app_id: str, moderation_buffer: str) -> Optional[ModerationOutputsResult]:
+        return [None] * len(moderation_buffers)
+
+    def moderation_stream(self, tenant_id: str, app_id: str) -> Optional[ModerationOutputsStream]:
         try:
             moderation_factory = ModerationFactory(
                 name=self.rule.type,
@@ -276,9 +315,18 @@ class OutputModerationHandler(BaseModel):
                 config=self.rule.config
             )
 
-            result: ModerationOutputsResult = moderation_factory.moderation_for_outputs(moderation_buffer)
-            return result
+            return moderation_factory.moderation_for_outputs_stream()
         except Exception as e:
             logging.error("Moderation Output error: %s", e)
 
         return None
+
+    def moderation_batch_key(self) -> Optional[str]:
+        try:
+            if not ModerationFactory.is_outputs_batch_supported(self.rule.type):
+                return None
+        except Exception as e:
+            logging.error("Moderation Output error: %s", e)
+            return None
+
+        return f"{self.tenant_id}:{self.rule.type}:{json.dumps(self.rule.config, sort_keys=True)}"
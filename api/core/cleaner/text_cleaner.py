@@ -0,0 +1,74 @@
+import re
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from langchain.schema import Document
+
+INVALID_SYMBOL_PATTERN = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F\x80-\xFF]')
+EXTRA_NEWLINES_PATTERN = re.compile(r'\n{3,}')
+EXTRA_SPACES_PATTERN = re.compile(r'[\t\f\r\x20\u00a0\u1680\u180e\u2000-\u200a\u202f\u205f\u3000]{2,}')
+EMAIL_PATTERN = re.compile(r'([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)')
+URL_PATTERN = re.compile(r'https?://[^\s]+')
+
+
+def filter_string(text: str) -> str:
+    """
+    Remove invalid symbols from extracted text.
+    """
+    # the substring checks are cheap compared to a regex scan and skip passes that cannot match
+    if '<|' in text:
+        text = text.replace('<|', '<')
+    if '|>' in text:
+        text = text.replace('|>', '>')
+    return INVALID_SYMBOL_PATTERN.sub('', text)
+
+
+class TextCleaner:
+    """
+    Cleans document text according to the pre-processing rules of a process rule.
+
+    The rules are resolved once when the cleaner is built, so one cleaner can be reused
+    for every page of every document indexed with the same process rule.
+    """
+
+    def __init__(self, rules: Optional[dict]):
+        # enabled pre-processing steps, applied in the order the rules are listed
+        self._steps: List[Callable[[str], str]] = []
+
+        pre_processing_rules = rules.get('pre_processing_rules', []) if rules else []
+        for pre_processing_rule in pre_processing_rules:
+            if pre_processing_rule["id"] == "remove_extra_spaces" and pre_processing_rule["enabled"] is True:
+                self._steps.append(self._remove_extra_spaces)
+            elif pre_processing_rule["id"] == "remove_urls_emails" and pre_processing_rule["enabled"] is True:
+                self._steps.append(self._remove_urls_emails)
+
+    def clean(self, text: str) -> str:
+        """
+        Clean the document text according to the processing rules.
+        """
+        for step in self._steps:
+            text = step(text)
+
+        return text
+
+    @staticmethod
+    def _remove_extra_spaces(text: str) -> str:
+        if '\n\n\n' in text:
+            text = EXTRA_NEWLINES_PATTERN.sub('\n\n', text)
+        return EXTRA_SPACES_PATTERN.sub(' ', text)
+
+    @staticmethod
+    def _remove_urls_emails(text: str) -> str:
+        # every email and URL contains the checked substring, so skipping the scan never changes the result
+        if '@' in text:
+            text = EMAIL_PATTERN.sub('', text)
+        if 'http' in text:
+            text = URL_PATTERN.sub('', text)
+        return text
+
+    def clean_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Clean documents page by page as they are consumed.
+        """
+        for document in documents:
+            document.page_content = self.clean(document.page_content)
+            yield document
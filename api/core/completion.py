@@ -58,7 +58,7 @@ class Completion:
 
         final_model_instance = ModelFactory.get_text_generation_model_from_model_config(
             tenant_id=app.tenant_id,
-            model_config=app_model_config.model_dict,
+            model_config=app_model_config.snapshot.model_dict,
             streaming=streaming
         )
 
@@ -119,7 +119,7 @@ class Completion:
             if annotation_reply:
                 return
             # fill in variable inputs from external data tools if exists
-            external_data_tools = app_model_config.external_data_tools_list
+            external_data_tools = app_model_config.snapshot.external_data_tools_list
             if external_data_tools:
                 inputs = cls.fill_in_inputs_from_external_data_tools(
                     tenant_id=app.tenant_id,
@@ -179,13 +179,13 @@ class Completion:
     @classmethod
     def moderation_for_inputs(cls, app_id: str, tenant_id: str, app_model_config: AppModelConfig, inputs: dict,
                               query: str):
-        if not app_model_config.sensitive_word_avoidance_dict['enabled']:
+        if not app_model_config.snapshot.sensitive_word_avoidance_dict['enabled']:
             return inputs, query
 
-        type = app_model_config.sensitive_word_avoidance_dict['type']
+        type = app_model_config.snapshot.sensitive_word_avoidance_dict['type']
 
         moderation = ModerationFactory(type, app_id, tenant_id,
-                                       app_model_config.sensitive_word_avoidance_dict['config'])
+                                       app_model_config.snapshot.sensitive_word_avoidance_dict['config'])
         moderation_result = moderation.moderation_for_inputs(inputs, query)
 
         if not moderation_result.flagged:
@@ -307,7 +307,7 @@ class Completion:
                 model_instance=model_instance
             )
 
-            model_config = app_model_config.model_dict
+            model_config = app_model_config.snapshot.model_dict
             completion_params = model_config.get("completion_params", {})
             stop_words = completion_params.get("stop", [])
 
@@ -339,7 +339,7 @@ class Completion:
         """Get memory messages."""
         app_model_config = conversation_message_task.app_model_config
         app = conversation_message_task.app
-        annotation_reply = app_model_config.annotation_reply_dict
+        annotation_reply = app_model_config.snapshot.annotation_reply_dict
         if annotation_reply['enabled']:
             score_threshold = annotation_reply.get('score_threshold', 1)
             embedding_provider_name = annotation_reply['embedding_model']['embedding_provider_name']
@@ -410,7 +410,7 @@ class Completion:
         # only for calc token in memory
         memory_model_instance = ModelFactory.get_text_generation_model_from_model_config(
             tenant_id=tenant_id,
-            model_config=app_model_config.model_dict
+            model_config=app_model_config.snapshot.model_dict
         )
 
         # use llm config from conversation
@@ -1,7 +1,15 @@
+import heapq
+import itertools
 import json
+import logging
+import os
+import threading
 import time
+import weakref
 from typing import Optional, Union, List
 
+from flask import current_app
+
 from core.callback_handler.entity.agent_loop import AgentLoop
 from core.callback_handler.entity.dataset_query import DatasetQueryObj
 from core.callback_handler.entity.llm_message import LLMMessage
@@ -50,7 +58,7 @@ class ConversationMessageTask:
         self.retriever_resource = None
         self.auto_generate_name = auto_generate_name
 
-        self.model_dict = self.app_model_config.model_dict
+        self.model_dict = self.app_model_config.snapshot.model_dict
         self.provider_name = self.model_dict.get('provider')
         self.model_name = self.model_dict.get('name')
         self.mode = app.mode
@@ -140,7 +148,7 @@ class ConversationMessageTask:
             from_source=('console' if isinstance(self.user, Account) else 'api'),
             from_end_user_id=(self.user.id if isinstance(self.user, EndUser) else None),
             from_account_id=(self.user.id if isinstance(self.user, Account) else None),
-            agent_based=self.app_model_config.agent_mode_dict.get('enabled'),
+            agent_based=self.app_model_config.snapshot.agent_mode_dict.get('enabled'),
         )
 
         db.session.add(self.message)
@@ -324,7 +332,60 @@ class ConversationMessageTask:
         self._pub_handler.pub_end()
 
 
+class _TextFlushScheduler:
+    """
+    Flushes the text buffers of all the PubHandlers of the process at their deadline, from a single thread.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # heap of (deadline, seq, handler, generation)
+        self._deadlines = []
+        self._seq = itertools.count()
+        self._thread = None
+        self._pid = None
+
+    def schedule(self, deadline: float, handler: 'PubHandler', generation: int):
+        with self._condition:
+            if self._thread is None or self._pid != os.getpid():
+                # started lazily, so every forked worker process gets its own thread
+                self._deadlines = []
+                self._thread = threading.Thread(target=self._run, name='pub_text_flusher', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+            heapq.heappush(self._deadlines, (deadline, next(self._seq), handler, generation))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._deadlines:
+                    self._condition.wait()
+
+                deadline, _, handler, generation = self._deadlines[0]
+                wait_time = deadline - time.perf_counter()
+                if wait_time > 0:
+                    self._condition.wait(wait_time)
+                    continue
+
+                heapq.heappop(self._deadlines)
+
+            handler.flush_text_on_deadline(generation)
+
+
+_text_flush_scheduler = _TextFlushScheduler()
+
+
 class PubHandler:
+    DEFAULT_TEXT_FLUSH_INTERVAL = 20
+    DEFAULT_TEXT_FLUSH_SIZE = 32
+    DEFAULT_STOPPED_CHECK_INTERVAL = 200
+
+    # handlers of the running tasks by channel, so pub_error can publish their pending text first
+    _handlers = weakref.WeakValueDictionary()
+    _handlers_lock = threading.Lock()
+
     def __init__(self, user: Union[Account, EndUser], task_id: str,
                  message: Message, conversation: Conversation,
                  chain_pub: bool = False, agent_thought_pub: bool = False):
@@ -337,6 +398,34 @@ class PubHandler:
         self._chain_pub = chain_pub
         self._agent_thought_pub = agent_thought_pub
 
+        # text tokens are coalesced and published once the buffer is text_flush_interval (ms) old,
+        # by the flush scheduler of the process, or holds text_flush_size tokens
+        self._text_flush_interval = int(current_app.config.get(
+            'PUB_TEXT_FLUSH_INTERVAL', self.DEFAULT_TEXT_FLUSH_INTERVAL)) / 1000
+        self._text_flush_size = int(current_app.config.get('PUB_TEXT_FLUSH_SIZE', self.DEFAULT_TEXT_FLUSH_SIZE))
+        self._text_buffer = []
+        self._text_buffer_started_at = None
+        # incremented by every flush, a scheduled deadline only flushes the buffer it was scheduled for
+        self._text_generation = 0
+        self._text_closed = False
+        self._text_lock = threading.RLock()
+        # read once, the flush timer must not load attributes of the models outside the session
+        self._message_id = str(message.id)
+        self._conversation_id = str(conversation.id)
+        self._conversation_mode = conversation.mode
+
+        # the stopped flag is cached locally and refreshed from redis every stopped_check_interval (ms)
+        self._stopped_check_interval = int(current_app.config.get(
+            'PUB_STOPPED_CHECK_INTERVAL', self.DEFAULT_STOPPED_CHECK_INTERVAL)) / 1000
+        self._stopped = False
+        self._stopped_checked_at = None
+
+        self.flush_count = 0
+        self.published_bytes = 0
+
+        with PubHandler._handlers_lock:
+            PubHandler._handlers[self._channel] = self
+
     @classmethod
     def generate_channel_name(cls, user: Union[Account, EndUser], task_id: str):
         if not user:
@@ -351,23 +440,71 @@ class PubHandler:
         return "generate_result_stopped:{}-{}".format(user_str, task_id)
 
     def pub_text(self, text: str):
-        content = {
-            'event': 'message',
-            'data': {
-                'task_id': self._task_id,
-                'message_id': str(self._message.id),
-                'text': text,
-                'mode': self._conversation.mode,
-                'conversation_id': str(self._conversation.id)
-            }
-        }
-
-        redis_client.publish(self._channel, json.dumps(content))
+        with self._text_lock:
+            now = time.perf_counter()
+            buffer_started = not self._text_buffer
+            if buffer_started:
+                self._text_buffer_started_at = now
+
+            self._text_buffer.append(text)
+
+            # the first chunk is always flushed immediately to keep time-to-first-token unchanged
+            if self.flush_count == 0 \
+                    or len(self._text_buffer) >= self._text_flush_size \
+                    or now - self._text_buffer_started_at >= self._text_flush_interval:
+                self.flush_text()
+            elif buffer_started:
+                # flush at the deadline even if no further token arrives before it
+                _text_flush_scheduler.schedule(
+                    self._text_buffer_started_at + self._text_flush_interval, self, self._text_generation
+                )
 
         if self._is_stopped():
             self.pub_end()
             raise ConversationTaskStoppedException()
 
+    def flush_text(self):
+        with self._text_lock:
+            if not self._text_buffer:
+                return
+
+            content = {
+                'event': 'message',
+                'data': {
+                    'task_id': self._task_id,
+                    'message_id': self._message_id,
+                    'text': ''.join(self._text_buffer),
+                    'mode': self._conversation_mode,
+                    'conversation_id': self._conversation_id
+                }
+            }
+
+            self._text_buffer = []
+            self._text_buffer_started_at = None
+            self._text_generation += 1
+
+            self._publish(content)
+            self.flush_count += 1
+
+    def flush_text_on_deadline(self, generation: int):
+        with self._text_lock:
+            if self._text_closed or generation != self._text_generation:
+                return
+
+            try:
+                self.flush_text()
+            except Exception:
+                logging.exception("{} failed to flush text".format(self._channel))
+
+    def close_text(self):
+        """Publish the pending text and stop the deadline flushes, so no text follows an error event."""
+        with self._text_lock:
+            try:
+                self.flush_text()
+            finally:
+                self._text_buffer = []
+                self._text_closed = True
+
     def pub_message_replace(self, text: str):
         content = {
             'event': 'message_replace',
@@ -380,7 +517,7 @@ class PubHandler:
             }
         }
 
-        redis_client.publish(self._channel, json.dumps(content))
+        self._publish(content)
 
         if self._is_stopped():
             self.pub_end()
@@ -402,7 +539,7 @@ class PubHandler:
                 }
             }
 
-            redis_client.publish(self._channel, json.dumps(content))
+            self._publish(content)
 
         if self._is_stopped():
             self.pub_end()
@@ -426,7 +563,7 @@ class PubHandler:
                 }
             }
 
-            redis_client.publish(self._channel, json.dumps(content))
+            self._publish(content)
 
         if self._is_stopped():
             self.pub_end()
@@ -444,7 +581,7 @@ class PubHandler:
         }
         if retriever_resource:
             content['data']['retriever_resources'] = retriever_resource
-        redis_client.publish(self._channel, json.dumps(content))
+        self._publish(content)
 
         if self._is_stopped():
             self.pub_end()
@@ -468,7 +605,7 @@ class PubHandler:
 
         db.session.commit()
 
-        redis_client.publish(self._channel, json.dumps(content))
+        self._publish(content)
 
         if self._is_stopped():
             self.pub_end()
@@ -479,7 +616,10 @@ class PubHandler:
             'event': 'end',
         }
 
-        redis_client.publish(self._channel, json.dumps(content))
+        self._publish(content)
+
+        logging.debug("{} published {} text flushes, {} bytes".format(
+            self._channel, self.flush_count, self.published_bytes))
 
     @classmethod
     def pub_error(cls, user: Union[Account, EndUser], task_id: str, e):
@@ -489,23 +629,55 @@ class PubHandler:
         }
 
         channel = cls.generate_channel_name(user, task_id)
+        with cls._handlers_lock:
+            handler = cls._handlers.get(channel)
+        if handler is not None:
+            try:
+                handler.close_text()
+            except Exception:
+                logging.exception("{} failed to flush text".format(channel))
+
         redis_client.publish(channel, json.dumps(content))
 
+    def _publish(self, content: dict):
+        with self._text_lock:
+            # keep events in order: pending text goes out before any other event
+            if content.get('event') != 'message':
+                self.flush_text()
+
+            data = json.dumps(content)
+            redis_client.publish(self._channel, data)
+            self.published_bytes += len(data)
+
     def _is_stopped(self):
-        return redis_client.get(self._stopped_cache_key) is not None
+        if self._stopped:
+            return True
+
+        now = time.perf_counter()
+        if self._stopped_checked_at is None or now - self._stopped_checked_at >= self._stopped_check_interval:
+            self._stopped_checked_at = now
+            self._stopped = redis_client.get(self._stopped_cache_key) is not None
+
+        return self._stopped
 
     @classmethod
     def ping(cls, user: Union[Account, EndUser], task_id: str):
+        cls.ping_channel(cls.generate_channel_name(user, task_id))
+
+    @classmethod
+    def ping_channel(cls, channel: str):
         content = {
             'event': 'ping'
         }
 
-        channel = cls.generate_channel_name(user, task_id)
         redis_client.publish(channel, json.dumps(content))
 
     @classmethod
     def stop(cls, user: Union[Account, EndUser], task_id: str):
-        stopped_cache_key = cls.generate_stopped_cache_key(user, task_id)
+        cls.stop_by_cache_key(cls.generate_stopped_cache_key(user, task_id))
+
+    @classmethod
+    def stop_by_cache_key(cls, stopped_cache_key: str):
         redis_client.setex(stopped_cache_key, 600, 1)
 
 
@@ -0,0 +1,136 @@
+import gzip
+import json
+import logging
+import time
+from typing import List, Optional
+
+from flask import current_app
+from langchain.schema import Document
+
+from extensions.ext_redis import redis_client
+from extensions.ext_storage import storage
+from models.model import UploadFile
+
+# bump the version of a loader when its output changes, so entries extracted by the old version are not used
+LOADER_VERSIONS = {
+    'PdfLoader': 1,
+    'ExcelLoader': 1,
+    'MarkdownLoader': 1,
+    'HTMLLoader': 1,
+    'Docx2txtLoader': 1,
+    'CSVLoader': 1,
+    'TextLoader': 1,
+    'UnstructuredFileLoader': 1,
+}
+
+# cache keys by last access time, and their sizes, used for the size-based LRU eviction
+EXTRACTION_CACHE_LRU_KEY = 'extraction_cache:lru'
+EXTRACTION_CACHE_SIZES_KEY = 'extraction_cache:sizes'
+EXTRACTION_CACHE_TOTAL_SIZE_KEY = 'extraction_cache:total_size'
+
+
+class ExtractionCache:
+    """
+    Extracted documents of uploaded files, stored in storage and keyed by the file content hash
+    and the loader version, so the same file is only extracted once by preview, estimate and indexing.
+
+    The documents are stored as they were loaded (per page / per row) with their metadata.
+    Entries are evicted least recently used first once the total size exceeds EXTRACTION_CACHE_MAX_SIZE MB.
+    """
+
+    @classmethod
+    def get(cls, upload_file: UploadFile, loader_name: str) -> Optional[List[Document]]:
+        cache_key = cls._get_cache_key(upload_file, loader_name)
+        if not cache_key:
+            return None
+
+        try:
+            data = storage.load_once(cache_key)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.exception(f"Failed to load extraction cache {cache_key}")
+            return None
+
+        try:
+            documents = [
+                Document(page_content=item['page_content'], metadata=item['metadata'])
+                for item in json.loads(gzip.decompress(data))
+            ]
+        except Exception:
+            logging.exception(f"Invalid extraction cache {cache_key}")
+            return None
+
+        redis_client.zadd(EXTRACTION_CACHE_LRU_KEY, {cache_key: time.time()})
+
+        return documents
+
+    @classmethod
+    def set(cls, upload_file: UploadFile, loader_name: str, documents: List[Document]):
+        cache_key = cls._get_cache_key(upload_file, loader_name)
+        if not cache_key:
+            return
+
+        try:
+            cls._save(cache_key, documents)
+        except Exception:
+            # the documents are already extracted, failing to cache them must not fail the extraction
+            logging.exception(f"Failed to save extraction cache {cache_key}")
+
+    @classmethod
+    def _save(cls, cache_key: str, documents: List[Document]):
+        data = gzip.compress(json.dumps([
+            {
+                'page_content': document.page_content,
+                'metadata': document.metadata
+            }
+            for document in documents
+        ], default=str).encode('utf-8'))
+
+        max_size = cls._get_max_size()
+        if len(data) > max_size:
+            return
+
+        storage.save(cache_key, data)
+
+        previous_size = redis_client.hget(EXTRACTION_CACHE_SIZES_KEY, cache_key)
+        redis_client.hset(EXTRACTION_CACHE_SIZES_KEY, cache_key, len(data))
+        redis_client.zadd(EXTRACTION_CACHE_LRU_KEY, {cache_key: time.time()})
+        total_size = redis_client.incrby(EXTRACTION_CACHE_TOTAL_SIZE_KEY, len(data) - int(previous_size or 0))
+
+        if total_size > max_size:
+            cls._evict(max_size)
+
+    @classmethod
+    def _evict(cls, max_size: int):
+        """
+        Delete the least recently used entries until the total size fits in max_size.
+        Concurrent evictions may delete a few more entries than needed, which only costs a re-extraction.
+        """
+        total_size = int(redis_client.get(EXTRACTION_CACHE_TOTAL_SIZE_KEY) or 0)
+        while total_size > max_size:
+            oldest = redis_client.zpopmin(EXTRACTION_CACHE_LRU_KEY, 1)
+            if not oldest:
+                break
+
+            cache_key = oldest[0][0].decode()
+            size = int(redis_client.hget(EXTRACTION_CACHE_SIZES_KEY, cache_key) or 0)
+            redis_client.hdel(EXTRACTION_CACHE_SIZES_KEY, cache_key)
+            total_size = redis_client.decrby(EXTRACTION_CACHE_TOTAL_SIZE_KEY, size)
+
+            try:
+                storage.delete(cache_key)
+            except Exception:
+                logging.exception(f"Failed to delete extraction cache {cache_key}")
+
+    @classmethod
+    def _get_cache_key(cls, upload_file: Optional[UploadFile], loader_name: str) -> Optional[str]:
+        if not upload_file or not upload_file.hash or cls._get_max_size() <= 0:
+            return None
+
+        loader_version = LOADER_VERSIONS.get(loader_name, 1)
+        return f'extraction_cache/{upload_file.tenant_id}/{upload_file.hash}.{loader_name}.v{loader_version}.json.gz'
+
+    @staticmethod
+    def _get_max_size() -> int:
+        return int(current_app.config.get('EXTRACTION_CACHE_MAX_SIZE') or 0) * 1024 * 1024
@@ -1,11 +1,13 @@
 import tempfile
 from pathlib import Path
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Type
 
 import requests
 from langchain.document_loaders import TextLoader, Docx2txtLoader, UnstructuredFileLoader, UnstructuredAPIFileLoader
+from langchain.document_loaders.base import BaseLoader
 from langchain.schema import Document
 
+from core.data_loader.extraction_cache import ExtractionCache
 from core.data_loader.loader.csv_loader import CSVLoader
 from core.data_loader.loader.excel import ExcelLoader
 from core.data_loader.loader.html import HTMLLoader
@@ -21,12 +23,17 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 class FileExtractor:
     @classmethod
     def load(cls, upload_file: UploadFile, return_text: bool = False, is_automatic: bool = False) -> Union[List[Document] | str]:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            suffix = Path(upload_file.key).suffix
-            file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{suffix}"
-            storage.download(upload_file.key, file_path)
+        loader_class = cls._get_loader_class(Path(upload_file.key).suffix.lower(), is_automatic)
+
+        # the cache is checked before the file is fetched from storage
+        documents = ExtractionCache.get(upload_file, loader_class.__name__)
+        if documents is None:
+            with storage.local_file(upload_file.key) as file_path:
+                documents = cls._create_loader(loader_class, file_path, upload_file).load()
+
+            ExtractionCache.set(upload_file, loader_class.__name__, documents)
 
-            return cls.load_from_file(file_path, return_text, upload_file, is_automatic)
+        return '\n'.join([document.page_content for document in documents]) if return_text else documents
 
     @classmethod
     def load_from_url(cls, url: str, return_text: bool = False) -> Union[List[Document] | str]:
@@ -49,29 +56,43 @@ class FileExtractor:
         input_file = Path(file_path)
         delimiter = '\n'
         file_extension = input_file.suffix.lower()
+        loader = cls._create_loader(cls._get_loader_class(file_extension, is_automatic), file_path, upload_file)
+
+        return delimiter.join([document.page_content for document in loader.load()]) if return_text else loader.load()
+
+    @classmethod
+    def _get_loader_class(cls, file_extension: str, is_automatic: bool = False) -> Type[BaseLoader]:
         if is_automatic:
-            loader = UnstructuredFileLoader(
-                file_path, strategy="hi_res", mode="elements"
-            )
+            return UnstructuredFileLoader
+
+        if file_extension == '.xlsx':
+            return ExcelLoader
+        elif file_extension == '.pdf':
+            return PdfLoader
+        elif file_extension in ['.md', '.markdown']:
+            return MarkdownLoader
+        elif file_extension in ['.htm', '.html']:
+            return HTMLLoader
+        elif file_extension == '.docx':
+            return Docx2txtLoader
+        elif file_extension == '.csv':
+            return CSVLoader
+        else:
+            # txt
+            return TextLoader
+
+    @classmethod
+    def _create_loader(cls, loader_class: Type[BaseLoader], file_path: str,
+                       upload_file: Optional[UploadFile] = None) -> BaseLoader:
+        if loader_class is UnstructuredFileLoader:
             # loader = UnstructuredAPIFileLoader(
             #     file_path=filenames[0],
             #     api_key="FAKE_API_KEY",
             # )
+            return UnstructuredFileLoader(file_path, strategy="hi_res", mode="elements")
+        elif loader_class is PdfLoader:
+            return PdfLoader(file_path, upload_file=upload_file)
+        elif loader_class in [MarkdownLoader, CSVLoader, TextLoader]:
+            return loader_class(file_path, autodetect_encoding=True)
         else:
-            if file_extension == '.xlsx':
-                loader = ExcelLoader(file_path)
-            elif file_extension == '.pdf':
-                loader = PdfLoader(file_path, upload_file=upload_file)
-            elif file_extension in ['.md', '.markdown']:
-                loader = MarkdownLoader(file_path, autodetect_encoding=True)
-            elif file_extension in ['.htm', '.html']:
-                loader = HTMLLoader(file_path)
-            elif file_extension == '.docx':
-                loader = Docx2txtLoader(file_path)
-            elif file_extension == '.csv':
-                loader = CSVLoader(file_path, autodetect_encoding=True)
-            else:
-                # txt
-                loader = TextLoader(file_path, autodetect_encoding=True)
-
-        return delimiter.join([document.page_content for document in loader.load()]) if return_text else loader.load()
+            return loader_class(file_path)
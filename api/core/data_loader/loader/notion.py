@@ -2,23 +2,18 @@ import json
 import logging
 from typing import List, Dict, Any, Optional
 
-import requests
 from flask import current_app
 from langchain.document_loaders.base import BaseLoader
 from langchain.schema import Document
 
+from core.data_loader.loader.notion_fetcher import NotionBlockFetcher, NotionBlockCache, get_notion_session, \
+    get_rate_limiter
 from extensions.ext_database import db
 from models.dataset import Document as DocumentModel
 from models.source import DataSourceBinding
 
 logger = logging.getLogger(__name__)
 
-BLOCK_CHILD_URL_TMPL = "https://api.notion.com/v1/blocks/{block_id}/children"
-DATABASE_URL_TMPL = "https://api.notion.com/v1/databases/{database_id}/query"
-SEARCH_URL = "https://api.notion.com/v1/search"
-
-RETRIEVE_PAGE_URL_TMPL = "https://api.notion.com/v1/pages/{page_id}"
-RETRIEVE_DATABASE_URL_TMPL = "https://api.notion.com/v1/databases/{database_id}"
 HEADING_TYPE = ['heading_1', 'heading_2', 'heading_3']
 
 
@@ -36,6 +31,8 @@ class NotionLoader(BaseLoader):
         self._notion_obj_id = notion_obj_id
         self._notion_page_type = notion_page_type
         self._notion_access_token = notion_access_token
+        self._fetcher = None
+        self._last_edited_time = None
 
         if not self._notion_access_token:
             integration_token = current_app.config.get('NOTION_INTEGRATION_TOKEN')
@@ -97,17 +94,7 @@ class NotionLoader(BaseLoader):
             self, database_id: str, query_dict: Dict[str, Any] = {}
     ) -> List[Document]:
         """Get all the pages from a Notion database."""
-        res = requests.post(
-            DATABASE_URL_TMPL.format(database_id=database_id),
-            headers={
-                "Authorization": "Bearer " + self._notion_access_token,
-                "Content-Type": "application/json",
-                "Notion-Version": "2022-06-28",
-            },
-            json=query_dict,
-        )
-
-        data = res.json()
+        data = self._get_fetcher().request('POST', f'/databases/{database_id}/query', json_body=query_dict)
 
         database_content_list = []
         if 'results' not in data or data["results"] is None:
@@ -150,176 +137,108 @@ class NotionLoader(BaseLoader):
         return database_content_list
 
     def _get_notion_block_data(self, page_id: str) -> List[str]:
+        fetcher = self._get_fetcher()
+        last_edited_time = None
+        if fetcher.cache_enabled:
+            last_edited_time = self._last_edited_time or self.get_notion_last_edited_time()
+
+        children = fetcher.fetch_tree(page_id, last_edited_time)
+
         result_lines_arr = []
-        cur_block_id = page_id
-        while True:
-            block_url = BLOCK_CHILD_URL_TMPL.format(block_id=cur_block_id)
-            query_dict: Dict[str, Any] = {}
-
-            res = requests.request(
-                "GET",
-                block_url,
-                headers={
-                    "Authorization": "Bearer " + self._notion_access_token,
-                    "Content-Type": "application/json",
-                    "Notion-Version": "2022-06-28",
-                },
-                json=query_dict
-            )
-            data = res.json()
-            # current block's heading
-            heading = ''
-            for result in data["results"]:
-                result_type = result["type"]
-                result_obj = result[result_type]
-                cur_result_text_arr = []
-                if result_type == 'table':
-                    result_block_id = result["id"]
-                    text = self._read_table_rows(result_block_id)
-                    text += "\n\n"
-                    result_lines_arr.append(text)
+        # current block's heading
+        heading = ''
+        for result in children.get(page_id, []):
+            result_type = result["type"]
+            result_obj = result[result_type]
+            cur_result_text_arr = []
+            if result_type == 'table':
+                text = self._read_table_rows(result["id"], children)
+                text += "\n\n"
+                result_lines_arr.append(text)
+            else:
+                if "rich_text" in result_obj:
+                    for rich_text in result_obj["rich_text"]:
+                        # skip if doesn't have text object
+                        if "text" in rich_text:
+                            text = rich_text["text"]["content"]
+                            cur_result_text_arr.append(text)
+                            if result_type in HEADING_TYPE:
+                                heading = text
+
+                if NotionBlockFetcher.has_children(result):
+                    children_text = self._read_block(result["id"], children, num_tabs=1)
+                    cur_result_text_arr.append(children_text)
+
+                cur_result_text = "\n".join(cur_result_text_arr)
+                cur_result_text += "\n\n"
+                if result_type in HEADING_TYPE:
+                    result_lines_arr.append(cur_result_text)
                 else:
-                    if "rich_text" in result_obj:
-                        for rich_text in result_obj["rich_text"]:
-                            # skip if doesn't have text object
-                            if "text" in rich_text:
-                                text = rich_text["text"]["content"]
-                                cur_result_text_arr.append(text)
-                                if result_type in HEADING_TYPE:
-                                    heading = text
-
-                    result_block_id = result["id"]
-                    has_children = result["has_children"]
-                    block_type = result["type"]
-                    if has_children and block_type != 'child_page':
-                        children_text = self._read_block(
-                            result_block_id, num_tabs=1
-                        )
-                        cur_result_text_arr.append(children_text)
-
-                    cur_result_text = "\n".join(cur_result_text_arr)
-                    cur_result_text += "\n\n"
-                    if result_type in HEADING_TYPE:
-                        result_lines_arr.append(cur_result_text)
-                    else:
-                        result_lines_arr.append(f'{heading}\n{cur_result_text}')
+                    result_lines_arr.append(f'{heading}\n{cur_result_text}')
 
-            if data["next_cursor"] is None:
-                break
-            else:
-                cur_block_id = data["next_cursor"]
         return result_lines_arr
 
-    def _read_block(self, block_id: str, num_tabs: int = 0) -> str:
+    def _read_block(self, block_id: str, children: Dict[str, List[dict]], num_tabs: int = 0) -> str:
         """Read a block."""
         result_lines_arr = []
-        cur_block_id = block_id
-        while True:
-            block_url = BLOCK_CHILD_URL_TMPL.format(block_id=cur_block_id)
-            query_dict: Dict[str, Any] = {}
-
-            res = requests.request(
-                "GET",
-                block_url,
-                headers={
-                    "Authorization": "Bearer " + self._notion_access_token,
-                    "Content-Type": "application/json",
-                    "Notion-Version": "2022-06-28",
-                },
-                json=query_dict
-            )
-            data = res.json()
-            if 'results' not in data or data["results"] is None:
-                break
-            heading = ''
-            for result in data["results"]:
-                result_type = result["type"]
-                result_obj = result[result_type]
-                cur_result_text_arr = []
-                if result_type == 'table':
-                    result_block_id = result["id"]
-                    text = self._read_table_rows(result_block_id)
-                    result_lines_arr.append(text)
-                else:
-                    if "rich_text" in result_obj:
-                        for rich_text in result_obj["rich_text"]:
-                            # skip if doesn't have text object
-                            if "text" in rich_text:
-                                text = rich_text["text"]["content"]
-                                prefix = "\t" * num_tabs
-                                cur_result_text_arr.append(prefix + text)
-                                if result_type in HEADING_TYPE:
-                                    heading = text
-                    result_block_id = result["id"]
-                    has_children = result["has_children"]
-                    block_type = result["type"]
-                    if has_children and block_type != 'child_page':
-                        children_text = self._read_block(
-                            result_block_id, num_tabs=num_tabs + 1
-                        )
-                        cur_result_text_arr.append(children_text)
-
-                    cur_result_text = "\n".join(cur_result_text_arr)
-                    if result_type in HEADING_TYPE:
-                        result_lines_arr.append(cur_result_text)
-                    else:
-                        result_lines_arr.append(f'{heading}\n{cur_result_text}')
-
-            if data["next_cursor"] is None:
-                break
+        heading = ''
+        for result in children.get(block_id, []):
+            result_type = result["type"]
+            result_obj = result[result_type]
+            cur_result_text_arr = []
+            if result_type == 'table':
+                text = self._read_table_rows(result["id"], children)
+                result_lines_arr.append(text)
             else:
-                cur_block_id = data["next_cursor"]
+                if "rich_text" in result_obj:
+                    for rich_text in result_obj["rich_text"]:
+                        # skip if doesn't have text object
+                        if "text" in rich_text:
+                            text = rich_text["text"]["content"]
+                            prefix = "\t" * num_tabs
+                            cur_result_text_arr.append(prefix + text)
+                            if result_type in HEADING_TYPE:
+                                heading = text
+                if NotionBlockFetcher.has_children(result):
+                    children_text = self._read_block(result["id"], children, num_tabs=num_tabs + 1)
+                    cur_result_text_arr.append(children_text)
+
+                cur_result_text = "\n".join(cur_result_text_arr)
+                if result_type in HEADING_TYPE:
+                    result_lines_arr.append(cur_result_text)
+                else:
+                    result_lines_arr.append(f'{heading}\n{cur_result_text}')
 
         result_lines = "\n".join(result_lines_arr)
         return result_lines
 
-    def _read_table_rows(self, block_id: str) -> str:
+    def _read_table_rows(self, block_id: str, children: Dict[str, List[dict]]) -> str:
         """Read table rows."""
-        done = False
+        rows = children.get(block_id, [])
+        if not rows:
+            return ''
+
         result_lines_arr = []
-        cur_block_id = block_id
-        while not done:
-            block_url = BLOCK_CHILD_URL_TMPL.format(block_id=cur_block_id)
-            query_dict: Dict[str, Any] = {}
-
-            res = requests.request(
-                "GET",
-                block_url,
-                headers={
-                    "Authorization": "Bearer " + self._notion_access_token,
-                    "Content-Type": "application/json",
-                    "Notion-Version": "2022-06-28",
-                },
-                json=query_dict
-            )
-            data = res.json()
-            # get table headers text
-            table_header_cell_texts = []
-            tabel_header_cells = data["results"][0]['table_row']['cells']
-            for tabel_header_cell in tabel_header_cells:
-                if tabel_header_cell:
-                    for table_header_cell_text in tabel_header_cell:
-                        text = table_header_cell_text["text"]["content"]
-                        table_header_cell_texts.append(text)
-            # get table columns text and format
-            results = data["results"]
-            for i in range(len(results) - 1):
-                column_texts = []
-                tabel_column_cells = data["results"][i + 1]['table_row']['cells']
-                for j in range(len(tabel_column_cells)):
-                    if tabel_column_cells[j]:
-                        for table_column_cell_text in tabel_column_cells[j]:
-                            column_text = table_column_cell_text["text"]["content"]
-                            column_texts.append(f'{table_header_cell_texts[j]}:{column_text}')
-
-                cur_result_text = "\n".join(column_texts)
-                result_lines_arr.append(cur_result_text)
-
-            if data["next_cursor"] is None:
-                done = True
-                break
-            else:
-                cur_block_id = data["next_cursor"]
+        # get table headers text
+        table_header_cell_texts = []
+        tabel_header_cells = rows[0]['table_row']['cells']
+        for tabel_header_cell in tabel_header_cells:
+            if tabel_header_cell:
+                for table_header_cell_text in tabel_header_cell:
+                    text = table_header_cell_text["text"]["content"]
+                    table_header_cell_texts.append(text)
+        # get table columns text and format
+        for row in rows[1:]:
+            column_texts = []
+            tabel_column_cells = row['table_row']['cells']
+            for j in range(len(tabel_column_cells)):
+                if tabel_column_cells[j]:
+                    for table_column_cell_text in tabel_column_cells[j]:
+                        column_text = table_column_cell_text["text"]["content"]
+                        column_texts.append(f'{table_header_cell_texts[j]}:{column_text}')
+
+            cur_result_text = "\n".join(column_texts)
+            result_lines_arr.append(cur_result_text)
 
         result_lines = "\n".join(result_lines_arr)
         return result_lines
@@ -342,25 +261,29 @@ class NotionLoader(BaseLoader):
         obj_id = self._notion_obj_id
         page_type = self._notion_page_type
         if page_type == 'database':
-            retrieve_page_url = RETRIEVE_DATABASE_URL_TMPL.format(database_id=obj_id)
+            path = f'/databases/{obj_id}'
         else:
-            retrieve_page_url = RETRIEVE_PAGE_URL_TMPL.format(page_id=obj_id)
-
-        query_dict: Dict[str, Any] = {}
-
-        res = requests.request(
-            "GET",
-            retrieve_page_url,
-            headers={
-                "Authorization": "Bearer " + self._notion_access_token,
-                "Content-Type": "application/json",
-                "Notion-Version": "2022-06-28",
-            },
-            json=query_dict
-        )
+            path = f'/pages/{obj_id}'
+
+        data = self._get_fetcher().request('GET', path)
+        self._last_edited_time = data["last_edited_time"]
+        return self._last_edited_time
+
+    def _get_fetcher(self) -> NotionBlockFetcher:
+        if self._fetcher is None:
+            max_workers = int(current_app.config.get('NOTION_FETCH_MAX_WORKERS') or 1)
+            cache_ttl = int(current_app.config.get('NOTION_BLOCK_CACHE_TTL') or 0)
+            self._fetcher = NotionBlockFetcher(
+                access_token=self._notion_access_token,
+                session=get_notion_session(pool_size=max_workers),
+                rate_limiter=get_rate_limiter(
+                    self._notion_access_token, float(current_app.config.get('NOTION_RATE_LIMIT') or 0)
+                ),
+                max_workers=max_workers,
+                cache=NotionBlockCache(ttl=cache_ttl) if cache_ttl > 0 else None
+            )
 
-        data = res.json()
-        return data["last_edited_time"]
+        return self._fetcher
 
     @classmethod
     def _get_access_token(cls, tenant_id: str, notion_workspace_id: str) -> str:
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+NOTION_API_BASE_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+# max page size of the notion api
+PAGE_SIZE = 100
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_rate_limiters: Dict[str, 'RateLimiter'] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_notion_session(pool_size: int = 16) -> requests.Session:
+    """Session shared by the notion requests of this process, so connections to the api are kept alive."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                _session = session
+                _session_pid = os.getpid()
+
+    return _session
+
+
+def get_rate_limiter(access_token: str, rate: float) -> 'RateLimiter':
+    """Notion limits the requests per integration, so the limiter is shared by all fetches of the same token."""
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None or limiter.rate != rate:
+            limiter = RateLimiter(rate)
+            _rate_limiters[key] = limiter
+
+    return limiter
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second on average, with bursts of up to `burst` requests."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self._capacity = burst or max(int(rate), 1)
+        self._tokens = float(self._capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait_seconds = (1 - self._tokens) / self.rate
+
+            time.sleep(wait_seconds)
+
+    def pause(self, seconds: float):
+        """Hold back all requests for `seconds`, used when notion answers 429 with a Retry-After."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class NotionBlockCache:
+    """
+    Block trees of notion pages, keyed by the page id and the last_edited_time of the page.
+
+    Editing a block does not change the last_edited_time of its parent block, only its own and the page's,
+    so a listing of children is never skipped on the time of the parent. Any edit in the page changes
+    the last_edited_time of the page, an unchanged page reuses its whole tree.
+    """
+    KEY_PREFIX = 'notion_page_blocks'
+
+    def __init__(self, ttl: int):
+        self._ttl = ttl
+
+    def get(self, page_id: str, last_edited_time: str) -> Optional[Dict[str, List[dict]]]:
+        try:
+            data = redis_client.get(self._get_key(page_id, last_edited_time))
+        except Exception:
+            logger.exception(f"Failed to get notion block cache of {page_id}")
+            return None
+
+        return json.loads(data) if data else None
+
+    def set(self, page_id: str, last_edited_time: str, children: Dict[str, List[dict]]):
+        try:
+            redis_client.setex(self._get_key(page_id, last_edited_time), self._ttl, json.dumps(children))
+        except Exception:
+            logger.exception(f"Failed to set notion block cache of {page_id}")
+
+    def _get_key(self, page_id: str, last_edited_time: str) -> str:
+        return f'{self.KEY_PREFIX}:{page_id}:{last_edited_time}'
+
+
+class NotionBlockFetcher:
+    """
+    Fetches the block tree of a notion page.
+
+    The children of sibling blocks are fetched concurrently on a shared session, every request
+    goes through the rate limiter of the integration, and 429 responses are retried after Retry-After.
+    """
+    MAX_RETRIES = 5
+
+    def __init__(self, access_token: str, session: requests.Session, rate_limiter: RateLimiter,
+                 max_workers: int = 4, cache: Optional[Any] = None, base_url: str = NOTION_API_BASE_URL,
+                 timeout: float = 30):
+        self._access_token = access_token
+        self._session = session
+        self._rate_limiter = rate_limiter
+        self._max_workers = max(max_workers, 1)
+        self._cache = cache
+        self._base_url = base_url.rstrip('/')
+        self._timeout = timeout
+
+    def request(self, method: str, path: str, params: Optional[dict] = None, json_body: Optional[dict] = None) -> dict:
+        headers = {
+            "Authorization": "Bearer " + self._access_token,
+            "Content-Type": "application/json",
+            "Notion-Version": NOTION_VERSION,
+        }
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._rate_limiter.acquire()
+            res = self._session.request(
+                method,
+                self._base_url + path,
+                headers=headers,
+                params=params,
+                json=json_body,
+                timeout=self._timeout
+            )
+
+            retryable = res.status_code == 429 or res.status_code >= 500
+            if not retryable or attempt == self.MAX_RETRIES:
+                break
+
+            retry_after = float(res.headers.get('Retry-After') or 2 ** attempt)
+            if res.status_code == 429:
+                self._rate_limiter.pause(retry_after)
+            else:
+                time.sleep(retry_after)
+
+        res.raise_for_status()
+        return res.json()
+
+    def get_children(self, block_id: str) -> List[dict]:
+        """All the children of a block, following the pagination cursors."""
+        blocks = []
+        params = {'page_size': PAGE_SIZE}
+        while True:
+            data = self.request('GET', f'/blocks/{block_id}/children', params=params)
+            blocks.extend(data.get('results') or [])
+
+            if not data.get('has_more') or not data.get('next_cursor'):
+                break
+
+            params = {'page_size': PAGE_SIZE, 'start_cursor': data['next_cursor']}
+
+        return blocks
+
+    @property
+    def cache_enabled(self) -> bool:
+        return self._cache is not None
+
+    def fetch_tree(self, root_id: str, last_edited_time: Optional[str] = None) -> Dict[str, List[dict]]:
+        """
+        Fetch the children of the root and of all its descendants, except the content of child pages.
+
+        :param last_edited_time: last_edited_time of the root page, its tree is cached under it
+        :return: children by parent block id
+        """
+        use_cache = self._cache is not None and bool(last_edited_time)
+        if use_cache:
+            cached = self._cache.get(root_id, last_edited_time)
+            if cached is not None:
+                return cached
+
+        children: Dict[str, List[dict]] = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='notion_fetcher') as executor:
+            pending = {executor.submit(self.get_children, root_id): root_id}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    block_id = pending.pop(future)
+                    blocks = future.result()
+                    children[block_id] = blocks
+                    for block in blocks:
+                        if self.has_children(block) and block['id'] not in children:
+                            pending[executor.submit(self.get_children, block['id'])] = block['id']
+
+        # the content of synced blocks can be edited in another page, without changing this page
+        synced = any(block.get('type') == 'synced_block' for blocks in children.values() for block in blocks)
+        if use_cache and not synced:
+            self._cache.set(root_id, last_edited_time, children)
+
+        return children
+
+    @staticmethod
+    def has_children(block: dict) -> bool:
+        # the content of child pages is imported as separate documents
+        return bool(block.get('has_children')) and block.get('type') != 'child_page'
@@ -1,7 +1,6 @@
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from langchain.document_loaders import PyPDFium2Loader
 from langchain.document_loaders.base import BaseLoader
 from langchain.schema import Document
 
@@ -41,7 +40,7 @@ class PdfLoader(BaseLoader):
                     return [Document(page_content=text)]
                 except FileNotFoundError:
                     pass
-        documents = PyPDFium2Loader(file_path=self._file_path).load()
+        documents = list(self.lazy_load())
         text_list = []
         for document in documents:
             text_list.append(document.page_content)
@@ -53,3 +52,21 @@ class PdfLoader(BaseLoader):
 
         return documents
 
+    def lazy_load(self) -> Iterator[Document]:
+        """Yield the pages in order, same output as PyPDFium2Loader."""
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(self._file_path, autoclose=True)
+        try:
+            for page_number in range(len(pdf)):
+                page = pdf[page_number]
+                text_page = page.get_textpage()
+                try:
+                    content = text_page.get_text_range()
+                finally:
+                    text_page.close()
+                    page.close()
+
+                yield Document(page_content=content, metadata={'source': self._file_path, 'page': page_number})
+        finally:
+            pdf.close()
@@ -1,12 +1,17 @@
-from typing import Any, Dict, Optional, Sequence
+from typing import Any, Dict, Optional, Sequence, List
 
 from langchain.schema import Document
 from sqlalchemy import func
 
+from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.index.keyword_table_index.keyword_table_index import KeywordTableConfig
 from core.model_providers.model_factory import ModelFactory
 from extensions.ext_database import db
 from models.dataset import Dataset, DocumentSegment
 
+# max number of ids in a single `IN (...)` lookup
+SEGMENT_QUERY_BATCH_SIZE = 1000
+
 
 class DatasetDocumentStore:
     def __init__(
@@ -61,6 +66,10 @@ class DatasetDocumentStore:
     def add_documents(
             self, docs: Sequence[Document], allow_update: bool = True
     ) -> None:
+        for doc in docs:
+            if not isinstance(doc, Document):
+                raise ValueError("doc must be a Document")
+
         max_position = db.session.query(func.max(DocumentSegment.position)).filter(
             DocumentSegment.document_id == self._document_id
         ).scalar()
@@ -75,42 +84,52 @@ class DatasetDocumentStore:
                 model_name=self._dataset.embedding_model
             )
 
-        for doc in docs:
-            if not isinstance(doc, Document):
-                raise ValueError("doc must be a Document")
+        # prefetch the segments that already exist in the store
+        segment_documents = self.get_document_segments([doc.metadata['doc_id'] for doc in docs])
 
-            segment_document = self.get_document(doc_id=doc.metadata['doc_id'], raise_error=False)
+        # NOTE: doc could already exist in the store, but we overwrite it
+        if not allow_update and segment_documents:
+            raise ValueError(
+                f"doc_id {next(iter(segment_documents))} already exists. "
+                "Set allow_update to True to overwrite."
+            )
 
-            # NOTE: doc could already exist in the store, but we overwrite it
-            if not allow_update and segment_document:
-                raise ValueError(
-                    f"doc_id {doc.metadata['doc_id']} already exists. "
-                    "Set allow_update to True to overwrite."
-                )
+        # calc embedding use tokens
+        if embedding_model:
+            tokens_list = embedding_model.get_num_tokens_batch([doc.page_content for doc in docs])
+        else:
+            tokens_list = [0] * len(docs)
 
-            # calc embedding use tokens
-            tokens = embedding_model.get_num_tokens(doc.page_content) if embedding_model else 0
+        keyword_table_handler = JiebaKeywordTableHandler()
+        max_keywords_per_chunk = KeywordTableConfig().max_keywords_per_chunk
+
+        new_segments = []
+        for doc, tokens in zip(docs, tokens_list):
+            keywords = list(keyword_table_handler.extract_keywords(doc.page_content, max_keywords_per_chunk))
+            segment_document = segment_documents.get(doc.metadata['doc_id'])
 
             if not segment_document:
                 max_position += 1
 
-                segment_document = DocumentSegment(
-                    tenant_id=self._dataset.tenant_id,
-                    dataset_id=self._dataset.id,
-                    document_id=self._document_id,
-                    index_node_id=doc.metadata['doc_id'],
-                    index_node_hash=doc.metadata['doc_hash'],
-                    position=max_position,
-                    content=doc.page_content,
-                    word_count=len(doc.page_content),
-                    tokens=tokens,
-                    enabled=False,
-                    created_by=self._user_id,
-                )
+                new_segment = {
+                    'tenant_id': self._dataset.tenant_id,
+                    'dataset_id': self._dataset.id,
+                    'document_id': self._document_id,
+                    'index_node_id': doc.metadata['doc_id'],
+                    'index_node_hash': doc.metadata['doc_hash'],
+                    'position': max_position,
+                    'content': doc.page_content,
+                    'word_count': len(doc.page_content),
+                    'tokens': tokens,
+                    'keywords': keywords,
+                    'enabled': False,
+                    'hit_count': 0,
+                    'created_by': self._user_id,
+                }
                 if 'answer' in doc.metadata and doc.metadata['answer']:
-                    segment_document.answer = doc.metadata.pop('answer', '')
+                    new_segment['answer'] = doc.metadata.pop('answer', '')
 
-                db.session.add(segment_document)
+                new_segments.append(new_segment)
             else:
                 segment_document.content = doc.page_content
                 if 'answer' in doc.metadata and doc.metadata['answer']:
@@ -118,8 +137,12 @@ class DatasetDocumentStore:
                 segment_document.index_node_hash = doc.metadata['doc_hash']
                 segment_document.word_count = len(doc.page_content)
                 segment_document.tokens = tokens
+                segment_document.keywords = keywords
+
+        if new_segments:
+            db.session.bulk_insert_mappings(DocumentSegment, new_segments)
 
-            db.session.commit()
+        db.session.commit()
 
     def document_exists(self, doc_id: str) -> bool:
         """Check if document exists."""
@@ -178,6 +201,19 @@ class DatasetDocumentStore:
 
         return document_segment.index_node_hash
 
+    def get_document_segments(self, doc_ids: List[str]) -> Dict[str, DocumentSegment]:
+        document_segments = {}
+        for i in range(0, len(doc_ids), SEGMENT_QUERY_BATCH_SIZE):
+            segments = db.session.query(DocumentSegment).filter(
+                DocumentSegment.dataset_id == self._dataset.id,
+                DocumentSegment.index_node_id.in_(doc_ids[i:i + SEGMENT_QUERY_BATCH_SIZE])
+            ).all()
+
+            for segment in segments:
+                document_segments[segment.index_node_id] = segment
+
+        return document_segments
+
     def get_document_segment(self, doc_id: str) -> DocumentSegment:
         document_segment = db.session.query(DocumentSegment).filter(
             DocumentSegment.dataset_id == self._dataset.id,
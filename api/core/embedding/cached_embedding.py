@@ -1,8 +1,13 @@
 import logging
-from typing import List
+import pickle
+import threading
+from typing import List, Dict, Optional
 
 import numpy as np
+from cachetools import LRUCache
+from flask import current_app
 from langchain.embeddings.base import Embeddings
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
 from core.model_providers.models.embedding.base import BaseEmbedding
@@ -10,6 +15,34 @@ from extensions.ext_database import db
 from libs import helper
 from models.dataset import Embedding
 
+# max number of hashes in a single `IN (...)` lookup
+EMBEDDING_QUERY_BATCH_SIZE = 1000
+
+_lru_cache: Optional[LRUCache] = None
+_lru_cache_lock = threading.Lock()
+
+
+def _get_lru_cache() -> Optional[LRUCache]:
+    """
+    Process-local LRU in front of the embeddings table, disabled when EMBEDDING_CACHE_LRU_SIZE is 0.
+    """
+    global _lru_cache
+    if _lru_cache is None:
+        try:
+            max_size = int(current_app.config.get('EMBEDDING_CACHE_LRU_SIZE') or 0)
+        except RuntimeError:
+            # outside of app context
+            return None
+
+        if max_size <= 0:
+            return None
+
+        with _lru_cache_lock:
+            if _lru_cache is None:
+                _lru_cache = LRUCache(maxsize=max_size)
+
+    return _lru_cache
+
 
 class CacheEmbedding(Embeddings):
     def __init__(self, embeddings: BaseEmbedding):
@@ -19,13 +52,18 @@ class CacheEmbedding(Embeddings):
         """Embed search docs."""
         # use doc embedding cache or store if not exists
         text_embeddings = [None for _ in range(len(texts))]
+        hashes = [helper.generate_text_hash(text) for text in texts]
+
+        cached_embeddings = self._get_cached_embeddings(list(set(hashes)))
+
+        # texts with the same hash are only sent to the provider once
+        embedding_queue_hashes = []
         embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = db.session.query(Embedding).filter_by(model_name=self._embeddings.name, hash=hash).first()
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
-            else:
+        for i, hash in enumerate(hashes):
+            if hash in cached_embeddings:
+                text_embeddings[i] = cached_embeddings[hash]
+            elif hash not in embedding_queue_hashes:
+                embedding_queue_hashes.append(hash)
                 embedding_queue_indices.append(i)
 
         if embedding_queue_indices:
@@ -34,23 +72,15 @@ class CacheEmbedding(Embeddings):
             except Exception as ex:
                 raise self._embeddings.handle_exceptions(ex)
 
-            for i, indice in enumerate(embedding_queue_indices):
-                hash = helper.generate_text_hash(texts[indice])
-
-                try:
-                    embedding = Embedding(model_name=self._embeddings.name, hash=hash)
-                    vector = embedding_results[i]
-                    normalized_embedding = (vector / np.linalg.norm(vector)).tolist()
-                    text_embeddings[indice] = normalized_embedding
-                    embedding.set_embedding(normalized_embedding)
-                    db.session.add(embedding)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
-                    continue
-                except:
-                    logging.exception('Failed to add embedding to db')
-                    continue
+            new_embeddings = {}
+            for hash, vector in zip(embedding_queue_hashes, embedding_results):
+                new_embeddings[hash] = (vector / np.linalg.norm(vector)).tolist()
+
+            for i, hash in enumerate(hashes):
+                if text_embeddings[i] is None:
+                    text_embeddings[i] = new_embeddings[hash]
+
+            self._save_embeddings(new_embeddings)
 
         return text_embeddings
 
@@ -58,9 +88,9 @@ class CacheEmbedding(Embeddings):
         """Embed query text."""
         # use doc embedding cache or store if not exists
         hash = helper.generate_text_hash(text)
-        embedding = db.session.query(Embedding).filter_by(model_name=self._embeddings.name, hash=hash).first()
-        if embedding:
-            return embedding.get_embedding()
+        cached_embeddings = self._get_cached_embeddings([hash])
+        if hash in cached_embeddings:
+            return cached_embeddings[hash]
 
         try:
             embedding_results = self._embeddings.client.embed_query(text)
@@ -68,15 +98,77 @@ class CacheEmbedding(Embeddings):
         except Exception as ex:
             raise self._embeddings.handle_exceptions(ex)
 
+        self._save_embeddings({hash: embedding_results})
+
+        return embedding_results
+
+    def _get_cached_embeddings(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up embeddings by text hash, first in the process-local LRU and then
+        in the embeddings table with one `IN (...)` query per batch.
+        """
+        cached_embeddings = {}
+        lru_cache = _get_lru_cache()
+        model_name = self._embeddings.name
+
+        missing_hashes = []
+        if lru_cache is not None:
+            with _lru_cache_lock:
+                for hash in hashes:
+                    embedding = lru_cache.get((model_name, hash))
+                    if embedding is not None:
+                        cached_embeddings[hash] = embedding
+                    else:
+                        missing_hashes.append(hash)
+        else:
+            missing_hashes = hashes
+
+        for i in range(0, len(missing_hashes), EMBEDDING_QUERY_BATCH_SIZE):
+            batch_hashes = missing_hashes[i:i + EMBEDDING_QUERY_BATCH_SIZE]
+            rows = db.session.query(Embedding.hash, Embedding.embedding).filter(
+                Embedding.model_name == model_name,
+                Embedding.hash.in_(batch_hashes)
+            ).all()
+
+            for row in rows:
+                cached_embeddings[row.hash] = pickle.loads(row.embedding)
+
+        if lru_cache is not None and missing_hashes:
+            with _lru_cache_lock:
+                for hash in missing_hashes:
+                    if hash in cached_embeddings:
+                        lru_cache[(model_name, hash)] = cached_embeddings[hash]
+
+        return cached_embeddings
+
+    def _save_embeddings(self, embeddings: Dict[str, List[float]]):
+        """
+        Persist new embeddings with a single multi-row insert, ignoring rows
+        already written by a concurrent worker.
+        """
+        if not embeddings:
+            return
+
+        model_name = self._embeddings.name
+        lru_cache = _get_lru_cache()
+        if lru_cache is not None:
+            with _lru_cache_lock:
+                for hash, embedding in embeddings.items():
+                    lru_cache[(model_name, hash)] = embedding
+
         try:
-            embedding = Embedding(model_name=self._embeddings.name, hash=hash)
-            embedding.set_embedding(embedding_results)
-            db.session.add(embedding)
+            stmt = insert(Embedding).values([
+                {
+                    'model_name': model_name,
+                    'hash': hash,
+                    'embedding': pickle.dumps(embedding, protocol=pickle.HIGHEST_PROTOCOL)
+                }
+                for hash, embedding in embeddings.items()
+            ]).on_conflict_do_nothing(index_elements=['model_name', 'hash'])
+            db.session.execute(stmt)
             db.session.commit()
         except IntegrityError:
             db.session.rollback()
         except:
-            logging.exception('Failed to add embedding to db')
-
-        return embedding_results
-
+            db.session.rollback()
+            logging.exception('Failed to add embeddings to db')
@@ -25,7 +25,7 @@ class MessageFileParser:
         :param user:
         :return:
         """
-        file_upload_config = app_model_config.file_upload_dict
+        file_upload_config = app_model_config.snapshot.file_upload_dict
 
         for file in files:
             if not isinstance(file, dict):
@@ -105,7 +105,7 @@ class MessageFileParser:
         :return:
         """
         # transform files to file objs
-        type_file_objs = self._to_file_objs(files, app_model_config.file_upload_dict)
+        type_file_objs = self._to_file_objs(files, app_model_config.snapshot.file_upload_dict)
 
         # return all file objs
         return [file_obj for file_objs in type_file_objs.values() for file_obj in file_objs]
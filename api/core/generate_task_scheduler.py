@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Callable, Optional
+
+from flask import Flask
+from redis.client import PubSub
+
+from core.conversation_message_task import PubHandler
+from core.model_providers.error import LLMAPIUnavailableError
+from models.model import Account, EndUser
+
+
+class GenerateTask:
+    def __init__(self, user: Union[Account, EndUser], task_id: str, pubsub: PubSub, started_at: float):
+        # the timer thread runs outside the session of the request, so it only uses these strings, not the user
+        self.channel = PubHandler.generate_channel_name(user, task_id)
+        self.stopped_cache_key = PubHandler.generate_stopped_cache_key(user, task_id)
+        self.task_id = task_id
+        self.pubsub = pubsub
+        self.started_at = started_at
+        self.done = False
+        # number of entries of the task in the timer heap
+        self.timers = 0
+
+
+class GenerateTaskScheduler:
+    """
+    Runs generate workers on a bounded executor and handles the keepalive pings and
+    stop deadlines of all in-flight tasks from a single timer thread.
+    """
+    PING_INTERVAL = 10
+    TIMEOUT = 600
+
+    def __init__(self, max_workers: int, max_queue_size: int, queue_timeout: float):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='generate_worker')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        self._queue_timeout = queue_timeout
+
+        # heap of (deadline, seq, event, task), entries of finished tasks are dropped by _compact_timers
+        self._timers = []
+        self._finished_timers = 0
+        self._timer_seq = itertools.count()
+        self._timer_condition = threading.Condition()
+        self._timer_thread = threading.Thread(target=self._run_timers, name='generate_task_timer', daemon=True)
+        self._timer_thread.start()
+
+    def submit(self, fn: Callable, kwargs: dict, user: Union[Account, EndUser],
+               task_id: str, pubsub: PubSub) -> GenerateTask:
+        """
+        Submit a generate worker, blocks up to queue_timeout when the executor queue is full.
+        """
+        if not self._slots.acquire(timeout=self._queue_timeout):
+            raise LLMAPIUnavailableError('Too many generate tasks in queue, please try again later.')
+
+        task = GenerateTask(user=user, task_id=task_id, pubsub=pubsub, started_at=time.monotonic())
+
+        def run():
+            try:
+                fn(**kwargs)
+            finally:
+                self._finish(task)
+                self._slots.release()
+
+        try:
+            self._executor.submit(run)
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._schedule(task.started_at + self.PING_INTERVAL, 'ping', task)
+        self._schedule(task.started_at + self.TIMEOUT, 'timeout', task)
+
+        return task
+
+    def _finish(self, task: GenerateTask):
+        with self._timer_condition:
+            task.done = True
+            # the pubsub of a finished task is no longer closed on timeout
+            task.pubsub = None
+            self._finished_timers += task.timers
+            task.timers = 0
+            self._compact_timers()
+
+    def _compact_timers(self):
+        """Rebuild the heap without the entries of finished tasks once they are the majority."""
+        if self._finished_timers * 2 < len(self._timers):
+            return
+
+        self._timers = [timer for timer in self._timers if not timer[3].done]
+        heapq.heapify(self._timers)
+        self._finished_timers = 0
+
+    def _schedule(self, deadline: float, event: str, task: GenerateTask):
+        with self._timer_condition:
+            if task.done:
+                return
+
+            heapq.heappush(self._timers, (deadline, next(self._timer_seq), event, task))
+            task.timers += 1
+            self._timer_condition.notify()
+
+    def _run_timers(self):
+        while True:
+            with self._timer_condition:
+                while not self._timers:
+                    self._timer_condition.wait()
+
+                deadline, _, event, task = self._timers[0]
+                wait_time = deadline - time.monotonic()
+                if wait_time > 0:
+                    self._timer_condition.wait(wait_time)
+                    continue
+
+                heapq.heappop(self._timers)
+                if task.done:
+                    self._finished_timers = max(self._finished_timers - 1, 0)
+                    continue
+
+                task.timers -= 1
+                pubsub = task.pubsub
+
+            try:
+                if event == 'ping':
+                    PubHandler.ping_channel(task.channel)
+                    if deadline + self.PING_INTERVAL < task.started_at + self.TIMEOUT:
+                        self._schedule(deadline + self.PING_INTERVAL, 'ping', task)
+                else:
+                    PubHandler.stop_by_cache_key(task.stopped_cache_key)
+                    try:
+                        if pubsub is not None:
+                            pubsub.close()
+                    except Exception:
+                        pass
+            except Exception:
+                logging.exception("Generate task {} {} failed".format(task.task_id, event))
+
+
+_scheduler: Optional[GenerateTaskScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_generate_task_scheduler(flask_app: Flask) -> GenerateTaskScheduler:
+    """
+    The scheduler is created lazily so that every forked worker process gets its own executor and timer thread.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = GenerateTaskScheduler(
+                    max_workers=int(flask_app.config.get('GENERATE_TASK_MAX_WORKERS')),
+                    max_queue_size=int(flask_app.config.get('GENERATE_TASK_MAX_QUEUE_SIZE')),
+                    queue_timeout=float(flask_app.config.get('GENERATE_TASK_QUEUE_TIMEOUT'))
+                )
+
+    return _scheduler
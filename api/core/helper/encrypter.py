@@ -1,10 +1,27 @@
 import base64
+import hashlib
+import threading
+import time
+
+from cachetools import TTLCache
 
 from extensions.ext_database import db
 from libs import rsa
 
 from models.account import Tenant
 
+# decrypted tokens keyed by (tenant_id, ciphertext hash).
+# credentials are re-encrypted with a fresh AES key on every save, so an updated credential
+# never hits a stale entry; the TTL bounds how long a plaintext stays in process memory.
+_decrypted_token_cache = TTLCache(maxsize=4096, ttl=300)
+_decrypted_token_cache_lock = threading.Lock()
+
+_decrypt_stats = {
+    'hits': 0,
+    'misses': 0,
+    'decrypt_time': 0.0
+}
+
 
 def obfuscated_token(token: str):
     return token[:6] + '*' * (len(token) - 8) + token[-2:]
@@ -17,4 +34,42 @@ def encrypt_token(tenant_id: str, token: str):
 
 
 def decrypt_token(tenant_id: str, token: str):
-    return rsa.decrypt(base64.b64decode(token), tenant_id)
+    cache_key = (tenant_id, hashlib.sha256(token.encode()).hexdigest())
+    with _decrypted_token_cache_lock:
+        decrypted_token = _decrypted_token_cache.get(cache_key)
+        if decrypted_token is not None:
+            _decrypt_stats['hits'] += 1
+            return decrypted_token
+
+    start_at = time.perf_counter()
+    decrypted_token = rsa.decrypt(base64.b64decode(token), tenant_id)
+    decrypt_time = time.perf_counter() - start_at
+
+    with _decrypted_token_cache_lock:
+        _decrypted_token_cache[cache_key] = decrypted_token
+        _decrypt_stats['misses'] += 1
+        _decrypt_stats['decrypt_time'] += decrypt_time
+
+    return decrypted_token
+
+
+def invalidate_decrypted_tokens(tenant_id: str):
+    """
+    Drop all cached decrypted tokens of a tenant, called when its credentials are updated or deleted.
+    """
+    with _decrypted_token_cache_lock:
+        for cache_key in [key for key in _decrypted_token_cache.keys() if key[0] == tenant_id]:
+            _decrypted_token_cache.pop(cache_key, None)
+
+
+def get_decrypt_stats() -> dict:
+    with _decrypted_token_cache_lock:
+        total = _decrypt_stats['hits'] + _decrypt_stats['misses']
+        return {
+            'hits': _decrypt_stats['hits'],
+            'misses': _decrypt_stats['misses'],
+            'hit_rate': _decrypt_stats['hits'] / total if total else 0.0,
+            'decrypt_time': _decrypt_stats['decrypt_time'],
+            'avg_decrypt_time': _decrypt_stats['decrypt_time'] / _decrypt_stats['misses']
+            if _decrypt_stats['misses'] else 0.0
+        }
@@ -0,0 +1,338 @@
+import math
+from collections import Counter
+from typing import Any, List, Tuple
+
+from langchain.schema import Document, BaseRetriever
+from pydantic import BaseModel, Field, Extra
+from sqlalchemy import case, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from core.index.base import BaseIndex
+from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from events.dataset_event import dataset_full_text_index_was_missing
+from extensions.ext_database import db
+from models.dataset import Dataset, DocumentSegment, DatasetFullTextIndex, DatasetFullTextPosting
+from models.dataset import Document as DatasetDocument
+
+# max number of rows / ids in a single insert or `IN (...)` clause
+POSTING_BATCH_SIZE = 1000
+
+# max number of segments tokenized at once when building the index of an existing dataset
+BUILD_BATCH_SIZE = 500
+
+# longer terms, e.g. encoded data, do not fit the term column and are not indexed
+MAX_TERM_LENGTH = 255
+
+
+class FullTextIndexConfig(BaseModel):
+    # bm25 term frequency saturation and segment length normalization
+    k1: float = 1.2
+    b: float = 0.75
+
+
+class FullTextIndex(BaseIndex):
+    """
+    BM25 full-text index of the segments of a dataset, backed by a `(dataset_id, term, index_node_id)`
+    posting table holding term frequencies and segment lengths, and a row of dataset statistics
+    (segment count and total length).
+
+    Search scores the postings of the query terms in the database and only loads the top k segments.
+    Adding or deleting segments only touches their own postings and the statistics.
+    """
+
+    def __init__(self, dataset: Dataset, config: FullTextIndexConfig = FullTextIndexConfig()):
+        super().__init__(dataset)
+        self._config = config
+
+    def create(self, texts: list[Document], **kwargs) -> BaseIndex:
+        self.add_texts(texts)
+        return self
+
+    def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
+        self.add_texts(texts)
+        return self
+
+    def add_texts(self, texts: list[Document], **kwargs):
+        """
+        Add texts to the full-text index, texts already in the index are replaced.
+
+        Texts without a document_id, e.g. annotation replies, are never searched by full text and are skipped.
+        While the index of the dataset is not built only the postings of the texts are added, the statistics
+        are counted by the build task.
+        """
+        nodes = {
+            text.metadata['doc_id']: (text.metadata['document_id'], text.page_content)
+            for text in texts if text.metadata.get('document_id')
+        }
+        if not nodes:
+            return
+
+        if not self.is_built():
+            dataset_full_text_index_was_missing.send(self.dataset)
+
+        self._delete_postings(DatasetFullTextPosting.index_node_id, list(nodes.keys()))
+        self._add_postings([(node_id, document_id, content) for node_id, (document_id, content) in nodes.items()])
+        db.session.commit()
+
+    def text_exists(self, id: str) -> bool:
+        posting = db.session.query(DatasetFullTextPosting.id).filter(
+            DatasetFullTextPosting.dataset_id == self.dataset.id,
+            DatasetFullTextPosting.index_node_id == id
+        ).first()
+
+        return posting is not None
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        self._delete_postings(DatasetFullTextPosting.index_node_id, ids)
+        db.session.commit()
+
+    def delete_by_document_id(self, document_id: str):
+        self._delete_postings(DatasetFullTextPosting.document_id, [document_id])
+        db.session.commit()
+
+    def delete_by_metadata_field(self, key: str, value: str):
+        if key == 'document_id':
+            self.delete_by_document_id(value)
+
+    def get_retriever(self, **kwargs: Any) -> BaseRetriever:
+        return FullTextIndexRetriever(index=self, **kwargs)
+
+    def search(
+            self, query: str,
+            **kwargs: Any
+    ) -> List[Document]:
+        if not self.is_built():
+            # the index of a dataset indexed before the full-text index existed is built by a task,
+            # building it here would tokenize the whole dataset in the request
+            dataset_full_text_index_was_missing.send(self.dataset)
+            return []
+
+        search_kwargs = kwargs.get('search_kwargs') if kwargs.get('search_kwargs') else {}
+        k = search_kwargs.get('k') if search_kwargs.get('k') else 4
+
+        sorted_chunk_indices = self._retrieve_ids_by_query(query, k)
+        if not sorted_chunk_indices:
+            return []
+
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_(sorted_chunk_indices)
+        ).all()
+        segment_map = {segment.index_node_id: segment for segment in segments}
+
+        documents = []
+        for chunk_index in sorted_chunk_indices:
+            segment = segment_map.get(chunk_index)
+            if segment:
+                documents.append(Document(
+                    page_content=segment.content,
+                    metadata={
+                        "doc_id": chunk_index,
+                        "document_id": segment.document_id,
+                        "dataset_id": segment.dataset_id,
+                    }
+                ))
+
+        return documents
+
+    def delete(self) -> None:
+        db.session.query(DatasetFullTextPosting).filter(
+            DatasetFullTextPosting.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+        db.session.query(DatasetFullTextIndex).filter(DatasetFullTextIndex.dataset_id == self.dataset.id).delete()
+        db.session.commit()
+
+    def delete_by_group_id(self, group_id: str) -> None:
+        self.delete()
+
+    def is_built(self) -> bool:
+        exists = db.session.query(DatasetFullTextIndex.id).filter(
+            DatasetFullTextIndex.dataset_id == self.dataset.id
+        ).first()
+
+        return exists is not None
+
+    def build(self) -> int:
+        """
+        Index the available segments of a dataset indexed before the full-text index existed, once.
+
+        The statistics row is inserted in the same transaction as the postings,
+        a concurrent build waits on its unique key and then finds the index built.
+
+        :return: number of indexed segments, 0 when the index was already built
+        """
+        if self.is_built():
+            return 0
+
+        created = db.session.execute(
+            insert(DatasetFullTextIndex).values(dataset_id=self.dataset.id)
+            .on_conflict_do_nothing(index_elements=['dataset_id'])
+            .returning(DatasetFullTextIndex.id)
+        ).first()
+        if not created:
+            return 0
+
+        count = 0
+        last_segment_id = None
+        while True:
+            query = db.session.query(
+                DocumentSegment.id,
+                DocumentSegment.index_node_id,
+                DocumentSegment.document_id,
+                DocumentSegment.content
+            ).join(
+                DatasetDocument, DatasetDocument.id == DocumentSegment.document_id
+            ).filter(
+                DatasetDocument.dataset_id == self.dataset.id,
+                DatasetDocument.indexing_status == 'completed',
+                DatasetDocument.enabled == True,
+                DatasetDocument.archived == False,
+                DocumentSegment.status == 'completed',
+                DocumentSegment.enabled == True
+            )
+            if last_segment_id:
+                query = query.filter(DocumentSegment.id > last_segment_id)
+
+            segments = query.order_by(DocumentSegment.id).limit(BUILD_BATCH_SIZE).all()
+            if not segments:
+                break
+
+            self._add_postings([(segment.index_node_id, segment.document_id, segment.content) for segment in segments])
+            count += len(segments)
+            last_segment_id = segments[-1].id
+
+        db.session.commit()
+        return count
+
+    def _add_postings(self, nodes: List[Tuple[str, str, str]]):
+        """
+        :param nodes: (index_node_id, document_id, content) of segments that have no postings
+        """
+        keyword_table_handler = JiebaKeywordTableHandler()
+        postings = []
+        document_count = 0
+        total_length = 0
+        for node_id, document_id, content in nodes:
+            terms = [term for term in keyword_table_handler.tokenize(content) if len(term) <= MAX_TERM_LENGTH]
+            if not terms:
+                continue
+
+            document_count += 1
+            total_length += len(terms)
+            postings.extend(
+                {
+                    'dataset_id': self.dataset.id,
+                    'term': term,
+                    'index_node_id': node_id,
+                    'document_id': document_id,
+                    'term_frequency': term_frequency,
+                    'document_length': len(terms)
+                }
+                for term, term_frequency in Counter(terms).items()
+            )
+
+        for i in range(0, len(postings), POSTING_BATCH_SIZE):
+            stmt = insert(DatasetFullTextPosting).values(postings[i:i + POSTING_BATCH_SIZE]) \
+                .on_conflict_do_nothing(index_elements=['dataset_id', 'term', 'index_node_id'])
+            db.session.execute(stmt)
+
+        self._update_statistics(document_count, total_length)
+
+    def _delete_postings(self, column, values: list):
+        """Delete the postings whose `column` is one of `values`, and their segments from the statistics."""
+        document_lengths = {}
+        for i in range(0, len(values), POSTING_BATCH_SIZE):
+            # only the rows deleted by this statement are returned, so concurrent deletes are not counted twice
+            rows = db.session.execute(
+                delete(DatasetFullTextPosting).where(
+                    DatasetFullTextPosting.dataset_id == self.dataset.id,
+                    column.in_(values[i:i + POSTING_BATCH_SIZE])
+                ).returning(DatasetFullTextPosting.index_node_id, DatasetFullTextPosting.document_length)
+            ).all()
+            document_lengths.update({row.index_node_id: row.document_length for row in rows})
+
+        self._update_statistics(-len(document_lengths), -sum(document_lengths.values()))
+
+    def _update_statistics(self, document_count: int, total_length: int):
+        if not document_count:
+            return
+
+        db.session.query(DatasetFullTextIndex).filter(DatasetFullTextIndex.dataset_id == self.dataset.id).update({
+            DatasetFullTextIndex.document_count: DatasetFullTextIndex.document_count + document_count,
+            DatasetFullTextIndex.total_length: DatasetFullTextIndex.total_length + total_length
+        }, synchronize_session=False)
+
+    def _retrieve_ids_by_query(self, query: str, k: int = 4) -> List[str]:
+        keyword_table_handler = JiebaKeywordTableHandler()
+        query_terms = Counter(term for term in keyword_table_handler.tokenize(query) if len(term) <= MAX_TERM_LENGTH)
+        if not query_terms:
+            return []
+
+        statistics = db.session.query(DatasetFullTextIndex).filter(
+            DatasetFullTextIndex.dataset_id == self.dataset.id
+        ).first()
+        if not statistics or statistics.document_count <= 0:
+            return []
+
+        document_frequencies = db.session.query(
+            DatasetFullTextPosting.term,
+            func.count(DatasetFullTextPosting.id)
+        ).filter(
+            DatasetFullTextPosting.dataset_id == self.dataset.id,
+            DatasetFullTextPosting.term.in_(list(query_terms.keys()))
+        ).group_by(DatasetFullTextPosting.term).all()
+        if not document_frequencies:
+            return []
+
+        weights = {
+            term: query_terms[term] * self._idf(document_frequency, statistics.document_count)
+            for term, document_frequency in document_frequencies
+        }
+
+        # bm25 of every segment containing a query term, summed over its matching terms
+        k1 = self._config.k1
+        b = self._config.b
+        average_length = statistics.total_length / statistics.document_count
+        term_frequency = DatasetFullTextPosting.term_frequency
+        score = func.sum(
+            case(weights, value=DatasetFullTextPosting.term, else_=0.0) * term_frequency * (k1 + 1)
+            / (term_frequency + k1 * (1 - b + b * DatasetFullTextPosting.document_length / average_length))
+        ).label('score')
+
+        rows = db.session.query(DatasetFullTextPosting.index_node_id, score).filter(
+            DatasetFullTextPosting.dataset_id == self.dataset.id,
+            DatasetFullTextPosting.term.in_(list(weights.keys()))
+        ).group_by(DatasetFullTextPosting.index_node_id) \
+            .order_by(score.desc(), DatasetFullTextPosting.index_node_id).limit(k).all()
+
+        return [row.index_node_id for row in rows]
+
+    @staticmethod
+    def _idf(document_frequency: int, document_count: int) -> float:
+        # never negative, so a term in most segments still adds a little to the score
+        return math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+class FullTextIndexRetriever(BaseRetriever, BaseModel):
+    index: FullTextIndex
+    search_kwargs: dict = Field(default_factory=dict)
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        extra = Extra.forbid
+        arbitrary_types_allowed = True
+
+    def get_relevant_documents(self, query: str) -> List[Document]:
+        """Get documents relevant for a query.
+
+        Args:
+            query: string to find relevant documents for
+
+        Returns:
+            List of relevant documents
+        """
+        return self.index.search(query, **self.search_kwargs)
+
+    async def aget_relevant_documents(self, query: str) -> List[Document]:
+        raise NotImplementedError("FullTextIndexRetriever does not support async")
@@ -1,5 +1,5 @@
 import re
-from typing import Set
+from typing import List, Set
 
 import jieba
 from jieba.analyse import default_tfidf
@@ -21,6 +21,19 @@ class JiebaKeywordTableHandler:
 
         return set(self._expand_tokens_with_subtokens(keywords))
 
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Split text into lower-cased terms with JIEBA search mode, filtering for stopwords and punctuation.
+        Search mode also yields the shorter words inside long CJK words, so a query matches either form.
+        """
+        tokens = []
+        for token in jieba.cut_for_search(text):
+            token = token.strip().lower()
+            if token and token not in STOPWORDS and re.search(r"\w", token):
+                tokens.append(token)
+
+        return tokens
+
     def _expand_tokens_with_subtokens(self, tokens: Set[str]) -> Set[str]:
         """Get subtokens from a list of tokens., filtering for stopwords."""
         results = set()
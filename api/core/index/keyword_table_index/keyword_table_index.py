@@ -1,14 +1,19 @@
-import json
-from collections import defaultdict
-from typing import Any, List, Optional, Dict
+from typing import Any, List, Dict
 
 from langchain.schema import Document, BaseRetriever
 from pydantic import BaseModel, Field, Extra
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
 
 from core.index.base import BaseIndex
 from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from extensions.ext_database import db
-from models.dataset import Dataset, DocumentSegment, DatasetKeywordTable
+from models.dataset import Dataset, DocumentSegment, DatasetKeywordTable, DatasetKeyword
+
+# max number of rows / ids in a single insert or `IN (...)` clause
+KEYWORD_BATCH_SIZE = 1000
+# length of the keyword column of the postings
+KEYWORD_MAX_LENGTH = 255
 
 
 class KeywordTableConfig(BaseModel):
@@ -16,96 +21,73 @@ class KeywordTableConfig(BaseModel):
 
 
 class KeywordTableIndex(BaseIndex):
+    """
+    Keyword index backed by a `(dataset_id, keyword, index_node_id)` posting table,
+    so that indexing and deleting only touch the affected postings and search
+    only reads the postings of the query keywords.
+    """
+
     def __init__(self, dataset: Dataset, config: KeywordTableConfig = KeywordTableConfig()):
         super().__init__(dataset)
         self._config = config
 
     def create(self, texts: list[Document], **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
-
+        self.add_texts(texts)
         return self
 
     def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
-
+        self.add_texts(texts)
         return self
 
     def add_texts(self, texts: list[Document], **kwargs):
-        keyword_table_handler = JiebaKeywordTableHandler()
+        """
+        Add texts to the keyword index.
+
+        With `use_segment_keywords`, keywords already saved on the segments (e.g. by the docstore)
+        are reused instead of being extracted again.
+        """
+        segment_keywords = {}
+        if kwargs.get('use_segment_keywords', False):
+            segment_keywords = {
+                node_id: keywords
+                for node_id, keywords in self._get_segments_keywords([text.metadata['doc_id'] for text in texts]).items()
+                if keywords
+            }
 
-        keyword_table = self._get_dataset_keyword_table()
+        keyword_table_handler = JiebaKeywordTableHandler()
+        node_keywords = {}
         for text in texts:
+            if text.metadata['doc_id'] in segment_keywords:
+                continue
             keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
+            node_keywords[text.metadata['doc_id']] = list(keywords)
 
-        self._save_dataset_keyword_table(keyword_table)
+        self._update_segments_keywords(node_keywords)
+        self._add_postings({**segment_keywords, **node_keywords})
+        db.session.commit()
 
     def text_exists(self, id: str) -> bool:
-        keyword_table = self._get_dataset_keyword_table()
-        return id in set.union(*keyword_table.values())
+        posting = db.session.query(DatasetKeyword.id).filter(
+            DatasetKeyword.dataset_id == self.dataset.id,
+            DatasetKeyword.index_node_id == id
+        ).first()
 
-    def delete_by_ids(self, ids: list[str]) -> None:
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
+        return posting is not None
 
-        self._save_dataset_keyword_table(keyword_table)
+    def delete_by_ids(self, ids: list[str]) -> None:
+        self._delete_postings(ids)
+        db.session.commit()
 
     def delete_by_document_id(self, document_id: str):
         # get segment ids by document_id
-        segments = db.session.query(DocumentSegment).filter(
+        segments = db.session.query(DocumentSegment.index_node_id).filter(
             DocumentSegment.dataset_id == self.dataset.id,
             DocumentSegment.document_id == document_id
         ).all()
 
         ids = [segment.index_node_id for segment in segments]
 
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.delete_by_ids(ids)
 
     def delete_by_metadata_field(self, key: str, value: str):
         pass
@@ -117,20 +99,22 @@ class KeywordTableIndex(BaseIndex):
             self, query: str,
             **kwargs: Any
     ) -> List[Document]:
-        keyword_table = self._get_dataset_keyword_table()
-
         search_kwargs = kwargs.get('search_kwargs') if kwargs.get('search_kwargs') else {}
         k = search_kwargs.get('k') if search_kwargs.get('k') else 4
 
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table, query, k)
+        sorted_chunk_indices = self._retrieve_ids_by_query(query, k)
+        if not sorted_chunk_indices:
+            return []
+
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_(sorted_chunk_indices)
+        ).all()
+        segment_map = {segment.index_node_id: segment for segment in segments}
 
         documents = []
         for chunk_index in sorted_chunk_indices:
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id,
-                DocumentSegment.index_node_id == chunk_index
-            ).first()
-
+            segment = segment_map.get(chunk_index)
             if segment:
                 documents.append(Document(
                     page_content=segment.content,
@@ -144,131 +128,132 @@ class KeywordTableIndex(BaseIndex):
         return documents
 
     def delete(self) -> None:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            db.session.delete(dataset_keyword_table)
-            db.session.commit()
+        db.session.query(DatasetKeyword).filter(DatasetKeyword.dataset_id == self.dataset.id).delete()
+        db.session.query(DatasetKeywordTable).filter(DatasetKeywordTable.dataset_id == self.dataset.id).delete()
+        db.session.commit()
 
     def delete_by_group_id(self, group_id: str) -> None:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
+        self.delete()
+
+    def migrate_legacy_keyword_table(self) -> int:
+        """
+        Convert the legacy per-dataset JSON keyword tables into postings and drop them.
+        Run by the `convert-dataset-keyword-tables` command, not on the request path.
+
+        :return: number of converted postings
+        """
+        # older databases may hold several legacy tables of the same dataset, all of them are merged
+        dataset_keyword_tables = db.session.query(DatasetKeywordTable).filter(
+            DatasetKeywordTable.dataset_id == self.dataset.id
+        ).all()
+        if not dataset_keyword_tables:
+            return 0
+
+        node_keywords: Dict[str, List[str]] = {}
+        for dataset_keyword_table in dataset_keyword_tables:
+            keyword_table_dict = dataset_keyword_table.keyword_table_dict
+            keyword_table = keyword_table_dict['__data__']['table'] if keyword_table_dict else {}
+            for keyword, node_ids in keyword_table.items():
+                for node_id in node_ids:
+                    node_keywords.setdefault(node_id, []).append(keyword)
+
+        posting_count = self._add_postings(node_keywords)
+        for dataset_keyword_table in dataset_keyword_tables:
             db.session.delete(dataset_keyword_table)
-            db.session.commit()
-
-    def _save_dataset_keyword_table(self, keyword_table):
-        keyword_table_dict = {
-            '__type__': 'keyword_table',
-            '__data__': {
-                "index_id": self.dataset.id,
-                "summary": None,
-                "table": keyword_table
-            }
-        }
-        self.dataset.dataset_keyword_table.keyword_table = json.dumps(keyword_table_dict, cls=SetEncoder)
         db.session.commit()
 
-    def _get_dataset_keyword_table(self) -> Optional[dict]:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            if dataset_keyword_table.keyword_table_dict:
-                return dataset_keyword_table.keyword_table_dict['__data__']['table']
-        else:
-            dataset_keyword_table = DatasetKeywordTable(
-                dataset_id=self.dataset.id,
-                keyword_table=json.dumps({
-                    '__type__': 'keyword_table',
-                    '__data__': {
-                        "index_id": self.dataset.id,
-                        "summary": None,
-                        "table": {}
-                    }
-                }, cls=SetEncoder)
-            )
-            db.session.add(dataset_keyword_table)
-            db.session.commit()
-
-        return {}
-
-    def _add_text_to_keyword_table(self, keyword_table: dict, id: str, keywords: list[str]) -> dict:
-        for keyword in keywords:
-            if keyword not in keyword_table:
-                keyword_table[keyword] = set()
-            keyword_table[keyword].add(id)
-        return keyword_table
-
-    def _delete_ids_from_keyword_table(self, keyword_table: dict, ids: list[str]) -> dict:
-        # get set of ids that correspond to node
-        node_idxs_to_delete = set(ids)
-
-        # delete node_idxs from keyword to node idxs mapping
-        keywords_to_delete = set()
-        for keyword, node_idxs in keyword_table.items():
-            if node_idxs_to_delete.intersection(node_idxs):
-                keyword_table[keyword] = node_idxs.difference(
-                    node_idxs_to_delete
-                )
-                if not keyword_table[keyword]:
-                    keywords_to_delete.add(keyword)
-
-        for keyword in keywords_to_delete:
-            del keyword_table[keyword]
-
-        return keyword_table
-
-    def _retrieve_ids_by_query(self, keyword_table: dict, query: str, k: int = 4):
+        return posting_count
+
+    def _add_postings(self, node_keywords: Dict[str, List[str]]) -> int:
+        # keywords longer than the keyword column, e.g. long user supplied segment keywords, are not indexed
+        postings = [
+            {
+                'dataset_id': self.dataset.id,
+                'keyword': keyword,
+                'index_node_id': node_id
+            }
+            for node_id, keywords in node_keywords.items()
+            for keyword in set(keywords)
+            if len(keyword) <= KEYWORD_MAX_LENGTH
+        ]
+
+        for i in range(0, len(postings), KEYWORD_BATCH_SIZE):
+            stmt = insert(DatasetKeyword).values(postings[i:i + KEYWORD_BATCH_SIZE]) \
+                .on_conflict_do_nothing(index_elements=['dataset_id', 'keyword', 'index_node_id'])
+            db.session.execute(stmt)
+
+        return len(postings)
+
+    def _delete_postings(self, ids: list[str]):
+        for i in range(0, len(ids), KEYWORD_BATCH_SIZE):
+            db.session.query(DatasetKeyword).filter(
+                DatasetKeyword.dataset_id == self.dataset.id,
+                DatasetKeyword.index_node_id.in_(ids[i:i + KEYWORD_BATCH_SIZE])
+            ).delete(synchronize_session=False)
+
+    def _retrieve_ids_by_query(self, query: str, k: int = 4):
         keyword_table_handler = JiebaKeywordTableHandler()
-        keywords = keyword_table_handler.extract_keywords(query)
+        keywords = list(keyword_table_handler.extract_keywords(query))
+        if not keywords:
+            return []
 
         # go through text chunks in order of most matching keywords
-        chunk_indices_count: Dict[str, int] = defaultdict(int)
-        keywords = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
-        for keyword in keywords:
-            for node_id in keyword_table[keyword]:
-                chunk_indices_count[node_id] += 1
-
-        sorted_chunk_indices = sorted(
-            list(chunk_indices_count.keys()),
-            key=lambda x: chunk_indices_count[x],
-            reverse=True,
-        )
-
-        return sorted_chunk_indices[: k]
-
-    def _update_segment_keywords(self, dataset_id: str, node_id: str, keywords: List[str]):
-        document_segment = db.session.query(DocumentSegment).filter(
-            DocumentSegment.dataset_id == dataset_id,
-            DocumentSegment.index_node_id == node_id
-        ).first()
-        if document_segment:
-            document_segment.keywords = keywords
-            db.session.commit()
+        match_count = func.count(DatasetKeyword.id).label('match_count')
+        rows = db.session.query(DatasetKeyword.index_node_id, match_count).filter(
+            DatasetKeyword.dataset_id == self.dataset.id,
+            DatasetKeyword.keyword.in_(keywords)
+        ).group_by(DatasetKeyword.index_node_id).order_by(match_count.desc()).limit(k).all()
+
+        return [row.index_node_id for row in rows]
+
+    def _get_segments_keywords(self, node_ids: List[str]) -> Dict[str, List[str]]:
+        segments_keywords = {}
+        for i in range(0, len(node_ids), KEYWORD_BATCH_SIZE):
+            document_segments = db.session.query(DocumentSegment.index_node_id, DocumentSegment.keywords).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + KEYWORD_BATCH_SIZE])
+            ).all()
+
+            for document_segment in document_segments:
+                segments_keywords[document_segment.index_node_id] = document_segment.keywords
+
+        return segments_keywords
+
+    def _update_segments_keywords(self, node_keywords: Dict[str, List[str]]):
+        node_ids = list(node_keywords.keys())
+        for i in range(0, len(node_ids), KEYWORD_BATCH_SIZE):
+            document_segments = db.session.query(DocumentSegment).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + KEYWORD_BATCH_SIZE])
+            ).all()
+
+            for document_segment in document_segments:
+                document_segment.keywords = node_keywords[document_segment.index_node_id]
 
     def create_segment_keywords(self, node_id: str, keywords: List[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        self._update_segment_keywords(self.dataset.id, node_id, keywords)
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        self._update_segments_keywords({node_id: keywords})
+        self._add_postings({node_id: keywords})
+        db.session.commit()
 
     def multi_create_segment_keywords(self, pre_segment_data_list: list):
         keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = self._get_dataset_keyword_table()
+        node_keywords = {}
         for pre_segment_data in pre_segment_data_list:
             segment = pre_segment_data['segment']
             if pre_segment_data['keywords']:
                 segment.keywords = pre_segment_data['keywords']
-                keyword_table = self._add_text_to_keyword_table(keyword_table, segment.index_node_id,
-                                                                pre_segment_data['keywords'])
             else:
                 keywords = keyword_table_handler.extract_keywords(segment.content,
                                                                   self._config.max_keywords_per_chunk)
                 segment.keywords = list(keywords)
-                keyword_table = self._add_text_to_keyword_table(keyword_table, segment.index_node_id, list(keywords))
-        self._save_dataset_keyword_table(keyword_table)
+            node_keywords[segment.index_node_id] = segment.keywords
+
+        self._add_postings(node_keywords)
+        db.session.commit()
 
     def update_segment_keywords_index(self, node_id: str, keywords: List[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        self._add_postings({node_id: keywords})
+        db.session.commit()
 
 
 class KeywordTableRetriever(BaseRetriever, BaseModel):
@@ -294,10 +279,3 @@ class KeywordTableRetriever(BaseRetriever, BaseModel):
 
     async def aget_relevant_documents(self, query: str) -> List[Document]:
         raise NotImplementedError("KeywordTableRetriever does not support async")
-
-
-class SetEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return super().default(obj)
@@ -1,7 +1,8 @@
 import json
 import logging
+import time
 from abc import abstractmethod
-from typing import List, Any, cast
+from typing import List, Any, cast, Iterator, Optional
 
 from langchain.embeddings.base import Embeddings
 from langchain.schema import Document, BaseRetriever
@@ -10,9 +11,37 @@ from weaviate import UnexpectedStatusCodeException
 
 from core.index.base import BaseIndex
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from models.dataset import Dataset, DocumentSegment, DatasetCollectionBinding
 from models.dataset import Document as DatasetDocument
 
+# max number of segments loaded and upserted at once when rebuilding an index
+REBUILD_BATCH_SIZE = 500
+
+# last upserted segment id of an interrupted rebuild and the index it was written to,
+# so a retried rebuild of the same index resumes after it
+REBUILD_CHECKPOINT_KEY = 'vector_index_rebuild_checkpoint:{dataset_id}:{operation}'
+REBUILD_OPERATIONS = ['recreate', 'create_qdrant', 'restore_in_one']
+REBUILD_PROGRESS_KEY = 'vector_index_rebuild_progress:{dataset_id}'
+REBUILD_KEY_TTL = 7 * 24 * 3600
+
+
+def get_rebuild_progress(dataset_id: str) -> Optional[dict]:
+    """
+    Progress of the latest index rebuild of a dataset, None when it never ran or expired.
+    """
+    progress = redis_client.get(REBUILD_PROGRESS_KEY.format(dataset_id=dataset_id))
+    return json.loads(progress) if progress else None
+
+
+def clear_rebuild_checkpoints(dataset_id: str):
+    """
+    Drop the checkpoints of interrupted index rebuilds of a dataset, the next rebuild starts from scratch.
+    """
+    redis_client.delete(*[
+        REBUILD_CHECKPOINT_KEY.format(dataset_id=dataset_id, operation=operation) for operation in REBUILD_OPERATIONS
+    ])
+
 
 class BaseVectorIndex(BaseIndex):
 
@@ -114,8 +143,7 @@ class BaseVectorIndex(BaseIndex):
         vector_store = self._get_vector_store()
         vector_store = cast(self._get_vector_store_class(), vector_store)
 
-        for node_id in ids:
-            vector_store.del_text(node_id)
+        vector_store.delete_by_ids(ids)
 
     def delete_by_group_id(self, group_id: str) -> None:
         vector_store = self._get_vector_store()
@@ -131,60 +159,40 @@ class BaseVectorIndex(BaseIndex):
 
         vector_store.delete()
 
+    def is_origin(self) -> bool:
+        """Whether the index is in its original layout, add_texts recreates it first."""
+        return self._is_origin()
+
     def _is_origin(self):
         return False
 
     def recreate_dataset(self, dataset: Dataset):
         logging.info(f"Recreating dataset {dataset.id}")
 
-        try:
-            self.delete()
-        except UnexpectedStatusCodeException as e:
-            if e.status_code != 400:
-                # 400 means index not exists
-                raise e
-
-        dataset_documents = db.session.query(DatasetDocument).filter(
-            DatasetDocument.dataset_id == dataset.id,
-            DatasetDocument.indexing_status == 'completed',
-            DatasetDocument.enabled == True,
-            DatasetDocument.archived == False,
-        ).all()
-
-        documents = []
-        for dataset_document in dataset_documents:
-            segments = db.session.query(DocumentSegment).filter(
-                DocumentSegment.document_id == dataset_document.id,
-                DocumentSegment.status == 'completed',
-                DocumentSegment.enabled == True
-            ).all()
-
-            for segment in segments:
-                document = Document(
-                    page_content=segment.content,
-                    metadata={
-                        "doc_id": segment.index_node_id,
-                        "doc_hash": segment.index_node_hash,
-                        "document_id": segment.document_id,
-                        "dataset_id": segment.dataset_id,
-                    }
-                )
-
-                documents.append(document)
+        target = self._get_rebuild_target(dataset)
+        resume_after = self._get_rebuild_checkpoint(dataset, 'recreate', target)
+        if resume_after is None:
+            try:
+                self.delete()
+            except UnexpectedStatusCodeException as e:
+                if e.status_code != 400:
+                    # 400 means index not exists
+                    raise e
 
-        origin_index_struct = self.dataset.index_struct[:]
+        origin_index_struct = self.dataset.index_struct[:] if self.dataset.index_struct else None
         self.dataset.index_struct = None
 
-        if documents:
-            try:
-                self.create(documents)
-            except Exception as e:
-                self.dataset.index_struct = origin_index_struct
-                raise e
+        try:
+            created = self._rebuild(dataset, 'recreate', target, create=True, resume_after=resume_after)
+        except Exception as e:
+            self.dataset.index_struct = origin_index_struct
+            raise e
 
+        if created:
             dataset.index_struct = json.dumps(self.to_index_struct())
 
         db.session.commit()
+        self._complete_rebuild(dataset, 'recreate')
 
         self.dataset = dataset
         logging.info(f"Dataset {dataset.id} recreate successfully.")
@@ -192,46 +200,18 @@ class BaseVectorIndex(BaseIndex):
     def create_qdrant_dataset(self, dataset: Dataset):
         logging.info(f"create_qdrant_dataset {dataset.id}")
 
-        try:
-            self.delete()
-        except UnexpectedStatusCodeException as e:
-            if e.status_code != 400:
-                # 400 means index not exists
-                raise e
-
-        dataset_documents = db.session.query(DatasetDocument).filter(
-            DatasetDocument.dataset_id == dataset.id,
-            DatasetDocument.indexing_status == 'completed',
-            DatasetDocument.enabled == True,
-            DatasetDocument.archived == False,
-        ).all()
-
-        documents = []
-        for dataset_document in dataset_documents:
-            segments = db.session.query(DocumentSegment).filter(
-                DocumentSegment.document_id == dataset_document.id,
-                DocumentSegment.status == 'completed',
-                DocumentSegment.enabled == True
-            ).all()
-
-            for segment in segments:
-                document = Document(
-                    page_content=segment.content,
-                    metadata={
-                        "doc_id": segment.index_node_id,
-                        "doc_hash": segment.index_node_hash,
-                        "document_id": segment.document_id,
-                        "dataset_id": segment.dataset_id,
-                    }
-                )
-
-                documents.append(document)
-
-        if documents:
+        target = self._get_rebuild_target(dataset)
+        resume_after = self._get_rebuild_checkpoint(dataset, 'create_qdrant', target)
+        if resume_after is None:
             try:
-                self.create(documents)
-            except Exception as e:
-                raise e
+                self.delete()
+            except UnexpectedStatusCodeException as e:
+                if e.status_code != 400:
+                    # 400 means index not exists
+                    raise e
+
+        self._rebuild(dataset, 'create_qdrant', target, create=True, resume_after=resume_after)
+        self._complete_rebuild(dataset, 'create_qdrant')
 
         logging.info(f"Dataset {dataset.id} recreate successfully.")
 
@@ -262,23 +242,89 @@ class BaseVectorIndex(BaseIndex):
     def restore_dataset_in_one(self, dataset: Dataset, dataset_collection_binding: DatasetCollectionBinding):
         logging.info(f"restore dataset in_one,_dataset {dataset.id}")
 
-        dataset_documents = db.session.query(DatasetDocument).filter(
-            DatasetDocument.dataset_id == dataset.id,
-            DatasetDocument.indexing_status == 'completed',
-            DatasetDocument.enabled == True,
-            DatasetDocument.archived == False,
-        ).all()
-
-        documents = []
-        for dataset_document in dataset_documents:
-            segments = db.session.query(DocumentSegment).filter(
-                DocumentSegment.document_id == dataset_document.id,
-                DocumentSegment.status == 'completed',
-                DocumentSegment.enabled == True
-            ).all()
-
-            for segment in segments:
-                document = Document(
+        target = self._get_rebuild_target(dataset)
+        resume_after = self._get_rebuild_checkpoint(dataset, 'restore_in_one', target)
+        self._rebuild(dataset, 'restore_in_one', target, create=False, resume_after=resume_after)
+        self._complete_rebuild(dataset, 'restore_in_one')
+
+        logging.info(f"Dataset {dataset.id} recreate successfully.")
+
+    def _rebuild(self, dataset: Dataset, operation: str, target: str, create: bool,
+                 resume_after: Optional[str] = None) -> bool:
+        """
+        Stream the available segments of the dataset into the index in batches of REBUILD_BATCH_SIZE.
+
+        A checkpoint is saved after every batch, an interrupted rebuild of the same `target` called again
+        with the checkpoint as `resume_after` continues with the next batch.
+
+        :param create: create the index with the first batch, otherwise add to the existing index
+        :return: whether any segment was indexed
+        """
+        total = self._get_available_segments_query(dataset).count()
+        processed = 0
+        if resume_after:
+            processed = self._get_available_segments_query(dataset).filter(DocumentSegment.id <= resume_after).count()
+            logging.info(f"Resuming {operation} of dataset {dataset.id} after {processed} segments")
+
+        self._set_rebuild_progress(dataset, operation, 'indexing', processed, total)
+
+        indexed = resume_after is not None
+        try:
+            for last_segment_id, documents in self._iter_segment_batches(dataset, resume_after):
+                if create and not indexed:
+                    self.create(documents)
+                else:
+                    self._add_rebuild_batch(documents)
+
+                indexed = True
+                processed += len(documents)
+                redis_client.setex(
+                    REBUILD_CHECKPOINT_KEY.format(dataset_id=dataset.id, operation=operation),
+                    REBUILD_KEY_TTL,
+                    json.dumps({'target': target, 'last_segment_id': last_segment_id})
+                )
+                self._set_rebuild_progress(dataset, operation, 'indexing', processed, total)
+        except Exception:
+            self._set_rebuild_progress(dataset, operation, 'error', processed, total)
+            raise
+
+        return indexed
+
+    def _add_rebuild_batch(self, documents: List[Document]):
+        """
+        Write a rebuild batch straight to the vector store, under the doc ids so a retried batch overwrites itself.
+        Unlike add_texts it never triggers a recreate of the dataset.
+        """
+        vector_store = self._get_vector_store()
+        vector_store = cast(self._get_vector_store_class(), vector_store)
+
+        vector_store.add_documents(documents, uuids=self._get_uuids(documents))
+
+    def _iter_segment_batches(self, dataset: Dataset, resume_after: Optional[str] = None) \
+            -> Iterator[tuple[str, List[Document]]]:
+        """
+        Page through the available segments ordered by id, without OFFSET, so every page is an index range scan.
+        Only the needed columns are loaded so pages are not kept in the session identity map.
+        """
+        last_segment_id = resume_after
+        while True:
+            query = self._get_available_segments_query(dataset).with_entities(
+                DocumentSegment.id,
+                DocumentSegment.content,
+                DocumentSegment.index_node_id,
+                DocumentSegment.index_node_hash,
+                DocumentSegment.document_id,
+                DocumentSegment.dataset_id
+            )
+            if last_segment_id:
+                query = query.filter(DocumentSegment.id > last_segment_id)
+
+            segments = query.order_by(DocumentSegment.id).limit(REBUILD_BATCH_SIZE).all()
+            if not segments:
+                return
+
+            documents = [
+                Document(
                     page_content=segment.content,
                     metadata={
                         "doc_id": segment.index_node_id,
@@ -287,16 +333,69 @@ class BaseVectorIndex(BaseIndex):
                         "dataset_id": segment.dataset_id,
                     }
                 )
+                for segment in segments
+            ]
 
-                documents.append(document)
+            last_segment_id = str(segments[-1].id)
+            yield last_segment_id, documents
 
-        if documents:
-            try:
-                self.add_texts(documents)
-            except Exception as e:
-                raise e
+    @staticmethod
+    def _get_available_segments_query(dataset: Dataset):
+        return db.session.query(DocumentSegment).join(
+            DatasetDocument, DatasetDocument.id == DocumentSegment.document_id
+        ).filter(
+            DatasetDocument.dataset_id == dataset.id,
+            DatasetDocument.indexing_status == 'completed',
+            DatasetDocument.enabled == True,
+            DatasetDocument.archived == False,
+            DocumentSegment.status == 'completed',
+            DocumentSegment.enabled == True
+        )
 
-        logging.info(f"Dataset {dataset.id} recreate successfully.")
+    def _get_rebuild_target(self, dataset: Dataset) -> str:
+        """The index and embedding model a rebuild writes to, a checkpoint only resumes a rebuild of the same."""
+        return f'{self.get_index_name(dataset)}:{dataset.embedding_model_provider}:{dataset.embedding_model}'
+
+    @staticmethod
+    def _get_rebuild_checkpoint(dataset: Dataset, operation: str, target: str) -> Optional[str]:
+        key = REBUILD_CHECKPOINT_KEY.format(dataset_id=dataset.id, operation=operation)
+        checkpoint = redis_client.get(key)
+        if not checkpoint:
+            return None
+
+        try:
+            checkpoint = json.loads(checkpoint)
+        except ValueError:
+            checkpoint = None
+
+        if not isinstance(checkpoint, dict) or checkpoint.get('target') != target:
+            # left by a rebuild of another index or embedding model, this one starts from scratch
+            logging.info(f"Dropping stale {operation} checkpoint of dataset {dataset.id}")
+            redis_client.delete(key)
+            return None
+
+        return checkpoint['last_segment_id']
+
+    @staticmethod
+    def _set_rebuild_progress(dataset: Dataset, operation: str, status: str, processed: int, total: int):
+        redis_client.setex(
+            REBUILD_PROGRESS_KEY.format(dataset_id=dataset.id),
+            REBUILD_KEY_TTL,
+            json.dumps({
+                'operation': operation,
+                'status': status,
+                'processed': processed,
+                'total': total,
+                'updated_at': int(time.time())
+            })
+        )
+
+    def _complete_rebuild(self, dataset: Dataset, operation: str):
+        redis_client.delete(REBUILD_CHECKPOINT_KEY.format(dataset_id=dataset.id, operation=operation))
+
+        progress = get_rebuild_progress(dataset.id) or {}
+        total = progress.get('total', 0)
+        self._set_rebuild_progress(dataset, operation, 'completed', total, total)
 
     def delete_original_collection(self, dataset: Dataset, dataset_collection_binding: DatasetCollectionBinding):
         logging.info(f"delete original collection: {dataset.id}")
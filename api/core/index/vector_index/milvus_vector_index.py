@@ -1,12 +1,15 @@
 from typing import cast, Any, List
+from uuid import uuid4
 
 from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
 from langchain.vectorstores import VectorStore
 from pydantic import BaseModel, root_validator
+from pymilvus import connections, utility
 
 from core.index.base import BaseIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_registry import vector_client_registry
 from core.vector_store.milvus_vector_store import MilvusVectorStore
 from models.dataset import Dataset
 
@@ -49,6 +52,27 @@ class MilvusVectorIndex(BaseVectorIndex):
     def get_type(self) -> str:
         return 'milvus'
 
+    def _get_connection_args(self) -> dict:
+        """
+        Connection args of the shared connection, identified by its pymilvus alias.
+        """
+        params = self._client_config.to_milvus_params()
+
+        def connect() -> str:
+            alias = uuid4().hex
+            connections.connect(alias=alias, **params)
+            return alias
+
+        alias = vector_client_registry.get(
+            self.get_type(),
+            params,
+            factory=connect,
+            health_check=lambda alias: utility.get_server_version(using=alias),
+            close=lambda alias: connections.disconnect(alias)
+        )
+
+        return {**params, 'alias': alias}
+
     def get_index_name(self, dataset: Dataset) -> str:
         if self.dataset.index_struct_dict:
             class_prefix: str = self.dataset.index_struct_dict['vector_store']['class_prefix']
@@ -78,7 +102,7 @@ class MilvusVectorIndex(BaseVectorIndex):
             texts,
             self._embeddings,
             collection_name=self.get_index_name(self.dataset),
-            connection_args=self._client_config.to_milvus_params(),
+            connection_args=self._get_connection_args(),
             index_params=index_params
         )
 
@@ -105,7 +129,7 @@ class MilvusVectorIndex(BaseVectorIndex):
         return MilvusVectorStore(
             collection_name=self.get_index_name(self.dataset),
             embedding_function=self._embeddings,
-            connection_args=self._client_config.to_milvus_params()
+            connection_args=self._get_connection_args()
         )
 
     def _get_vector_store_class(self) -> type:
@@ -135,10 +159,7 @@ class MilvusVectorIndex(BaseVectorIndex):
 
         vector_store = self._get_vector_store()
         vector_store = cast(self._get_vector_store_class(), vector_store)
-        ids = vector_store.get_ids_by_doc_ids(doc_ids)
-        vector_store.del_texts({
-            'filter': f' id in {ids}'
-        })
+        vector_store.delete_by_ids(doc_ids)
 
     def delete_by_group_id(self, group_id: str) -> None:
 
@@ -9,7 +9,9 @@ from pydantic import BaseModel
 from qdrant_client.http.models import HnswConfigDiff
 
 from core.index.base import BaseIndex
+from core.index.full_text_index.full_text_index import FullTextIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_registry import vector_client_registry
 from core.vector_store.qdrant_vector_store import QdrantVectorStore
 from extensions.ext_database import db
 from models.dataset import Dataset, DatasetCollectionBinding
@@ -79,8 +81,10 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_payload_key='group_id',
             hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
                                        max_indexing_threads=0, on_disk=False),
+            client=self._get_client(),
             **self._client_config.to_qdrant_params()
         )
+        self._get_full_text_index().add_texts(texts)
 
         return self
 
@@ -96,22 +100,46 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_payload_key='group_id',
             hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
                                        max_indexing_threads=0, on_disk=False),
+            client=self._get_client(),
             **self._client_config.to_qdrant_params()
         )
+        self._get_full_text_index().add_texts(texts)
 
         return self
 
+    def add_texts(self, texts: list[Document], **kwargs):
+        super().add_texts(texts, **kwargs)
+        self._get_full_text_index().add_texts(texts)
+
+    def _add_rebuild_batch(self, documents: List[Document]):
+        vector_store = self._get_vector_store()
+        vector_store = cast(self._get_vector_store_class(), vector_store)
+
+        vector_store.add_documents(documents, ids=self._get_uuids(documents))
+        self._get_full_text_index().add_texts(documents)
+
+    def _get_full_text_index(self) -> FullTextIndex:
+        return FullTextIndex(self.dataset)
+
+    def _get_client(self) -> qdrant_client.QdrantClient:
+        params = self._client_config.to_qdrant_params()
+
+        return vector_client_registry.get(
+            self.get_type(),
+            params,
+            factory=lambda: qdrant_client.QdrantClient(**params),
+            health_check=lambda client: client.get_collections(),
+            close=lambda client: client.close()
+        )
+
     def _get_vector_store(self) -> VectorStore:
         """Only for created index."""
         if self._vector_store:
             return self._vector_store
         attributes = ['doc_id', 'dataset_id', 'document_id']
-        client = qdrant_client.QdrantClient(
-            **self._client_config.to_qdrant_params()
-        )
 
         return QdrantVectorStore(
-            client=client,
+            client=self._get_client(),
             collection_name=self.get_index_name(self.dataset),
             embeddings=self._embeddings,
             content_payload_key='page_content',
@@ -137,6 +165,7 @@ class QdrantVectorIndex(BaseVectorIndex):
                 ),
             ],
         ))
+        self._get_full_text_index().delete_by_document_id(document_id)
 
     def delete_by_metadata_field(self, key: str, value: str):
 
@@ -159,16 +188,8 @@ class QdrantVectorIndex(BaseVectorIndex):
         vector_store = self._get_vector_store()
         vector_store = cast(self._get_vector_store_class(), vector_store)
 
-        from qdrant_client.http import models
-        for node_id in ids:
-            vector_store.del_texts(models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="metadata.doc_id",
-                        match=models.MatchValue(value=node_id),
-                    ),
-                ],
-            ))
+        vector_store.delete_by_ids(ids)
+        self._get_full_text_index().delete_by_ids(ids)
 
     def delete_by_group_id(self, group_id: str) -> None:
 
@@ -184,6 +205,7 @@ class QdrantVectorIndex(BaseVectorIndex):
                 ),
             ],
         ))
+        self._get_full_text_index().delete_by_group_id(group_id)
 
     def delete(self) -> None:
         vector_store = self._get_vector_store()
@@ -209,19 +231,4 @@ class QdrantVectorIndex(BaseVectorIndex):
         return False
 
     def search_by_full_text_index(self, query: str, **kwargs: Any) -> List[Document]:
-        vector_store = self._get_vector_store()
-        vector_store = cast(self._get_vector_store_class(), vector_store)
-
-        from qdrant_client.http import models
-        return vector_store.similarity_search_by_bm25(models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="group_id",
-                    match=models.MatchValue(value=self.dataset.id),
-                ),
-                models.FieldCondition(
-                    key="page_content",
-                    match=models.MatchText(text=query),
-                )
-            ],
-        ), kwargs.get('top_k', 2))
+        return self._get_full_text_index().search(query, search_kwargs={'k': kwargs.get('top_k', 2)})
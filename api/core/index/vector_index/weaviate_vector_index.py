@@ -9,6 +9,7 @@ from pydantic import BaseModel, root_validator
 
 from core.index.base import BaseIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_registry import vector_client_registry
 from core.vector_store.weaviate_vector_store import WeaviateVectorStore
 from models.dataset import Dataset
 
@@ -32,6 +33,14 @@ class WeaviateVectorIndex(BaseVectorIndex):
         self._client = self._init_client(config)
 
     def _init_client(self, config: WeaviateConfig) -> weaviate.Client:
+        return vector_client_registry.get(
+            self.get_type(),
+            config.dict(),
+            factory=lambda: self._create_client(config),
+            health_check=lambda client: client.is_ready()
+        )
+
+    def _create_client(self, config: WeaviateConfig) -> weaviate.Client:
         auth_config = weaviate.auth.AuthApiKey(api_key=config.api_key)
 
         weaviate.connect.connection.has_grpc = False
@@ -105,7 +114,6 @@ class WeaviateVectorIndex(BaseVectorIndex):
 
         return self
 
-
     def _get_vector_store(self) -> VectorStore:
         """Only for created index."""
         if self._vector_store:
@@ -5,14 +5,17 @@ import re
 import threading
 import time
 import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import Optional, List, cast
 
 from flask import current_app, Flask
 from flask_login import current_user
 from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
+from langchain.text_splitter import TextSplitter
 from sqlalchemy.orm.exc import ObjectDeletedError
 
+from core.cleaner.text_cleaner import TextCleaner, filter_string
 from core.data_loader.file_extractor import FileExtractor
 from core.data_loader.loader.notion import NotionLoader
 from core.docstore.dataset_docstore import DatasetDocumentStore
@@ -21,7 +24,7 @@ from core.index.index import IndexBuilder
 from core.model_providers.error import ProviderTokenNotInitError
 from core.model_providers.model_factory import ModelFactory
 from core.model_providers.models.entity.message import MessageType
-from core.spiltter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from core.spiltter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter, EnhanceRecursiveCharacterTextSplitter
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
@@ -255,8 +258,10 @@ class IndexingRunner:
             for document in documents:
                 if len(preview_texts) < 5:
                     preview_texts.append(document.page_content)
-                if indexing_technique == 'high_quality' or embedding_model:
-                    tokens += embedding_model.get_num_tokens(self.filter_string(document.page_content))
+            if indexing_technique == 'high_quality' or embedding_model:
+                tokens += sum(embedding_model.get_num_tokens_batch(
+                    [self.filter_string(document.page_content) for document in documents]
+                ))
 
         if doc_form and doc_form == 'qa_model':
             text_generation_model = ModelFactory.get_text_generation_model(
@@ -352,8 +357,10 @@ class IndexingRunner:
                 for document in documents:
                     if len(preview_texts) < 5:
                         preview_texts.append(document.page_content)
-                    if indexing_technique == 'high_quality' or embedding_model:
-                        tokens += embedding_model.get_num_tokens(document.page_content)
+                if indexing_technique == 'high_quality' or embedding_model:
+                    tokens += sum(embedding_model.get_num_tokens_batch(
+                        [document.page_content for document in documents]
+                    ))
 
         if doc_form and doc_form == 'qa_model':
             text_generation_model = ModelFactory.get_text_generation_model(
@@ -423,10 +430,7 @@ class IndexingRunner:
         return text_docs
 
     def filter_string(self, text):
-        text = re.sub(r'<\|', '<', text)
-        text = re.sub(r'\|>', '>', text)
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F\x80-\xFF]', '', text)
-        return text
+        return filter_string(text)
 
     def _get_splitter(self, processing_rule: DatasetProcessRule) -> TextSplitter:
         """
@@ -451,7 +455,7 @@ class IndexingRunner:
             )
         else:
             # Automatic segmentation
-            character_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            character_splitter = EnhanceRecursiveCharacterTextSplitter.from_tiktoken_encoder(
                 chunk_size=DatasetProcessRule.AUTOMATIC_RULES['segmentation']['max_tokens'],
                 chunk_overlap=0,
                 separators=["\n\n", "。", ".", " ", ""]
@@ -514,11 +518,9 @@ class IndexingRunner:
         """
         all_documents = []
         all_qa_documents = []
-        for text_doc in text_docs:
-            # document clean
-            document_text = self._document_clean(text_doc.page_content, processing_rule)
-            text_doc.page_content = document_text
-
+        cleaner = self._get_cleaner(processing_rule)
+        # document clean, page by page
+        for text_doc in cleaner.clean_documents(text_docs):
             # parse document to nodes
             documents = splitter.split_documents([text_doc])
             split_documents = []
@@ -578,11 +580,9 @@ class IndexingRunner:
         Split the text documents into nodes.
         """
         all_documents = []
-        for text_doc in text_docs:
-            # document clean
-            document_text = self._document_clean(text_doc.page_content, processing_rule)
-            text_doc.page_content = document_text
-
+        cleaner = self._get_cleaner(processing_rule)
+        # document clean, page by page
+        for text_doc in cleaner.clean_documents(text_docs):
             # parse document to nodes
             documents = splitter.split_documents([text_doc])
 
@@ -602,34 +602,22 @@ class IndexingRunner:
 
         return all_documents
 
-    def _document_clean(self, text: str, processing_rule: DatasetProcessRule) -> str:
+    def _get_cleaner(self, processing_rule: DatasetProcessRule) -> TextCleaner:
         """
-        Clean the document text according to the processing rules.
+        Build the text cleaner of the processing rule, once for all pages of the documents.
         """
         if processing_rule.mode == "automatic":
             rules = DatasetProcessRule.AUTOMATIC_RULES
         else:
             rules = json.loads(processing_rule.rules) if processing_rule.rules else {}
 
-        if 'pre_processing_rules' in rules:
-            pre_processing_rules = rules["pre_processing_rules"]
-            for pre_processing_rule in pre_processing_rules:
-                if pre_processing_rule["id"] == "remove_extra_spaces" and pre_processing_rule["enabled"] is True:
-                    # Remove extra spaces
-                    pattern = r'\n{3,}'
-                    text = re.sub(pattern, '\n\n', text)
-                    pattern = r'[\t\f\r\x20\u00a0\u1680\u180e\u2000-\u200a\u202f\u205f\u3000]{2,}'
-                    text = re.sub(pattern, ' ', text)
-                elif pre_processing_rule["id"] == "remove_urls_emails" and pre_processing_rule["enabled"] is True:
-                    # Remove email
-                    pattern = r'([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)'
-                    text = re.sub(pattern, '', text)
-
-                    # Remove URL
-                    pattern = r'https?://[^\s]+'
-                    text = re.sub(pattern, '', text)
-
-        return text
+        return TextCleaner(rules)
+
+    def _document_clean(self, text: str, processing_rule: DatasetProcessRule) -> str:
+        """
+        Clean the document text according to the processing rules.
+        """
+        return self._get_cleaner(processing_rule).clean(text)
 
     def format_split_text(self, text):
         regex = r"Q\d+:\s*(.*?)\s*A\d+:\s*([\s\S]*?)(?=Q\d+:|$)" 
@@ -646,8 +634,11 @@ class IndexingRunner:
     def _build_index(self, dataset: Dataset, dataset_document: DatasetDocument, documents: List[Document]) -> None:
         """
         Build the index for the document.
+
+        Chunks are pipelined: the vector index stage (embedding and upsert) of up to
+        INDEXING_MAX_WORKERS chunks runs on worker threads while this thread builds the
+        keyword index of the next chunks and marks finished chunks as completed.
         """
-        vector_index = IndexBuilder.get_index(dataset, 'high_quality')
         keyword_table_index = IndexBuilder.get_index(dataset, 'economy')
         embedding_model = None
         if dataset.indexing_technique == 'high_quality':
@@ -657,39 +648,56 @@ class IndexingRunner:
                 model_name=dataset.embedding_model
             )
 
+        flask_app = current_app._get_current_object()
+        max_workers = max(int(current_app.config.get('INDEXING_MAX_WORKERS', 1)), 1)
+
         # chunk nodes by chunk size
         indexing_start_at = time.perf_counter()
+        stage_latency = {
+            'vector_index': 0.0,
+            'keyword_index': 0.0,
+            'segment_update': 0.0
+        }
         tokens = 0
         chunk_size = 100
-        for i in range(0, len(documents), chunk_size):
-            # check document is paused
-            self._check_document_paused_status(dataset_document.id)
-            chunk_documents = documents[i:i + chunk_size]
-            if dataset.indexing_technique == 'high_quality' or embedding_model:
-                tokens += sum(
-                    embedding_model.get_num_tokens(document.page_content)
-                    for document in chunk_documents
-                )
-
-            # save vector index
-            if vector_index:
-                vector_index.add_texts(chunk_documents)
-
-            # save keyword index
-            keyword_table_index.add_texts(chunk_documents)
-
-            document_ids = [document.metadata['doc_id'] for document in chunk_documents]
-            db.session.query(DocumentSegment).filter(
-                DocumentSegment.document_id == dataset_document.id,
-                DocumentSegment.index_node_id.in_(document_ids),
-                DocumentSegment.status == "indexing"
-            ).update({
-                DocumentSegment.status: "completed",
-                DocumentSegment.enabled: True,
-                DocumentSegment.completed_at: datetime.datetime.utcnow()
-            })
-
-            db.session.commit()
+        # creating or recreating the vector index must happen once, the first chunk does it on this thread
+        setup_vector_index = dataset.indexing_technique == 'high_quality' and self._needs_vector_index_setup(dataset)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending_chunks = deque()
+            for i in range(0, len(documents), chunk_size):
+                # check document is paused
+                self._check_document_paused_status(dataset_document.id)
+                chunk_documents = documents[i:i + chunk_size]
+                if dataset.indexing_technique == 'high_quality' or embedding_model:
+                    tokens += sum(embedding_model.get_num_tokens_batch(
+                        [document.page_content for document in chunk_documents]
+                    ))
+
+                # save vector index
+                vector_future = None
+                if dataset.indexing_technique == 'high_quality' and setup_vector_index:
+                    vector_start_at = time.perf_counter()
+                    IndexBuilder.get_index(dataset, 'high_quality').add_texts(chunk_documents)
+                    vector_future = Future()
+                    vector_future.set_result(time.perf_counter() - vector_start_at)
+                    setup_vector_index = False
+                elif dataset.indexing_technique == 'high_quality':
+                    vector_future = executor.submit(self._build_vector_index, flask_app, dataset.id, chunk_documents)
+
+                # save keyword index
+                keyword_start_at = time.perf_counter()
+                keyword_table_index.add_texts(chunk_documents, use_segment_keywords=True)
+                stage_latency['keyword_index'] += time.perf_counter() - keyword_start_at
+
+                pending_chunks.append((vector_future, chunk_documents))
+
+                # bound the number of chunks in flight, and complete the ones already finished
+                while pending_chunks and (len(pending_chunks) >= max_workers
+                                          or pending_chunks[0][0] is None or pending_chunks[0][0].done()):
+                    self._complete_indexed_chunk(dataset_document, *pending_chunks.popleft(), stage_latency)
+
+            while pending_chunks:
+                self._complete_indexed_chunk(dataset_document, *pending_chunks.popleft(), stage_latency)
 
         indexing_end_at = time.perf_counter()
 
@@ -701,9 +709,57 @@ class IndexingRunner:
                 DatasetDocument.tokens: tokens,
                 DatasetDocument.completed_at: datetime.datetime.utcnow(),
                 DatasetDocument.indexing_latency: indexing_end_at - indexing_start_at,
+                DatasetDocument.indexing_stage_latency: stage_latency,
             }
         )
 
+    @staticmethod
+    def _needs_vector_index_setup(dataset: Dataset) -> bool:
+        """
+        Whether adding texts would create the vector index, or recreate it from its original layout.
+        """
+        if not dataset.index_struct_dict:
+            return True
+
+        vector_index = IndexBuilder.get_index(dataset, 'high_quality')
+        return vector_index is not None and vector_index.is_origin()
+
+    def _build_vector_index(self, flask_app: Flask, dataset_id: str, documents: List[Document]) -> float:
+        """
+        Embed and upsert a chunk of documents on a worker thread, returns the latency.
+        """
+        with flask_app.app_context():
+            try:
+                start_at = time.perf_counter()
+                dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
+                vector_index = IndexBuilder.get_index(dataset, 'high_quality')
+                if vector_index:
+                    vector_index.add_texts(documents)
+
+                return time.perf_counter() - start_at
+            finally:
+                db.session.remove()
+
+    def _complete_indexed_chunk(self, dataset_document: DatasetDocument, vector_future: Optional[Future],
+                                documents: List[Document], stage_latency: dict):
+        if vector_future:
+            stage_latency['vector_index'] += vector_future.result()
+
+        segment_update_start_at = time.perf_counter()
+        document_ids = [document.metadata['doc_id'] for document in documents]
+        db.session.query(DocumentSegment).filter(
+            DocumentSegment.document_id == dataset_document.id,
+            DocumentSegment.index_node_id.in_(document_ids),
+            DocumentSegment.status == "indexing"
+        ).update({
+            DocumentSegment.status: "completed",
+            DocumentSegment.enabled: True,
+            DocumentSegment.completed_at: datetime.datetime.utcnow()
+        })
+
+        db.session.commit()
+        stage_latency['segment_update'] += time.perf_counter() - segment_update_start_at
+
     def _check_document_paused_status(self, document_id: str):
         indexing_cache_key = 'document_{}_is_paused'.format(document_id)
         result = redis_client.get(indexing_cache_key)
@@ -1,3 +1,4 @@
+import logging
 from typing import Any, List, Dict
 
 from langchain.memory.chat_memory import BaseChatMemory
@@ -7,8 +8,12 @@ from core.file.message_file_parser import MessageFileParser
 from core.model_providers.models.entity.message import PromptMessage, MessageType, to_lc_messages
 from core.model_providers.models.llm.base import BaseLLM
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from models.model import Conversation, Message
 
+QUERY_TOKENS_CACHE_KEY = 'memory_query_tokens:{model_name}:{message_id}'
+QUERY_TOKENS_CACHE_TTL = 86400
+
 
 class ReadOnlyConversationTokenDBBufferSharedMemory(BaseChatMemory):
     conversation: Conversation
@@ -34,6 +39,8 @@ class ReadOnlyConversationTokenDBBufferSharedMemory(BaseChatMemory):
         message_file_parser = MessageFileParser(tenant_id=app_model.tenant_id, app_id=self.conversation.app_id)
 
         chat_messages: List[PromptMessage] = []
+        chat_message_tokens: List[int] = []
+        cached_query_tokens = self._get_cached_query_tokens(messages)
         for message in messages:
             files = message.message_files
             if files:
@@ -42,29 +49,66 @@ class ReadOnlyConversationTokenDBBufferSharedMemory(BaseChatMemory):
                 )
 
                 prompt_message_files = [file_obj.prompt_message_file for file_obj in file_objs]
-                chat_messages.append(PromptMessage(
+                query_message = PromptMessage(
                     content=message.query,
                     type=MessageType.USER,
                     files=prompt_message_files
-                ))
+                )
             else:
-                chat_messages.append(PromptMessage(content=message.query, type=MessageType.USER))
+                query_message = PromptMessage(content=message.query, type=MessageType.USER)
+
+            query_tokens = cached_query_tokens.get(message.id)
+            if query_tokens is None:
+                query_tokens = self.model_instance.get_num_tokens([query_message])
+                self._save_cached_query_tokens(message, query_tokens)
+
+            chat_messages.append(query_message)
+            chat_message_tokens.append(query_tokens)
 
             chat_messages.append(PromptMessage(content=message.answer, type=MessageType.ASSISTANT))
+            chat_message_tokens.append(message.answer_tokens)
 
         if not chat_messages:
             return []
 
-        # prune the chat message if it exceeds the max token limit
-        curr_buffer_length = self.model_instance.get_num_tokens(chat_messages)
-        if curr_buffer_length > self.max_token_limit:
-            pruned_memory = []
-            while curr_buffer_length > self.max_token_limit and chat_messages:
-                pruned_memory.append(chat_messages.pop(0))
-                curr_buffer_length = self.model_instance.get_num_tokens(chat_messages)
+        # prune the chat message if it exceeds the max token limit,
+        # each message is counted once and dropped from a running total
+        curr_buffer_length = sum(chat_message_tokens)
+        pruned_count = 0
+        while curr_buffer_length > self.max_token_limit and pruned_count < len(chat_messages):
+            curr_buffer_length -= chat_message_tokens[pruned_count]
+            pruned_count += 1
+
+        chat_messages = chat_messages[pruned_count:]
 
         return to_lc_messages(chat_messages)
 
+    def _get_cached_query_tokens(self, messages: List[Message]) -> Dict[str, int]:
+        """
+        Query token counts are computed once per message and model and kept in redis,
+        answers already carry their persisted answer_tokens.
+        """
+        if not messages:
+            return {}
+
+        cache_keys = [QUERY_TOKENS_CACHE_KEY.format(model_name=self.model_instance.name, message_id=message.id)
+                      for message in messages]
+
+        try:
+            cached_tokens = redis_client.mget(cache_keys)
+        except Exception:
+            logging.exception('Failed to get query tokens from cache')
+            return {}
+
+        return {message.id: int(cached) for message, cached in zip(messages, cached_tokens) if cached is not None}
+
+    def _save_cached_query_tokens(self, message: Message, query_tokens: int):
+        cache_key = QUERY_TOKENS_CACHE_KEY.format(model_name=self.model_instance.name, message_id=message.id)
+        try:
+            redis_client.setex(cache_key, QUERY_TOKENS_CACHE_TTL, query_tokens)
+        except Exception:
+            logging.exception('Failed to save query tokens to cache')
+
     @property
     def memory_variables(self) -> List[str]:
         """Will always return list of memory variables.
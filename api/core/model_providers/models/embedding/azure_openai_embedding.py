@@ -2,13 +2,13 @@ import decimal
 import logging
 
 import openai
-import tiktoken
 from langchain.embeddings import OpenAIEmbeddings
 
 from core.model_providers.error import LLMBadRequestError, LLMAuthorizationError, LLMRateLimitError, \
     LLMAPIUnavailableError, LLMAPIConnectionError
 from core.model_providers.models.embedding.base import BaseEmbedding
 from core.model_providers.providers.base import BaseModelProvider
+from core.model_providers.tokenizer import Tokenizer, get_tokenizer
 
 AZURE_OPENAI_API_VERSION = '2023-07-01-preview'
 
@@ -41,22 +41,14 @@ class AzureOpenAIEmbedding(BaseEmbedding):
         """
         return self.credentials.get("base_model_name")
 
-    def get_num_tokens(self, text: str) -> int:
+    @property
+    def tokenizer(self) -> Tokenizer:
         """
-        get num tokens of text.
+        get the tokenizer of the model.
 
-        :param text:
-        :return:
+        :return: Tokenizer
         """
-        if len(text) == 0:
-            return 0
-
-        enc = tiktoken.encoding_for_model(self.credentials.get('base_model_name'))
-
-        tokenized_text = enc.encode(text)
-
-        # calculate the number of tokens in the encoded text
-        return len(tokenized_text)
+        return get_tokenizer(self.credentials.get('base_model_name'))
 
     def handle_exceptions(self, ex: Exception) -> Exception:
         if isinstance(ex, openai.error.InvalidRequestError):
@@ -1,13 +1,11 @@
 from abc import abstractmethod
-from typing import Any
+from typing import Any, List
 import decimal
 
-import tiktoken
-from langchain.schema.language_model import _get_token_ids_default_method
-
 from core.model_providers.models.base import BaseProviderModel
 from core.model_providers.models.entity.model_params import ModelType
 from core.model_providers.providers.base import BaseModelProvider
+from core.model_providers.tokenizer import Tokenizer, get_tokenizer
 import logging
 logger = logging.getLogger(__name__)
 
@@ -76,6 +74,15 @@ class BaseEmbedding(BaseProviderModel):
         logger.debug(f'unit_price:{unit_price}')
         return unit_price
 
+    @property
+    def tokenizer(self) -> Tokenizer:
+        """
+        get the tokenizer estimating the tokens of the model, gpt2 by default.
+
+        :return: Tokenizer
+        """
+        return get_tokenizer()
+
     def get_num_tokens(self, text: str) -> int:
         """
         get num tokens of text.
@@ -86,7 +93,16 @@ class BaseEmbedding(BaseProviderModel):
         if len(text) == 0:
             return 0
 
-        return len(_get_token_ids_default_method(text))
+        return self.tokenizer.count(text)
+
+    def get_num_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        get num tokens of each text, encoded in one multi-threaded batch.
+
+        :param texts:
+        :return:
+        """
+        return self.tokenizer.count_batch(texts)
 
     def get_currency(self):
         """
@@ -2,13 +2,13 @@ import decimal
 import logging
 
 import openai
-import tiktoken
 from langchain.embeddings import OpenAIEmbeddings
 
 from core.model_providers.error import LLMBadRequestError, LLMAPIConnectionError, LLMAPIUnavailableError, \
     LLMRateLimitError, LLMAuthorizationError
 from core.model_providers.models.embedding.base import BaseEmbedding
 from core.model_providers.providers.base import BaseModelProvider
+from core.model_providers.tokenizer import Tokenizer, get_tokenizer
 
 
 class OpenAIEmbedding(BaseEmbedding):
@@ -25,22 +25,14 @@ class OpenAIEmbedding(BaseEmbedding):
 
         super().__init__(model_provider, client, name)
 
-    def get_num_tokens(self, text: str) -> int:
+    @property
+    def tokenizer(self) -> Tokenizer:
         """
-        get num tokens of text.
+        get the tokenizer of the model.
 
-        :param text:
-        :return:
+        :return: Tokenizer
         """
-        if len(text) == 0:
-            return 0
-
-        enc = tiktoken.encoding_for_model(self.name)
-
-        tokenized_text = enc.encode(text)
-
-        # calculate the number of tokens in the encoded text
-        return len(tokenized_text)
+        return get_tokenizer(self.name)
 
     def handle_exceptions(self, ex: Exception) -> Exception:
         if isinstance(ex, openai.error.InvalidRequestError):
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Any
+from typing import Any, List
 
 from core.model_providers.models.base import BaseProviderModel
 from core.model_providers.models.entity.model_params import ModelType
@@ -20,10 +20,19 @@ class BaseModeration(BaseProviderModel):
         except Exception as ex:
             raise self.handle_exceptions(ex)
 
+    def run_batch(self, texts: List[str]) -> List[bool]:
+        try:
+            return self._run_batch(texts)
+        except Exception as ex:
+            raise self.handle_exceptions(ex)
+
     @abstractmethod
     def _run(self, text: str) -> bool:
         raise NotImplementedError
 
+    def _run_batch(self, texts: List[str]) -> List[bool]:
+        return [self._run(text) for text in texts]
+
     @abstractmethod
     def handle_exceptions(self, ex: Exception) -> Exception:
         raise NotImplementedError
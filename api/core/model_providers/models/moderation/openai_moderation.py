@@ -1,4 +1,5 @@
 import logging
+from typing import List
 
 import openai
 
@@ -16,27 +17,42 @@ class OpenAIModeration(BaseModeration):
         super().__init__(model_provider, openai.Moderation, name)
 
     def _run(self, text: str) -> bool:
+        return self._run_batch([text])[0]
+
+    def _run_batch(self, texts: List[str]) -> List[bool]:
+        """
+        moderate several texts, their chunks are sent together in as few requests as possible.
+
+        :param texts:
+        :return: whether each text is not flagged
+        """
         credentials = self.model_provider.get_model_credentials(
             model_name=self.name,
             model_type=self.type
         )
 
-        # 2000 text per chunk
+        # 2000 text per chunk, with the index of its text
         length = 2000
-        text_chunks = [text[i:i + length] for i in range(0, len(text), length)]
+        text_chunks = [(index, text[i:i + length]) for index, text in enumerate(texts)
+                       for i in range(0, len(text), length)]
 
         max_text_chunks = 32
-        chunks = [text_chunks[i:i + max_text_chunks] for i in range(0, len(text_chunks), max_text_chunks)]
+        results = [True] * len(texts)
+        while text_chunks:
+            # the chunks of flagged texts are not sent
+            text_chunks = [(index, text_chunk) for index, text_chunk in text_chunks if results[index]]
+            chunks, text_chunks = text_chunks[:max_text_chunks], text_chunks[max_text_chunks:]
+            if not chunks:
+                break
 
-        for text_chunk in chunks:
-            moderation_result = self._client.create(input=text_chunk,
+            moderation_result = self._client.create(input=[text_chunk for _, text_chunk in chunks],
                                                     api_key=credentials['openai_api_key'])
 
-            for result in moderation_result.results:
+            for (index, _), result in zip(chunks, moderation_result.results):
                 if result['flagged'] is True:
-                    return False
+                    results[index] = False
 
-        return True
+        return results
 
     def handle_exceptions(self, ex: Exception) -> Exception:
         if isinstance(ex, openai.error.InvalidRequestError):
@@ -0,0 +1,135 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import tiktoken
+from cachetools import LRUCache
+from flask import current_app
+
+from libs import helper
+
+logger = logging.getLogger(__name__)
+
+# encoding of the models without an encoding of their own, the one of the gpt2 tokenizer langchain counts with
+DEFAULT_ENCODING_NAME = 'gpt2'
+# encoding of the models unknown to tiktoken
+FALLBACK_ENCODING_NAME = 'cl100k_base'
+
+_tokenizers: Dict[Optional[str], 'Tokenizer'] = {}
+_tokenizers_lock = threading.Lock()
+
+_lru_cache: Optional[LRUCache] = None
+_lru_cache_lock = threading.Lock()
+
+
+def _get_lru_cache() -> Optional[LRUCache]:
+    """
+    Process-local LRU of token counts by encoding and text hash, disabled when TOKENIZER_CACHE_LRU_SIZE is 0.
+    """
+    global _lru_cache
+    if _lru_cache is None:
+        try:
+            max_size = int(current_app.config.get('TOKENIZER_CACHE_LRU_SIZE') or 0)
+        except RuntimeError:
+            # outside of app context
+            return None
+
+        if max_size <= 0:
+            return None
+
+        with _lru_cache_lock:
+            if _lru_cache is None:
+                _lru_cache = LRUCache(maxsize=max_size)
+
+    return _lru_cache
+
+
+class Tokenizer:
+    def __init__(self, encoding: tiktoken.Encoding):
+        self.encoding = encoding
+
+    def count(self, text: str) -> int:
+        """
+        get num tokens of text.
+
+        :param text:
+        :return:
+        """
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """
+        get num tokens of each text.
+        Counts are memoized by text hash, the texts missing from the memo are encoded in one multi-threaded batch
+        when there are several of them.
+        Special tokens are counted as ordinary text.
+
+        :param texts:
+        :return:
+        """
+        counts = [0] * len(texts)
+        hashes = [helper.generate_text_hash(text) if text else None for text in texts]
+
+        lru_cache = _get_lru_cache()
+        if lru_cache is not None:
+            with _lru_cache_lock:
+                for i, hash in enumerate(hashes):
+                    if hash is not None:
+                        count = lru_cache.get((self.encoding.name, hash))
+                        if count is not None:
+                            counts[i] = count
+                            hashes[i] = None
+
+        # texts with the same hash are only encoded once
+        missing_texts = {}
+        for i, hash in enumerate(hashes):
+            if hash is not None and hash not in missing_texts:
+                missing_texts[hash] = texts[i]
+
+        if missing_texts:
+            new_counts = dict(zip(missing_texts.keys(), self._encode_counts(list(missing_texts.values()))))
+
+            for i, hash in enumerate(hashes):
+                if hash is not None:
+                    counts[i] = new_counts[hash]
+
+            if lru_cache is not None:
+                with _lru_cache_lock:
+                    for hash, count in new_counts.items():
+                        lru_cache[(self.encoding.name, hash)] = count
+
+        return counts
+
+    def _encode_counts(self, texts: List[str]) -> List[int]:
+        # the batch encoding starts a thread pool on every call, a single text is encoded inline
+        if len(texts) == 1:
+            return [len(self.encoding.encode_ordinary(texts[0]))]
+
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+
+def get_tokenizer(model_name: Optional[str] = None) -> Tokenizer:
+    """
+    get the tokenizer of a model, created once per model and process.
+
+    :param model_name: openai model name, the default gpt2 encoding is used when omitted
+    :return:
+    """
+    tokenizer = _tokenizers.get(model_name)
+    if tokenizer is None:
+        with _tokenizers_lock:
+            tokenizer = _tokenizers.get(model_name)
+            if tokenizer is None:
+                if model_name is None:
+                    encoding = tiktoken.get_encoding(DEFAULT_ENCODING_NAME)
+                else:
+                    try:
+                        encoding = tiktoken.encoding_for_model(model_name)
+                    except KeyError:
+                        logger.warning(f"No tiktoken encoding of model {model_name}, "
+                                       f"counting its tokens with {FALLBACK_ENCODING_NAME}.")
+                        encoding = tiktoken.get_encoding(FALLBACK_ENCODING_NAME)
+
+                tokenizer = _tokenizers[model_name] = Tokenizer(encoding)
+
+    return tokenizer
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 from enum import Enum
 
@@ -26,11 +26,30 @@ class ModerationOutputsResult(BaseModel):
     text: str = ""
 
 
+class ModerationOutputsStream(ABC):
+    """
+    Incremental moderation of a streaming LLM output.
+    """
+
+    @abstractmethod
+    def append(self, text: str) -> ModerationOutputsResult:
+        """
+        Moderation for the output received so far, fed with the new piece of the output only.
+        An overrided result text replaces the whole output received so far.
+
+        :param text: new piece of the LLM output
+        :return:
+        """
+        raise NotImplementedError
+
+
 class Moderation(Extensible, ABC):
     """
     The base class of moderation.
     """
     module: ExtensionModule = ExtensionModule.MODERATION
+    # whether moderation_for_outputs_batch reviews several outputs with a single request
+    outputs_batch_supported: bool = False
 
     def __init__(self, app_id: str, tenant_id: str, config: Optional[dict] = None) -> None:
         super().__init__(tenant_id, config)
@@ -73,6 +92,25 @@ class Moderation(Extensible, ABC):
         """
         raise NotImplementedError
 
+    def moderation_for_outputs_batch(self, texts: List[str]) -> List[ModerationOutputsResult]:
+        """
+        Moderation for the outputs of several concurrent LLM calls of the workspace.
+
+        :param texts: LLM output contents
+        :return: the result of each output
+        """
+        return [self.moderation_for_outputs(text) for text in texts]
+
+    def moderation_for_outputs_stream(self) -> Optional[ModerationOutputsStream]:
+        """
+        Moderation for streaming outputs.
+        Moderations able to review the output token by token return a stream fed with every new token,
+        the others return None and the output is reviewed with `moderation_for_outputs` as it grows.
+
+        :return:
+        """
+        return None
+
     @classmethod
     def _validate_inputs_and_outputs_config(self, config: dict, is_preset_response_required: bool) -> None:
         # inputs_config
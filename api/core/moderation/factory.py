@@ -1,5 +1,7 @@
+from typing import List, Optional
+
 from core.extension.extensible import ExtensionModule
-from core.moderation.base import Moderation, ModerationInputsResult, ModerationOutputsResult
+from core.moderation.base import Moderation, ModerationInputsResult, ModerationOutputsResult, ModerationOutputsStream
 from extensions.ext_code_based_extension import code_based_extension
 
 
@@ -24,6 +26,17 @@ class ModerationFactory:
         extension_class = code_based_extension.extension_class(ExtensionModule.MODERATION, name)
         extension_class.validate_config(tenant_id, config)
 
+    @classmethod
+    def is_outputs_batch_supported(cls, name: str) -> bool:
+        """
+        Whether the extension reviews several outputs with a single request.
+
+        :param name: the name of extension
+        :return:
+        """
+        extension_class = code_based_extension.extension_class(ExtensionModule.MODERATION, name)
+        return extension_class.outputs_batch_supported
+
     def moderation_for_inputs(self, inputs: dict, query: str = "") -> ModerationInputsResult:
         """
         Moderation for inputs.
@@ -46,3 +59,22 @@ class ModerationFactory:
         :return:
         """
         return self.__extension_instance.moderation_for_outputs(text)
+
+    def moderation_for_outputs_batch(self, texts: List[str]) -> List[ModerationOutputsResult]:
+        """
+        Moderation for the outputs of several concurrent LLM calls of the workspace.
+
+        :param texts: LLM output contents
+        :return: the result of each output
+        """
+        return self.__extension_instance.moderation_for_outputs_batch(texts)
+
+    def moderation_for_outputs_stream(self) -> Optional[ModerationOutputsStream]:
+        """
+        Moderation for streaming outputs.
+        Returns a stream fed with every new token of the LLM output,
+        or None when the extension only reviews whole texts with `moderation_for_outputs`.
+
+        :return:
+        """
+        return self.__extension_instance.moderation_for_outputs_stream()
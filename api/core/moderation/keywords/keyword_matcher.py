@@ -0,0 +1,106 @@
+import functools
+from collections import deque
+from typing import Dict, Iterable, List
+
+# max number of compiled keyword lists kept per process
+KEYWORD_MATCHER_CACHE_SIZE = 256
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick automaton of a keyword list, finds whether a text contains any of the keywords,
+    case-insensitively, in a single pass over the text whatever the number of keywords.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # transitions, failure link and whether a keyword ends at each state, state 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._matched: List[bool] = [False]
+
+        for keyword in keywords:
+            state = 0
+            for char in keyword.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._matched.append(False)
+                state = next_state
+            # an empty keyword is contained in every text
+            self._matched[state] = True
+
+        # breadth first, so the failure link of a state is set before the ones of its children
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._matched[next_state] = self._matched[next_state] or self._matched[fail]
+                queue.append(next_state)
+
+    def search(self, text: str) -> bool:
+        """Whether text contains any of the keywords."""
+        return self.stream().feed(text)
+
+    def stream(self) -> 'KeywordStream':
+        """Matcher of a text received piece by piece."""
+        return KeywordStream(self)
+
+    def _advance(self, state: int, text: str) -> int:
+        goto = self._goto
+        fail = self._fail
+        matched = self._matched
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if matched[state]:
+                return -1
+
+        return state
+
+
+class KeywordStream:
+    """
+    Incremental KeywordMatcher search, only the new pieces of the text are fed,
+    a keyword is found on the piece that completes it, even when it spans several pieces.
+    """
+
+    def __init__(self, matcher: KeywordMatcher):
+        self._matcher = matcher
+        # -1 once a keyword is found
+        self._state = -1 if matcher._matched[0] else 0
+
+    @property
+    def matched(self) -> bool:
+        return self._state < 0
+
+    def feed(self, text: str) -> bool:
+        """
+        Append a piece of the text.
+
+        :param text: new piece of the text
+        :return: whether the text up to this piece contains any of the keywords
+        """
+        if self._state >= 0:
+            self._state = self._matcher._advance(self._state, text)
+
+        return self.matched
+
+
+@functools.lru_cache(maxsize=KEYWORD_MATCHER_CACHE_SIZE)
+def get_keyword_matcher(keywords: str) -> KeywordMatcher:
+    """
+    get the matcher of a newline separated keyword list, compiled once per keyword list and process.
+
+    :param keywords: keywords config
+    :return:
+    """
+    return KeywordMatcher(keywords.split('\n'))
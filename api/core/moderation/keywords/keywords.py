@@ -1,4 +1,8 @@
-from core.moderation.base import Moderation, ModerationInputsResult, ModerationOutputsResult, ModerationAction
+from typing import Optional
+
+from core.moderation.base import Moderation, ModerationInputsResult, ModerationOutputsResult, ModerationAction, \
+    ModerationOutputsStream
+from core.moderation.keywords.keyword_matcher import KeywordMatcher, KeywordStream, get_keyword_matcher
 
 
 class KeywordsModeration(Moderation):
@@ -30,8 +34,7 @@ class KeywordsModeration(Moderation):
 
             if query:
                 inputs['query__'] = query
-            keywords_list = self.config['keywords'].split('\n')
-            flagged = self._is_violated(inputs, keywords_list)
+            flagged = self._is_violated(inputs, get_keyword_matcher(self.config['keywords']))
 
         return ModerationInputsResult(flagged=flagged, action=ModerationAction.DIRECT_OUTPUT, preset_response=preset_response)
 
@@ -40,21 +43,35 @@ class KeywordsModeration(Moderation):
         preset_response = ""
 
         if self.config['outputs_config']['enabled']:
-            keywords_list = self.config['keywords'].split('\n')
-            flagged = self._is_violated({'text': text}, keywords_list)
+            flagged = self._is_violated({'text': text}, get_keyword_matcher(self.config['keywords']))
             preset_response = self.config['outputs_config']['preset_response']
 
         return ModerationOutputsResult(flagged=flagged, action=ModerationAction.DIRECT_OUTPUT, preset_response=preset_response)
 
-    def _is_violated(self, inputs: dict, keywords_list: list) -> bool:
+    def moderation_for_outputs_stream(self) -> Optional[ModerationOutputsStream]:
+        if not self.config['outputs_config']['enabled']:
+            return KeywordsOutputsStream(None, "")
+
+        return KeywordsOutputsStream(
+            get_keyword_matcher(self.config['keywords']).stream(),
+            self.config['outputs_config']['preset_response']
+        )
+
+    def _is_violated(self, inputs: dict, matcher: KeywordMatcher) -> bool:
         for value in inputs.values():
-            if self._check_keywords_in_value(keywords_list, value):
+            if matcher.search(value):
                 return True
 
         return False
 
-    def _check_keywords_in_value(self, keywords_list, value):
-        for keyword in keywords_list:
-            if keyword.lower() in value.lower():
-                return True
-        return False
+
+class KeywordsOutputsStream(ModerationOutputsStream):
+    def __init__(self, keyword_stream: Optional[KeywordStream], preset_response: str):
+        self.keyword_stream = keyword_stream
+        self.preset_response = preset_response
+
+    def append(self, text: str) -> ModerationOutputsResult:
+        flagged = self.keyword_stream.feed(text) if self.keyword_stream else False
+
+        return ModerationOutputsResult(flagged=flagged, action=ModerationAction.DIRECT_OUTPUT,
+                                       preset_response=self.preset_response)
@@ -1,9 +1,12 @@
+from typing import List
+
 from core.moderation.base import Moderation, ModerationInputsResult, ModerationOutputsResult, ModerationAction
 from core.model_providers.model_factory import ModelFactory
 
 
 class OpenAIModeration(Moderation):
     name: str = "openai_moderation"
+    outputs_batch_supported: bool = True
 
     @classmethod
     def validate_config(cls, tenant_id: str, config: dict) -> None:
@@ -39,6 +42,19 @@ class OpenAIModeration(Moderation):
 
         return ModerationOutputsResult(flagged=flagged, action=ModerationAction.DIRECT_OUTPUT, preset_response=preset_response)
 
+    def moderation_for_outputs_batch(self, texts: List[str]) -> List[ModerationOutputsResult]:
+        if not self.config['outputs_config']['enabled']:
+            return [self.moderation_for_outputs(text) for text in texts]
+
+        openai_moderation = ModelFactory.get_moderation_model(self.tenant_id, "openai", "moderation")
+        preset_response = self.config['outputs_config']['preset_response']
+
+        return [
+            ModerationOutputsResult(flagged=not is_not_invalid, action=ModerationAction.DIRECT_OUTPUT,
+                                    preset_response=preset_response)
+            for is_not_invalid in openai_moderation.run_batch(texts)
+        ]
+
     def _is_violated(self, inputs: dict):
         text = '\n'.join(inputs.values())
         openai_moderation = ModelFactory.get_moderation_model(self.tenant_id, "openai", "moderation")
@@ -0,0 +1,156 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Set
+
+from flask import Flask
+
+if TYPE_CHECKING:
+    from core.callback_handler.llm_callback_handler import OutputModerationHandler
+
+
+class OutputModerationScheduler:
+    """
+    Moderates the outputs of all the streaming LLM calls of the process on a shared bounded executor,
+    instead of a polling thread per stream.
+
+    A stream is submitted when its output grows by buffer_size characters and is queued once at a time,
+    its moderation reviews the whole output received when it starts.
+    At most max_tenant_concurrency moderations of a workspace run at a time.
+    Queued streams with the same moderation config are reviewed in one batch request when the
+    moderation supports it.
+    """
+    MAX_BATCH_SIZE = 16
+
+    def __init__(self, flask_app: Flask, max_workers: int, max_tenant_concurrency: int, buffer_size: int):
+        self._flask_app = flask_app
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='output_moderation')
+        self._max_tenant_concurrency = max_tenant_concurrency
+        self.buffer_size = buffer_size
+
+        self._lock = threading.Lock()
+        # handlers waiting for a moderation and number of running moderations, by tenant
+        self._queues: Dict[str, Deque['OutputModerationHandler']] = {}
+        self._running: Dict[str, int] = {}
+        # ids of the handlers queued or being moderated
+        self._scheduled: Set[int] = set()
+
+    def submit(self, handler: 'OutputModerationHandler'):
+        """
+        Moderate the output of the handler, unless it is already queued or being moderated.
+        """
+        with self._lock:
+            if id(handler) in self._scheduled:
+                return
+
+            self._scheduled.add(id(handler))
+            self._queues.setdefault(handler.tenant_id, deque()).append(handler)
+            batches = self._take_batches(handler.tenant_id)
+
+        for batch in batches:
+            self._executor.submit(self._run, handler.tenant_id, batch)
+
+    def _take_batches(self, tenant_id: str) -> List[List['OutputModerationHandler']]:
+        """
+        Dequeue the batches of the tenant that can run, must be called with the lock held.
+        """
+        queue = self._queues.get(tenant_id)
+        batches = []
+        while queue and self._running.get(tenant_id, 0) < self._max_tenant_concurrency:
+            handler = queue.popleft()
+            batch = [handler]
+
+            batch_key = handler.get_batch_key()
+            if batch_key is not None:
+                for other in list(queue):
+                    if len(batch) >= self.MAX_BATCH_SIZE:
+                        break
+
+                    if other.get_batch_key() == batch_key:
+                        queue.remove(other)
+                        batch.append(other)
+
+            self._running[tenant_id] = self._running.get(tenant_id, 0) + 1
+            batches.append(batch)
+
+        if not queue:
+            self._queues.pop(tenant_id, None)
+
+        return batches
+
+    def _run(self, tenant_id: str, batch: List['OutputModerationHandler']):
+        try:
+            with self._flask_app.app_context():
+                self._moderate(batch)
+        except Exception:
+            logging.exception("Output moderation of tenant {} failed".format(tenant_id))
+        finally:
+            with self._lock:
+                self._running[tenant_id] -= 1
+                if not self._running[tenant_id]:
+                    del self._running[tenant_id]
+
+                for handler in batch:
+                    self._scheduled.discard(id(handler))
+
+                batches = self._take_batches(tenant_id)
+
+            for next_batch in batches:
+                self._executor.submit(self._run, tenant_id, next_batch)
+
+            # moderate again the outputs that grew enough during the moderation
+            for handler in batch:
+                if handler.should_moderate(self.buffer_size):
+                    self.submit(handler)
+
+    @staticmethod
+    def _moderate(batch: List['OutputModerationHandler']):
+        # streams stopped while queued are not moderated anymore
+        batch = [handler for handler in batch if handler.running]
+        if not batch:
+            return
+
+        moderation_buffers = [handler.buffer for handler in batch]
+        for handler, moderation_buffer in zip(batch, moderation_buffers):
+            handler.moderated_length = len(moderation_buffer)
+
+        if len(batch) == 1:
+            results = [batch[0].moderation(
+                tenant_id=batch[0].tenant_id,
+                app_id=batch[0].app_id,
+                moderation_buffer=moderation_buffers[0]
+            )]
+        else:
+            # the handlers of a batch share their tenant and moderation config
+            results = batch[0].moderation_batch(
+                tenant_id=batch[0].tenant_id,
+                app_id=batch[0].app_id,
+                moderation_buffers=moderation_buffers
+            )
+
+        for handler, moderation_buffer, result in zip(batch, moderation_buffers, results):
+            handler.on_moderation_result(moderation_buffer, result)
+
+
+_scheduler: Optional[OutputModerationScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_output_moderation_scheduler(flask_app: Flask) -> OutputModerationScheduler:
+    """
+    The scheduler is created lazily so that every forked worker process gets its own executor.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                buffer_size = int(flask_app.config.get('OUTPUT_MODERATION_BUFFER_SIZE'))
+                _scheduler = OutputModerationScheduler(
+                    flask_app=flask_app,
+                    max_workers=int(flask_app.config.get('OUTPUT_MODERATION_MAX_WORKERS')),
+                    max_tenant_concurrency=int(flask_app.config.get('OUTPUT_MODERATION_TENANT_MAX_CONCURRENCY')),
+                    buffer_size=buffer_size if buffer_size > 0 else 300
+                )
+
+    return _scheduler
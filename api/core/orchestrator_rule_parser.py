@@ -53,19 +53,19 @@ class OrchestratorRuleParser:
     def to_agent_executor(self, conversation_message_task: ConversationMessageTask, memory: Optional[BaseChatMemory],
                           rest_tokens: int, chain_callback: MainChainGatherCallbackHandler, tenant_id: str,
                           retriever_from: str = 'dev') -> Optional[AgentExecutor]:
-        if not self.app_model_config.agent_mode_dict:
+        if not self.app_model_config.snapshot.agent_mode_dict:
             return None
 
-        agent_mode_config = self.app_model_config.agent_mode_dict
-        model_dict = self.app_model_config.model_dict
-        return_resource = self.app_model_config.retriever_resource_dict.get('enabled', False)
+        agent_mode_config = self.app_model_config.snapshot.agent_mode_dict
+        model_dict = self.app_model_config.snapshot.model_dict
+        return_resource = self.app_model_config.snapshot.retriever_resource_dict.get('enabled', False)
 
         chain = None
         if agent_mode_config and agent_mode_config.get('enabled'):
             tool_configs = agent_mode_config.get('tools', [])
             agent_provider_name = model_dict.get('provider', 'openai')
             agent_model_name = model_dict.get('name', 'gpt-4')
-            dataset_configs = self.app_model_config.dataset_configs_dict
+            dataset_configs = self.app_model_config.snapshot.dataset_configs_dict
 
             agent_model_instance = ModelFactory.get_text_generation_model(
                 tenant_id=self.tenant_id,
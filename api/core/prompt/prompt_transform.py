@@ -67,7 +67,7 @@ class PromptTransform:
                             memory: Optional[BaseChatMemory],
                             model_instance: BaseLLM) -> List[PromptMessage]:
 
-        model_mode = app_model_config.model_dict['mode']
+        model_mode = app_model_config.snapshot.model_dict['mode']
 
         app_mode_enum = AppMode(app_mode)
         model_mode_enum = ModelMode(model_mode)
@@ -319,8 +319,9 @@ class PromptTransform:
                                                        memory: Optional[BaseChatMemory],
                                                        model_instance: BaseLLM) -> List[PromptMessage]:
 
-        raw_prompt = app_model_config.completion_prompt_config_dict['prompt']['text']
-        conversation_histories_role = app_model_config.completion_prompt_config_dict['conversation_histories_role']
+        completion_prompt_config = app_model_config.snapshot.completion_prompt_config_dict
+        raw_prompt = completion_prompt_config['prompt']['text']
+        conversation_histories_role = completion_prompt_config['conversation_histories_role']
 
         prompt_messages = []
 
@@ -348,7 +349,7 @@ class PromptTransform:
                                                  context: Optional[str],
                                                  memory: Optional[BaseChatMemory],
                                                  model_instance: BaseLLM) -> List[PromptMessage]:
-        raw_prompt_list = app_model_config.chat_prompt_config_dict['prompt']
+        raw_prompt_list = app_model_config.snapshot.chat_prompt_config_dict['prompt']
 
         prompt_messages = []
 
@@ -375,7 +376,7 @@ class PromptTransform:
                                                              inputs: dict,
                                                              files: List[PromptMessageFile],
                                                              context: Optional[str]) -> List[PromptMessage]:
-        raw_prompt = app_model_config.completion_prompt_config_dict['prompt']['text']
+        raw_prompt = app_model_config.snapshot.completion_prompt_config_dict['prompt']['text']
 
         prompt_messages = []
 
@@ -395,7 +396,7 @@ class PromptTransform:
                                                        inputs: dict,
                                                        files: List[PromptMessageFile],
                                                        context: Optional[str]) -> List[PromptMessage]:
-        raw_prompt_list = app_model_config.chat_prompt_config_dict['prompt']
+        raw_prompt_list = app_model_config.snapshot.chat_prompt_config_dict['prompt']
 
         prompt_messages = []
 
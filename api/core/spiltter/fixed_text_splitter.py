@@ -1,16 +1,204 @@
 """Functionality for splitting text."""
 from __future__ import annotations
 
+import logging
+import re
 from typing import (
+    AbstractSet,
     Any,
+    Collection,
     List,
+    Literal,
     Optional,
+    Tuple,
+    Union,
 )
 
+import tiktoken
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from core.spiltter.token_offset_counter import TokenOffsetCounter
 
-class FixedRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
+logger = logging.getLogger(__name__)
+
+
+def _split_spans_by_regex(text: str, start: int, end: int, separator: str) -> List[Tuple[int, int]]:
+    """Offsets of the splits of `_split_text_with_regex(text[start:end], separator, keep_separator=True)`."""
+    if separator:
+        # every split but the first starts with a separator
+        boundaries = [0] + [match.start() for match in re.finditer(separator, text[start:end])] + [end - start]
+        spans = [(start + boundaries[i], start + boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+    else:
+        spans = [(i, i + 1) for i in range(start, end)]
+
+    return [(split_start, split_end) for split_start, split_end in spans if split_start != split_end]
+
+
+def _split_spans_by_string(text: str, start: int, end: int, separator: str) -> List[Tuple[int, int]]:
+    """Offsets of the splits of `text[start:end].split(separator)`, or of `list(text[start:end])`."""
+    if not separator:
+        return [(i, i + 1) for i in range(start, end)]
+
+    spans = []
+    position = start
+    while True:
+        index = text.find(separator, position, end)
+        if index < 0:
+            spans.append((position, end))
+            return spans
+
+        spans.append((position, index))
+        position = index + len(separator)
+
+
+class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    RecursiveCharacterTextSplitter that, built with `from_tiktoken_encoder`, encodes every text once
+    and measures its splits by their offsets with a TokenOffsetCounter,
+    instead of encoding every split again on every recursion level and merge.
+
+    The chunks are the same as the ones of RecursiveCharacterTextSplitter.
+    """
+    _encoding: Optional[tiktoken.Encoding] = None
+
+    @classmethod
+    def from_tiktoken_encoder(
+            cls,
+            encoding_name: str = "gpt2",
+            model_name: Optional[str] = None,
+            allowed_special: Union[Literal["all"], AbstractSet[str]] = set(),
+            disallowed_special: Union[Literal["all"], Collection[str]] = "all",
+            **kwargs: Any,
+    ):
+        splitter = super().from_tiktoken_encoder(
+            encoding_name=encoding_name,
+            model_name=model_name,
+            allowed_special=allowed_special,
+            disallowed_special=disallowed_special,
+            **kwargs
+        )
+
+        # with other special token settings every split is still encoded by the length function
+        if not allowed_special and disallowed_special == "all":
+            if model_name is not None:
+                splitter._encoding = tiktoken.encoding_for_model(model_name)
+            else:
+                splitter._encoding = tiktoken.get_encoding(encoding_name)
+
+        return splitter
+
+    def split_text(self, text: str) -> List[str]:
+        counter = self._get_token_counter(text)
+        if counter is None or not self._keep_separator:
+            return super().split_text(text)
+
+        return self._split_spans(text, 0, len(text), self._separators, counter)
+
+    def _get_token_counter(self, text: str) -> Optional[TokenOffsetCounter]:
+        if self._encoding is None:
+            return None
+
+        # the length function raises on special tokens, leave it to raise the same error
+        if any(special_token in text for special_token in self._encoding.special_tokens_set):
+            return None
+
+        try:
+            return TokenOffsetCounter(self._encoding, text)
+        except ValueError:
+            return None
+
+    def _split_spans(self, text: str, start: int, end: int, separators: List[str],
+                     counter: TokenOffsetCounter) -> List[str]:
+        """`_split_text` of text[start:end]."""
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = separators[-1]
+        new_separators = []
+        for i, _s in enumerate(separators):
+            if _s == "":
+                separator = _s
+                break
+            if re.search(_s, text[start:end]):
+                separator = _s
+                new_separators = separators[i + 1:]
+                break
+
+        splits = _split_spans_by_regex(text, start, end, separator)
+        # Now go merging things, recursively splitting longer texts.
+        _good_splits = []
+        for split_start, split_end in splits:
+            split_len = counter.count(split_start, split_end)
+            if split_len < self._chunk_size:
+                _good_splits.append((split_start, split_end, split_len))
+            else:
+                if _good_splits:
+                    merged_text = self._merge_spans(text, _good_splits, "")
+                    final_chunks.extend(merged_text)
+                    _good_splits = []
+                if not new_separators:
+                    final_chunks.append(text[split_start:split_end])
+                else:
+                    other_info = self._split_spans(text, split_start, split_end, new_separators, counter)
+                    final_chunks.extend(other_info)
+        if _good_splits:
+            merged_text = self._merge_spans(text, _good_splits, "")
+            final_chunks.extend(merged_text)
+        return final_chunks
+
+    def _merge_spans(self, text: str, splits: List[Tuple[int, int, int]], separator: str) -> List[str]:
+        """
+        `_merge_splits` of consecutive (start, end, length) splits of the text, that are separated by `separator`
+        in the text, so any run of them joined by the separator is the text between the first and the last.
+        """
+        separator_len = self._length_function(separator)
+
+        docs = []
+        # (start, end, length) of the splits of the current doc, from current_doc[head]
+        current_doc: List[Tuple[int, int, int]] = []
+        head = 0
+        total = 0
+        for split in splits:
+            _len = split[2]
+            if (
+                total + _len + (separator_len if len(current_doc) > head else 0)
+                > self._chunk_size
+            ):
+                if total > self._chunk_size:
+                    logger.warning(
+                        f"Created a chunk of size {total}, "
+                        f"which is longer than the specified {self._chunk_size}"
+                    )
+                if len(current_doc) > head:
+                    doc = self._join_spans(text, current_doc[head], current_doc[-1])
+                    if doc is not None:
+                        docs.append(doc)
+                    # Keep on popping if:
+                    # - we have a larger chunk than in the chunk overlap
+                    # - or if we still have any chunks and the length is long
+                    while total > self._chunk_overlap or (
+                        total + _len + (separator_len if len(current_doc) > head else 0)
+                        > self._chunk_size
+                        and total > 0
+                    ):
+                        total -= current_doc[head][2] + (
+                            separator_len if len(current_doc) - head > 1 else 0
+                        )
+                        head += 1
+            current_doc.append(split)
+            total += _len + (separator_len if len(current_doc) - head > 1 else 0)
+        if len(current_doc) > head:
+            doc = self._join_spans(text, current_doc[head], current_doc[-1])
+            if doc is not None:
+                docs.append(doc)
+        return docs
+
+    @staticmethod
+    def _join_spans(text: str, first: Tuple[int, ...], last: Tuple[int, ...]) -> Optional[str]:
+        doc = text[first[0]:last[1]].strip()
+        return doc if doc else None
+
+
+class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter):
     def __init__(self, fixed_separator: str = "\n\n", separators: Optional[List[str]] = None, **kwargs: Any):
         """Create a new TextSplitter."""
         super().__init__(**kwargs)
@@ -19,6 +207,10 @@ class FixedRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
 
     def split_text(self, text: str) -> List[str]:
         """Split incoming text and return chunks."""
+        counter = self._get_token_counter(text)
+        if counter is not None:
+            return self._fixed_split_spans(text, counter)
+
         if self._fixed_separator:
             chunks = text.split(self._fixed_separator)
         else:
@@ -66,3 +258,44 @@ class FixedRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
             merged_text = self._merge_splits(_good_splits, separator)
             final_chunks.extend(merged_text)
         return final_chunks
+
+    def _fixed_split_spans(self, text: str, counter: TokenOffsetCounter) -> List[str]:
+        """`split_text` measuring the splits with the counter of the text."""
+        final_chunks = []
+        for chunk_start, chunk_end in _split_spans_by_string(text, 0, len(text), self._fixed_separator):
+            if counter.count(chunk_start, chunk_end) > self._chunk_size:
+                final_chunks.extend(self._recursive_split_spans(text, chunk_start, chunk_end, counter))
+            else:
+                final_chunks.append(text[chunk_start:chunk_end])
+
+        return final_chunks
+
+    def _recursive_split_spans(self, text: str, start: int, end: int, counter: TokenOffsetCounter) -> List[str]:
+        """`recursive_split_text` of text[start:end]."""
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = self._separators[-1]
+        for _s in self._separators:
+            if _s == "":
+                separator = _s
+                break
+            if text.find(_s, start, end) >= 0:
+                separator = _s
+                break
+        # Now go merging things, recursively splitting longer texts.
+        _good_splits = []
+        for split_start, split_end in _split_spans_by_string(text, start, end, separator):
+            split_len = counter.count(split_start, split_end)
+            if split_len < self._chunk_size:
+                _good_splits.append((split_start, split_end, split_len))
+            else:
+                if _good_splits:
+                    merged_text = self._merge_spans(text, _good_splits, separator)
+                    final_chunks.extend(merged_text)
+                    _good_splits = []
+                other_info = self._recursive_split_spans(text, split_start, split_end, counter)
+                final_chunks.extend(other_info)
+        if _good_splits:
+            merged_text = self._merge_spans(text, _good_splits, separator)
+            final_chunks.extend(merged_text)
+        return final_chunks
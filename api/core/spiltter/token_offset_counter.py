@@ -0,0 +1,100 @@
+import bisect
+import functools
+from array import array
+from itertools import accumulate
+
+import regex
+from tiktoken import Encoding
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_pattern(pat_str: str) -> regex.Pattern:
+    return regex.compile(pat_str)
+
+
+_NON_SPACE = regex.compile(r'\S')
+
+# substrings up to this length are split on their own, which is cheaper than looking up the pre-tokens of the text
+SHORT_SUBSTRING_LENGTH = 8
+
+
+class _PieceCounts(dict):
+    """Token count of every pre-token, each distinct pre-token is byte pair encoded once."""
+
+    def __init__(self, encoding: Encoding):
+        super().__init__()
+        self._encoding = encoding
+
+    def __missing__(self, piece: str) -> int:
+        count = self[piece] = len(self._encoding.encode_ordinary(piece))
+        return count
+
+
+class TokenOffsetCounter:
+    """
+    Token count of any substring of a text, equal to `len(encoding.encode_ordinary(text[start:end]))`,
+    from a single encoding pass over the text.
+
+    tiktoken splits a text into pre-tokens with the regex of the encoding and byte pair encodes every
+    pre-token on its own, so the count of a text is the sum of the counts of its pre-tokens.
+    The pre-tokens of the whole text and prefix sums of their counts are computed once.
+    A substring reuses the pre-tokens of the text and only splits again the few characters at its ends,
+    where its own pre-tokens can differ from the ones of the whole text.
+    """
+
+    def __init__(self, encoding: Encoding, text: str):
+        self._text = text
+        self._pattern = _compile_pattern(encoding._pat_str)
+        self._piece_counts = _PieceCounts(encoding)
+
+        pieces = self._pattern.findall(text)
+        # start offset of every pre-token, followed by the length of the text
+        self._starts = array('q', accumulate(map(len, pieces), initial=0))
+        if self._starts[-1] != len(text):
+            raise ValueError(f'pre-tokens of encoding {encoding.name} do not cover the text')
+
+        # token count of the pre-tokens before each start
+        self._prefix_counts = array('q', accumulate(map(self._piece_counts.__getitem__, pieces), initial=0))
+
+    def count(self, start: int, end: int) -> int:
+        """Token count of text[start:end]."""
+        count = 0
+        position = start
+        if end - position <= SHORT_SUBSTRING_LENGTH:
+            while position < end:
+                position, piece_count = self._split(position, end)
+                count += piece_count
+            return count
+
+        starts = self._starts
+        index = bisect.bisect_left(starts, position)
+
+        # split the head until one of its pre-tokens ends where a pre-token of the text starts,
+        # the split of the substring continues like the one of the text from there
+        while position < end and starts[index] != position:
+            position, piece_count = self._split(position, end)
+            count += piece_count
+            index = bisect.bisect_left(starts, position, index)
+
+        if position >= end:
+            return count
+
+        # reuse the pre-tokens of the text up to a pre-token start followed by a non-space character inside
+        # the substring, splitting the pre-tokens before it never looks past that character
+        last = bisect.bisect_left(starts, end, index) - 1
+        while last > index and not _NON_SPACE.search(self._text, starts[last], end):
+            last -= 1
+        count += self._prefix_counts[last] - self._prefix_counts[index]
+        position = starts[last]
+
+        # split the tail, where the end of the substring can change its pre-tokens
+        while position < end:
+            position, piece_count = self._split(position, end)
+            count += piece_count
+
+        return count
+
+    def _split(self, position: int, end: int) -> tuple[int, int]:
+        """End and token count of the pre-token at position, in a text ending at end."""
+        match = self._pattern.match(self._text, position, end)
+        return match.end(), self._piece_counts[match.group()]
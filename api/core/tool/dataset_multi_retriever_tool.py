@@ -1,6 +1,8 @@
-import json
+import logging
 import threading
-from typing import Type, Optional, List
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Type, Optional, List, Dict
 
 from flask import current_app, Flask
 from langchain.tools import BaseTool
@@ -27,6 +29,26 @@ default_retrieval_model = {
     'score_threshold_enabled': False
 }
 
+_retrieval_executor: Optional[ThreadPoolExecutor] = None
+_retrieval_executor_lock = threading.Lock()
+
+
+def get_retrieval_executor(flask_app: Flask) -> ThreadPoolExecutor:
+    """
+    Pool shared by all multi dataset retrievals of the process, created lazily so that
+    every forked worker process gets its own threads.
+    """
+    global _retrieval_executor
+    if _retrieval_executor is None:
+        with _retrieval_executor_lock:
+            if _retrieval_executor is None:
+                _retrieval_executor = ThreadPoolExecutor(
+                    max_workers=int(flask_app.config.get('DATASET_RETRIEVAL_MAX_WORKERS')),
+                    thread_name_prefix='dataset_retriever'
+                )
+
+    return _retrieval_executor
+
 
 class DatasetMultiRetrieverToolInput(BaseModel):
     query: str = Field(..., description="dataset multi retriever and rerank")
@@ -57,19 +79,8 @@ class DatasetMultiRetrieverTool(BaseTool):
         )
 
     def _run(self, query: str) -> str:
-        threads = []
-        all_documents = []
-        for dataset_id in self.dataset_ids:
-            retrieval_thread = threading.Thread(target=self._retriever, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': dataset_id,
-                'query': query,
-                'all_documents': all_documents
-            })
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+        all_documents = self._retrieve_all(query)
+
         # do rerank for searched documents
         rerank = ModelFactory.get_reranking_model(
             tenant_id=self.tenant_id,
@@ -107,14 +118,11 @@ class DatasetMultiRetrieverTool(BaseTool):
             if self.return_resource:
                 context_list = []
                 resource_number = 1
+                document_datasets = self._get_document_datasets(
+                    list({segment.document_id for segment in sorted_segments})
+                )
                 for segment in sorted_segments:
-                    dataset = Dataset.query.filter_by(
-                        id=segment.dataset_id
-                    ).first()
-                    document = Document.query.filter(Document.id == segment.document_id,
-                                                     Document.enabled == True,
-                                                     Document.archived == False,
-                                                     ).first()
+                    document, dataset = document_datasets.get(segment.document_id, (None, None))
                     if dataset and document:
                         source = {
                             'position': resource_number,
@@ -146,7 +154,117 @@ class DatasetMultiRetrieverTool(BaseTool):
     async def _arun(self, tool_input: str) -> str:
         raise NotImplementedError()
 
-    def _retriever(self, flask_app: Flask, dataset_id: str, query: str, all_documents: List):
+    def _retrieve_all(self, query: str) -> List:
+        """
+        Retrieve from all datasets on the shared pool.
+
+        A dataset still running DATASET_RETRIEVAL_TIMEOUT after it started is skipped, and the whole retrieval
+        gives up after DATASET_RETRIEVAL_REQUEST_TIMEOUT, queue wait included, skipping the datasets not done
+        by then. With DATASET_RETRIEVAL_EARLY_CUTOFF_SCORE set, the remaining datasets are no longer waited for
+        once top_k hits reach it.
+        """
+        flask_app = current_app._get_current_object()
+        executor = get_retrieval_executor(flask_app)
+        timeout = float(flask_app.config.get('DATASET_RETRIEVAL_TIMEOUT'))
+        request_deadline = time.monotonic() + float(flask_app.config.get('DATASET_RETRIEVAL_REQUEST_TIMEOUT'))
+        early_cutoff_score = float(flask_app.config.get('DATASET_RETRIEVAL_EARLY_CUTOFF_SCORE') or 0)
+
+        # start time of each dataset, set by the worker when it picks the dataset from the queue
+        started_at: Dict[str, float] = {}
+        abandoned = threading.Event()
+
+        def retrieve(dataset_id: str) -> tuple[List, float]:
+            # a worker freed after the retrieval gave up does not start the dataset
+            if abandoned.is_set():
+                return [], 0.0
+
+            started_at[dataset_id] = time.monotonic()
+            documents = self._retriever(flask_app=flask_app, dataset_id=dataset_id, query=query)
+            return documents, time.monotonic() - started_at[dataset_id]
+
+        futures = {executor.submit(retrieve, dataset_id): dataset_id for dataset_id in self.dataset_ids}
+
+        all_documents = []
+        high_score_count = 0
+        timed_out = []
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            if now >= request_deadline:
+                break
+
+            deadlines = [request_deadline]
+            for future in list(pending):
+                dataset_id = futures[future]
+                if dataset_id in started_at and not future.done():
+                    if now - started_at[dataset_id] >= timeout:
+                        pending.remove(future)
+                        timed_out.append(dataset_id)
+                    else:
+                        deadlines.append(started_at[dataset_id] + timeout)
+
+            if not pending:
+                break
+
+            # wake up at the first deadline of a running dataset, or to check whether queued ones started
+            wait_time = min(min(deadlines) - now, timeout)
+            done, pending = wait(pending, timeout=max(wait_time, 0), return_when=FIRST_COMPLETED)
+            cutoff = False
+            for future in done:
+                try:
+                    documents, elapsed = future.result()
+                except Exception:
+                    logging.exception("Retrieve dataset {} failed".format(futures[future]))
+                    continue
+
+                if elapsed > timeout:
+                    timed_out.append(futures[future])
+                    continue
+
+                all_documents.extend(documents)
+                if early_cutoff_score > 0:
+                    high_score_count += len([
+                        document for document in documents
+                        if document.metadata.get('score') and document.metadata['score'] >= early_cutoff_score
+                    ])
+                    if high_score_count >= self.top_k:
+                        cutoff = True
+
+            if cutoff:
+                pending = set()
+                break
+
+        # the datasets still queued are not run, the running ones cannot be interrupted and their results are dropped
+        abandoned.set()
+        for future in futures:
+            future.cancel()
+
+        if pending:
+            timed_out.extend(futures[future] for future in pending)
+        if timed_out:
+            logging.error("Retrieve datasets {} timed out, their results are dropped".format(timed_out))
+
+        return all_documents
+
+    def _get_document_datasets(self, document_ids: List[str]) -> dict:
+        """
+        Load the enabled documents and their datasets in one query.
+        """
+        if not document_ids:
+            return {}
+
+        rows = db.session.query(Document, Dataset).join(
+            Dataset, Dataset.id == Document.dataset_id
+        ).filter(
+            Document.id.in_(document_ids),
+            Document.enabled == True,
+            Document.archived == False
+        ).all()
+
+        return {document.id: (document, dataset) for document, dataset in rows}
+
+    def _retriever(self, flask_app: Flask, dataset_id: str, query: str) -> List:
+        all_documents = []
         with flask_app.app_context():
             dataset = db.session.query(Dataset).filter(
                 Dataset.tenant_id == self.tenant_id,
@@ -231,3 +349,5 @@ class DatasetMultiRetrieverTool(BaseTool):
                         thread.join()
 
                     all_documents.extend(documents)
+
+        return all_documents
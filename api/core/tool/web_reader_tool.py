@@ -14,7 +14,6 @@ from bs4 import BeautifulSoup, NavigableString, Comment, CData
 from langchain.chains import RefineDocumentsChain
 from langchain.chains.summarize import refine_prompts
 from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.tools.base import BaseTool
 from newspaper import Article
 from pydantic import BaseModel, Field
@@ -24,6 +23,7 @@ from core.chain.llm_chain import LLMChain
 from core.data_loader import file_extractor
 from core.data_loader.file_extractor import FileExtractor
 from core.model_providers.models.llm.base import BaseLLM
+from core.spiltter.fixed_text_splitter import EnhanceRecursiveCharacterTextSplitter
 
 FULL_TEMPLATE = """
 TITLE: {title}
@@ -81,7 +81,7 @@ class WebReaderTool(BaseTool):
             return f'Read this website failed, caused by: {str(e)}.'
 
         if summary and self.model_instance:
-            character_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            character_splitter = EnhanceRecursiveCharacterTextSplitter.from_tiktoken_encoder(
                 chunk_size=self.summary_chunk_tokens,
                 chunk_overlap=self.summary_chunk_overlap,
                 separators=self.summary_separators
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _ClientEntry:
+    def __init__(self, client: Any, close: Optional[Callable[[Any], None]]):
+        self.client = client
+        self.close = close
+        self.checked_at = time.monotonic()
+
+
+class VectorClientRegistry:
+    """
+    Process-wide registry of long-lived vector database clients.
+
+    Clients are keyed by store type, endpoint and credentials, so every index of the same
+    store reuses one client and its keep-alive connections instead of connecting per call.
+    Idle clients are health checked before reuse and replaced when the check fails.
+    Clients are never shared across processes: a forked child (e.g. a Celery worker)
+    drops the inherited clients and connects again.
+    """
+    HEALTH_CHECK_INTERVAL = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], _ClientEntry] = {}
+        self._pid = os.getpid()
+
+    @staticmethod
+    def make_key(vector_type: str, params: dict) -> Tuple[str, str]:
+        # credentials are part of the key but are not kept in plain text
+        params_hash = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+        return vector_type, params_hash
+
+    def get(self, vector_type: str, params: dict, factory: Callable[[], Any],
+            health_check: Optional[Callable[[Any], Any]] = None,
+            close: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Get the client of the store, created with `factory` on first use.
+
+        :param vector_type: vector store type
+        :param params: endpoint and credentials identifying the client
+        :param factory: creates a new client
+        :param health_check: raises or returns False when the client is no longer usable
+        :param close: releases the resources of a replaced client
+        """
+        self._check_fork()
+
+        key = self.make_key(vector_type, params)
+        with self._lock:
+            entry = self._clients.get(key)
+            needs_check = entry is not None and health_check is not None \
+                and time.monotonic() - entry.checked_at > self.HEALTH_CHECK_INTERVAL
+            if needs_check:
+                # only one caller checks, the others keep using the client meanwhile
+                entry.checked_at = time.monotonic()
+
+        if entry is None:
+            # connecting can be slow, so the client is created outside the lock of the registry
+            return self._put(key, None, _ClientEntry(factory(), close)).client
+
+        if needs_check and not self._is_healthy(entry.client, health_check):
+            logging.warning(f"Vector store client {vector_type} failed health check, reconnecting.")
+            return self._put(key, entry, _ClientEntry(factory(), close)).client
+
+        return entry.client
+
+    def _put(self, key: Tuple[str, str], replaced: Optional[_ClientEntry], entry: _ClientEntry) -> _ClientEntry:
+        """
+        Store `entry` unless another caller already replaced `replaced` meanwhile, returns the stored entry.
+        """
+        with self._lock:
+            current = self._clients.get(key)
+            if current is None or current is replaced:
+                self._clients[key] = entry
+                stored, entry_to_close = entry, current
+            else:
+                stored, entry_to_close = current, entry
+
+        if entry_to_close is not None:
+            self._close_entry(entry_to_close)
+
+        return stored
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+
+        for entry in entries:
+            self._close_entry(entry)
+
+    def _after_fork(self):
+        # the inherited sockets belong to the parent process, drop them without closing
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    @staticmethod
+    def _is_healthy(client: Any, health_check: Callable[[Any], Any]) -> bool:
+        try:
+            return health_check(client) is not False
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_entry(entry: _ClientEntry):
+        if entry.close is None:
+            return
+
+        try:
+            entry.close(entry.client)
+        except Exception:
+            logging.exception("Failed to close vector store client")
+
+
+vector_client_registry = VectorClientRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=vector_client_registry._after_fork)
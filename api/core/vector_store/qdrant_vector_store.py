@@ -31,6 +31,11 @@ class QdrantVectorStore(Qdrant):
             ),
         )
 
+    def delete_by_ids(self, ids: list[str], batch_size: int = 1000) -> None:
+        self._reload_if_needed()
+
+        super().delete_by_ids(ids, batch_size)
+
     def text_exists(self, uuid: str) -> bool:
         self._reload_if_needed()
 
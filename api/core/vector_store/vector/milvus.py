@@ -174,6 +174,11 @@ class Milvus(VectorStore):
         """Create the connection to the Milvus server."""
         from pymilvus import MilvusException, connections
 
+        # reuse the connection opened by the caller
+        alias = connection_args.get("alias", None)
+        if alias is not None and connections.has_connection(alias):
+            return alias
+
         # Grab the connection arguments that are used for checking existing connection
         host: str = connection_args.get("host", None)
         port: Union[str, int] = connection_args.get("port", None)
@@ -215,7 +220,9 @@ class Milvus(VectorStore):
         # Generate a new connection if one doesn't exist
         alias = uuid4().hex
         try:
-            connections.connect(alias=alias, **connection_args)
+            connections.connect(
+                alias=alias, **{key: value for key, value in connection_args.items() if key != "alias"}
+            )
             logger.debug("Created new connection using: %s", alias)
             return alias
         except MilvusException as e:
@@ -801,6 +808,25 @@ class Milvus(VectorStore):
                 ret.append(documents[x])
         return ret
 
+    def delete_by_ids(self, ids: List[str], batch_size: int = 1000) -> None:
+        """Delete entities by the doc ids in their metadata, `batch_size` ids per request.
+
+        Args:
+            ids: List of doc ids to delete.
+            batch_size: Max number of ids deleted in a single request.
+        """
+        if self.col is None:
+            return
+
+        for i in range(0, len(ids), batch_size):
+            result = self.col.query(
+                expr=f'{self._metadata_field}["doc_id"] in {ids[i:i + batch_size]}',
+                output_fields=[self._primary_field]
+            )
+            pks = [item[self._primary_field] for item in result]
+            if pks:
+                self.col.delete(f"{self._primary_field} in {pks}")
+
     @classmethod
     def from_texts(
         cls,
@@ -180,10 +180,15 @@ class Qdrant(VectorStore):
                 Default: 64
             group_id:
                 collection group
+            uuids:
+                Alias of `ids`, as passed by the other vector stores.
 
         Returns:
             List of ids from adding the texts into the vectorstore.
         """
+        if ids is None:
+            ids = kwargs.get('uuids')
+
         added_ids = []
         for batch_ids, points in self._generate_rest_batches(
             texts, metadatas, ids, batch_size
@@ -626,39 +631,6 @@ class Qdrant(VectorStore):
             for result in results
         ]
 
-    def similarity_search_by_bm25(
-        self,
-        filter: Optional[MetadataFilter] = None,
-        k: int = 4
-    ) -> List[Document]:
-        """Return docs most similar by bm25.
-
-        Args:
-            embedding: Embedding vector to look up documents similar to.
-            k: Number of Documents to return. Defaults to 4.
-            filter: Filter by metadata. Defaults to None.
-            search_params: Additional search params
-        Returns:
-            List of documents most similar to the query text and distance for each.
-        """
-        response = self.client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=filter,
-            limit=k,
-            with_payload=True,
-            with_vectors=True
-
-        )
-        results = response[0]
-        documents = []
-        for result in results:
-            if result:
-                documents.append(self._document_from_scored_point(
-                        result, self.content_payload_key, self.metadata_payload_key
-                    ))
-
-        return documents
-
     @sync_call_fallback
     async def asimilarity_search_with_score_by_vector(
         self,
@@ -1006,6 +978,36 @@ class Qdrant(VectorStore):
         )
         return result.status == rest.UpdateStatus.COMPLETED
 
+    def delete_by_ids(self, ids: List[str], batch_size: int = 1000) -> None:
+        """Delete points by id, `batch_size` ids per request.
+
+        Points added before their ids were the doc ids got random ids,
+        so a point also matches when its `metadata.doc_id` is one of the ids.
+        A filter is used rather than a list of point ids, ids that are not points are ignored.
+
+        Args:
+            ids: List of point ids to delete.
+            batch_size: Max number of ids deleted in a single request.
+        """
+        from qdrant_client.http import models as rest
+
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=rest.FilterSelector(
+                    filter=rest.Filter(
+                        should=[
+                            rest.HasIdCondition(has_id=batch),
+                            rest.FieldCondition(
+                                key=f"{self.metadata_payload_key}.doc_id",
+                                match=rest.MatchAny(any=batch),
+                            ),
+                        ],
+                    )
+                ),
+            )
+
     @classmethod
     def from_texts(
         cls: Type[Qdrant],
@@ -1420,20 +1422,23 @@ class Qdrant(VectorStore):
         collection_name = collection_name or uuid.uuid4().hex
         distance_func = distance_func.upper()
         is_new_collection = False
-        client = qdrant_client.QdrantClient(
-            location=location,
-            url=url,
-            port=port,
-            grpc_port=grpc_port,
-            prefer_grpc=prefer_grpc,
-            https=https,
-            api_key=api_key,
-            prefix=prefix,
-            timeout=timeout,
-            host=host,
-            path=path,
-            **kwargs,
-        )
+        # an existing client can be passed in to reuse its connections
+        client = kwargs.pop('client', None)
+        if client is None:
+            client = qdrant_client.QdrantClient(
+                location=location,
+                url=url,
+                port=port,
+                grpc_port=grpc_port,
+                prefer_grpc=prefer_grpc,
+                https=https,
+                api_key=api_key,
+                prefix=prefix,
+                timeout=timeout,
+                host=host,
+                path=path,
+                **kwargs,
+            )
         all_collection_name = []
         collections_response = client.get_collections()
         collection_list = collections_response.collections
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import datetime
+import threading
 from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
 from uuid import uuid4
 
@@ -13,6 +14,10 @@ from langchain.utils import get_from_dict_or_env
 from langchain.vectorstores.base import VectorStore
 from langchain.vectorstores.utils import maximal_marginal_relevance
 
+# the batch of a client is not thread safe and clients are shared by the indexes of the process,
+# only the batch imports are serialized, the embeddings are computed before taking the lock
+_batch_lock = threading.Lock()
+
 
 def _default_schema(index_name: str) -> Dict:
     return {
@@ -145,7 +150,7 @@ class Weaviate(VectorStore):
                 texts = list(texts)
             embeddings = self._embedding.embed_documents(texts)
 
-        with self._client.batch as batch:
+        with _batch_lock, self._client.batch as batch:
             for i, text in enumerate(texts):
                 data_properties = {self._text_key: text}
                 if metadatas is not None:
@@ -446,7 +451,7 @@ class Weaviate(VectorStore):
         if not client.schema.contains(schema):
             client.schema.create_class(schema)
 
-        with client.batch as batch:
+        with _batch_lock, client.batch as batch:
             for i, text in enumerate(texts):
                 data_properties = {
                     text_key: text,
@@ -504,3 +509,21 @@ class Weaviate(VectorStore):
         # TODO: Check if this can be done in bulk
         for id in ids:
             self._client.data_object.delete(uuid=id)
+
+    def delete_by_ids(self, ids: List[str], batch_size: int = 1000) -> None:
+        """Delete objects by uuid with batch deletes, `batch_size` ids per request.
+
+        Args:
+            ids: List of object uuids to delete.
+            batch_size: Max number of ids deleted in a single request.
+        """
+        for i in range(0, len(ids), batch_size):
+            operands = [
+                {"path": ["id"], "operator": "Equal", "valueText": id}
+                for id in ids[i:i + batch_size]
+            ]
+            self._client.batch.delete_objects(
+                class_name=self._index_name,
+                where=operands[0] if len(operands) == 1 else {"operator": "Or", "operands": operands},
+                output="minimal",
+            )
@@ -2,3 +2,6 @@ from blinker import signal
 
 # sender: dataset
 dataset_was_deleted = signal('dataset-was-deleted')
+
+# sender: dataset
+dataset_full_text_index_was_missing = signal('dataset-full-text-index-was-missing')
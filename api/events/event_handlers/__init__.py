@@ -5,3 +5,4 @@ from .clean_when_dataset_deleted import handle
 from .update_app_dataset_join_when_app_model_config_updated import handle
 from .generate_conversation_name_when_first_message_created import handle
 from .create_document_index import handle
+from .build_full_text_index_when_missing import handle
@@ -0,0 +1,12 @@
+from events.dataset_event import dataset_full_text_index_was_missing
+from extensions.ext_redis import redis_client
+from tasks.build_dataset_full_text_index_task import build_dataset_full_text_index_task
+
+
+@dataset_full_text_index_was_missing.connect
+def handle(sender, **kwargs):
+    dataset = sender
+    # only one build is queued per dataset, the task deletes the key when it is done
+    indexing_cache_key = 'dataset_{}_full_text_indexing'.format(dataset.id)
+    if redis_client.set(indexing_cache_key, 1, nx=True, ex=3600):
+        build_dataset_full_text_index_task.delay(dataset.id)
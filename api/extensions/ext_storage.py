@@ -1,12 +1,18 @@
 import os
 import shutil
-from contextlib import closing
-from typing import Union, Generator
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Union, Generator, Optional, Iterator
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from flask import Flask
 
+# size of the chunks yielded by stream reads
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class Storage:
     def __init__(self):
@@ -19,12 +25,17 @@ class Storage:
         self.storage_type = app.config.get('STORAGE_TYPE')
         if self.storage_type == 's3':
             self.bucket_name = app.config.get('S3_BUCKET_NAME')
+            # the client is thread safe and shared by the process, keep its connections alive between calls
             self.client = boto3.client(
                 's3',
                 aws_secret_access_key=app.config.get('S3_SECRET_KEY'),
                 aws_access_key_id=app.config.get('S3_ACCESS_KEY'),
                 endpoint_url=app.config.get('S3_ENDPOINT'),
-                region_name=app.config.get('S3_REGION')
+                region_name=app.config.get('S3_REGION'),
+                config=Config(
+                    max_pool_connections=int(app.config.get('S3_MAX_POOL_CONNECTIONS')),
+                    tcp_keepalive=True
+                )
             )
         else:
             self.folder = app.config.get('STORAGE_LOCAL_PATH')
@@ -55,8 +66,7 @@ class Storage:
     def load_once(self, filename: str) -> bytes:
         if self.storage_type == 's3':
             try:
-                with closing(self.client) as client:
-                    data = client.get_object(Bucket=self.bucket_name, Key=filename)['Body'].read()
+                data = self.client.get_object(Bucket=self.bucket_name, Key=filename)['Body'].read()
             except ClientError as ex:
                 if ex.response['Error']['Code'] == 'NoSuchKey':
                     raise FileNotFoundError("File not found")
@@ -76,14 +86,16 @@ class Storage:
 
         return data
 
-    def load_stream(self, filename: str) -> Generator:
+    def load_stream(self, filename: str, start: int = 0, end: Optional[int] = None) -> Generator:
+        """
+        Stream the file in chunks, optionally only the bytes from `start` to `end` (inclusive).
+        """
         def generate(filename: str = filename) -> Generator:
             if self.storage_type == 's3':
                 try:
-                    with closing(self.client) as client:
-                        response = client.get_object(Bucket=self.bucket_name, Key=filename)
-                        for chunk in response['Body'].iter_chunks():
-                            yield chunk
+                    response = self._get_s3_object(filename, start, end)
+                    for chunk in response['Body'].iter_chunks(chunk_size=STREAM_CHUNK_SIZE):
+                        yield chunk
                 except ClientError as ex:
                     if ex.response['Error']['Code'] == 'NoSuchKey':
                         raise FileNotFoundError("File not found")
@@ -99,15 +111,67 @@ class Storage:
                     raise FileNotFoundError("File not found")
 
                 with open(filename, "rb") as f:
-                    while chunk := f.read(4096):  # Read in chunks of 4KB
+                    f.seek(start)
+                    remaining = end - start + 1 if end is not None else None
+                    while remaining is None or remaining > 0:
+                        chunk = f.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        if remaining is not None:
+                            remaining -= len(chunk)
                         yield chunk
 
         return generate()
 
+    def load_range(self, filename: str, start: int, end: Optional[int] = None) -> bytes:
+        """
+        Load the bytes from `start` to `end` (inclusive) of the file, to the end of the file when `end` is None.
+        """
+        return b''.join(self.load_stream(filename, start, end))
+
+    @contextmanager
+    def local_file(self, filename: str) -> Iterator[str]:
+        """
+        Path of the file on the local filesystem, for loaders that need a file path.
+
+        Local storage yields the stored file itself without copying it, so it must not be modified.
+        S3 storage downloads it to a temporary file that is removed on exit.
+        """
+        if self.storage_type == 's3':
+            with tempfile.TemporaryDirectory() as temp_dir:
+                file_path = os.path.join(temp_dir, f"{next(tempfile._get_candidate_names())}{Path(filename).suffix}")
+                self.download(filename, file_path)
+                yield file_path
+        else:
+            if not self.folder or self.folder.endswith('/'):
+                filename = self.folder + filename
+            else:
+                filename = self.folder + '/' + filename
+
+            if not os.path.exists(filename):
+                raise FileNotFoundError("File not found")
+
+            yield filename
+
+    def _get_s3_object(self, filename: str, start: int = 0, end: Optional[int] = None) -> dict:
+        if start == 0 and end is None:
+            return self.client.get_object(Bucket=self.bucket_name, Key=filename)
+
+        return self.client.get_object(
+            Bucket=self.bucket_name,
+            Key=filename,
+            Range=f"bytes={start}-{end if end is not None else ''}"
+        )
+
     def download(self, filename, target_filepath):
         if self.storage_type == 's3':
-            with closing(self.client) as client:
-                client.download_file(self.bucket_name, filename, target_filepath)
+            try:
+                self.client.download_file(self.bucket_name, filename, target_filepath)
+            except ClientError as ex:
+                if ex.response['Error']['Code'] in ['404', 'NoSuchKey']:
+                    raise FileNotFoundError("File not found")
+                else:
+                    raise
         else:
             if not self.folder or self.folder.endswith('/'):
                 filename = self.folder + filename
@@ -121,12 +185,11 @@ class Storage:
 
     def exists(self, filename):
         if self.storage_type == 's3':
-            with closing(self.client) as client:
-                try:
-                    client.head_object(Bucket=self.bucket_name, Key=filename)
-                    return True
-                except:
-                    return False
+            try:
+                self.client.head_object(Bucket=self.bucket_name, Key=filename)
+                return True
+            except:
+                return False
         else:
             if not self.folder or self.folder.endswith('/'):
                 filename = self.folder + filename
@@ -135,6 +198,18 @@ class Storage:
 
             return os.path.exists(filename)
 
+    def delete(self, filename):
+        if self.storage_type == 's3':
+            self.client.delete_object(Bucket=self.bucket_name, Key=filename)
+        else:
+            if not self.folder or self.folder.endswith('/'):
+                filename = self.folder + filename
+            else:
+                filename = self.folder + '/' + filename
+
+            if os.path.exists(filename):
+                os.remove(filename)
+
 
 storage = Storage()
 
@@ -0,0 +1,50 @@
+import functools
+from typing import Any, Callable, Dict, Iterable, List
+
+PREFETCHED_ATTRIBUTE = '_prefetched'
+
+
+def prefetchable(getter: Callable) -> Callable:
+    """
+    Decorates the getter of a model property whose value can be batch loaded with `prefetch`.
+    Instances without a prefetched value run the getter and its query as before.
+    """
+    name = getter.__name__
+
+    @functools.wraps(getter)
+    def wrapper(self):
+        prefetched = self.__dict__.get(PREFETCHED_ATTRIBUTE)
+        if prefetched is not None and name in prefetched:
+            return prefetched[name]
+
+        return getter(self)
+
+    return wrapper
+
+
+def set_prefetched(instance: Any, name: str, value: Any):
+    instance.__dict__.setdefault(PREFETCHED_ATTRIBUTE, {})[name] = value
+
+
+def prefetch(instances: list, loaders: Dict[str, Callable[[List[str]], Dict[str, Any]]],
+             attributes: Iterable[str]):
+    """
+    Batch load attributes of a page of model instances, one query per attribute instead of one per instance.
+
+    :param instances: model instances of the page
+    :param loaders: attribute name to a loader returning the value of every given instance id
+    :param attributes: names of the attributes to load
+    """
+    attributes = list(attributes)
+    for name in attributes:
+        if name not in loaders:
+            raise ValueError(f'{name} can not be prefetched.')
+
+    ids = list(dict.fromkeys(instance.id for instance in instances))
+    if not ids:
+        return
+
+    for name in attributes:
+        values = loaders[name](ids)
+        for instance in instances:
+            set_prefetched(instance, name, values[instance.id])
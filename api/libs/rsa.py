@@ -1,6 +1,8 @@
 # -*- coding:utf-8 -*-
 import hashlib
+import threading
 
+from cachetools import TTLCache
 from Crypto.Cipher import PKCS1_OAEP, AES
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
@@ -8,6 +10,10 @@ from Crypto.Random import get_random_bytes
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
 
+# parsed private keys per tenant, kept in process for as long as the PEM is cached in redis
+_private_key_cache = TTLCache(maxsize=1024, ttl=120)
+_private_key_cache_lock = threading.Lock()
+
 
 def generate_key_pair(tenant_id):
     private_key = RSA.generate(2048)
@@ -20,6 +26,8 @@ def generate_key_pair(tenant_id):
 
     storage.save(filepath, pem_private)
 
+    invalidate_private_key(tenant_id)
+
     return pem_public.decode()
 
 
@@ -45,10 +53,20 @@ def encrypt(text, public_key):
     return prefix_hybrid + encrypted_data
 
 
-def decrypt(encrypted_text, tenant_id):
+def get_private_key_cache_key(tenant_id):
+    filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
+    return 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+
+
+def get_private_key(tenant_id) -> RSA.RsaKey:
+    with _private_key_cache_lock:
+        rsa_key = _private_key_cache.get(tenant_id)
+    if rsa_key:
+        return rsa_key
+
     filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
 
-    cache_key = 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+    cache_key = get_private_key_cache_key(tenant_id)
     private_key = redis_client.get(cache_key)
     if not private_key:
         try:
@@ -59,6 +77,22 @@ def decrypt(encrypted_text, tenant_id):
         redis_client.setex(cache_key, 120, private_key)
 
     rsa_key = RSA.import_key(private_key)
+
+    with _private_key_cache_lock:
+        _private_key_cache[tenant_id] = rsa_key
+
+    return rsa_key
+
+
+def invalidate_private_key(tenant_id):
+    with _private_key_cache_lock:
+        _private_key_cache.pop(tenant_id, None)
+
+    redis_client.delete(get_private_key_cache_key(tenant_id))
+
+
+def decrypt(encrypted_text, tenant_id):
+    rsa_key = get_private_key(tenant_id)
     cipher_rsa = PKCS1_OAEP.new(rsa_key)
 
     if encrypted_text.startswith(prefix_hybrid):
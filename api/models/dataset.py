@@ -6,6 +6,7 @@ from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 from extensions.ext_database import db
+from libs.prefetch import prefetchable, prefetch
 from models.account import Account
 from models.model import App, UploadFile
 
@@ -65,10 +66,12 @@ class Dataset(db.Model):
             .order_by(DatasetProcessRule.created_at.desc()).first()
 
     @property
+    @prefetchable
     def app_count(self):
         return db.session.query(func.count(AppDatasetJoin.id)).filter(AppDatasetJoin.dataset_id == self.id).scalar()
 
     @property
+    @prefetchable
     def document_count(self):
         return db.session.query(func.count(Document.id)).filter(Document.dataset_id == self.id).scalar()
 
@@ -90,6 +93,7 @@ class Dataset(db.Model):
         ).scalar()
 
     @property
+    @prefetchable
     def word_count(self):
         return Document.query.with_entities(func.coalesce(func.sum(Document.word_count))) \
             .filter(Document.dataset_id == self.id).scalar()
@@ -108,6 +112,19 @@ class Dataset(db.Model):
         }
         return self.retrieval_model if self.retrieval_model else default_retrieval_model
 
+    @classmethod
+    def prefetch(cls, datasets: list['Dataset'], *attributes: str):
+        """
+        Batch load the aggregates of a page of datasets before they are marshalled.
+
+        Usage: Dataset.prefetch(datasets, 'document_count', 'word_count')
+        """
+        prefetch(datasets, {
+            'app_count': lambda ids: _count_by(AppDatasetJoin.dataset_id, func.count(AppDatasetJoin.id), ids, 0),
+            'document_count': lambda ids: _count_by(Document.dataset_id, func.count(Document.id), ids, 0),
+            'word_count': lambda ids: _count_by(Document.dataset_id, func.sum(Document.word_count), ids, None),
+        }, attributes)
+
 
 class DatasetProcessRule(db.Model):
     __tablename__ = 'dataset_process_rules'
@@ -199,6 +216,7 @@ class Document(db.Model):
     # indexing
     tokens = db.Column(db.Integer, nullable=True)
     indexing_latency = db.Column(db.Float, nullable=True)
+    indexing_stage_latency = db.Column(db.JSON, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
 
     # pause
@@ -303,14 +321,32 @@ class Document(db.Model):
         return db.session.query(Dataset).filter(Dataset.id == self.dataset_id).one_or_none()
 
     @property
+    @prefetchable
     def segment_count(self):
         return DocumentSegment.query.filter(DocumentSegment.document_id == self.id).count()
 
     @property
+    @prefetchable
     def hit_count(self):
         return DocumentSegment.query.with_entities(func.coalesce(func.sum(DocumentSegment.hit_count))) \
             .filter(DocumentSegment.document_id == self.id).scalar()
 
+    @classmethod
+    def prefetch(cls, documents: list['Document'], *attributes: str):
+        """
+        Batch load the segment aggregates of a page of documents before they are marshalled.
+
+        Usage: Document.prefetch(documents, 'hit_count')
+        """
+        prefetch(documents, {
+            'segment_count': lambda ids: _count_by(
+                DocumentSegment.document_id, func.count(DocumentSegment.id), ids, 0
+            ),
+            'hit_count': lambda ids: _count_by(
+                DocumentSegment.document_id, func.sum(DocumentSegment.hit_count), ids, None
+            ),
+        }, attributes)
+
 
 class DocumentSegment(db.Model):
     __tablename__ = 'document_segments'
@@ -443,6 +479,55 @@ class DatasetKeywordTable(db.Model):
         return json.loads(self.keyword_table, cls=SetDecoder) if self.keyword_table else None
 
 
+class DatasetKeyword(db.Model):
+    __tablename__ = 'dataset_keywords'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_pkey'),
+        db.UniqueConstraint('dataset_id', 'keyword', 'index_node_id', name='dataset_keyword_posting_idx'),
+        db.Index('dataset_keyword_dataset_node_idx', 'dataset_id', 'index_node_id'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    keyword = db.Column(db.String(255), nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
+class DatasetFullTextIndex(db.Model):
+    __tablename__ = 'dataset_full_text_indexes'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_full_text_index_pkey'),
+        db.UniqueConstraint('dataset_id', name='dataset_full_text_index_dataset_id_idx'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    # number of indexed segments and the sum of their lengths in terms, for the bm25 idf and average length
+    document_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    total_length = db.Column(db.BigInteger, nullable=False, server_default=db.text('0'))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
+class DatasetFullTextPosting(db.Model):
+    __tablename__ = 'dataset_full_text_postings'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_full_text_posting_pkey'),
+        db.UniqueConstraint('dataset_id', 'term', 'index_node_id', name='dataset_full_text_posting_idx'),
+        db.Index('dataset_full_text_posting_node_idx', 'dataset_id', 'index_node_id'),
+        db.Index('dataset_full_text_posting_document_idx', 'dataset_id', 'document_id'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    term = db.Column(db.String(255), nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    document_id = db.Column(UUID, nullable=False)
+    term_frequency = db.Column(db.Integer, nullable=False)
+    # length of the segment in terms, kept on every posting so scoring does not join the segments
+    document_length = db.Column(db.Integer, nullable=False)
+
+
 class Embedding(db.Model):
     __tablename__ = 'embeddings'
     __table_args__ = (
@@ -478,3 +563,14 @@ class DatasetCollectionBinding(db.Model):
     type = db.Column(db.String(40), server_default=db.text("'dataset'::character varying"), nullable=False)
     collection_name = db.Column(db.String(64), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
+def _count_by(group_column, aggregate, ids: list[str], default) -> dict:
+    """Aggregate grouped by the parent id column, `default` for the parents without rows."""
+    values = dict.fromkeys(ids, default)
+    values.update(
+        db.session.query(group_column, aggregate)
+        .filter(group_column.in_(ids))
+        .group_by(group_column).all()
+    )
+    return values
@@ -2,11 +2,13 @@ import json
 
 from flask import current_app, request
 from flask_login import UserMixin
-from sqlalchemy import Float
+from sqlalchemy import Float, func
 from sqlalchemy.dialects.postgresql import UUID
 
+from core.app_model_config_snapshot import AppModelConfigSnapshot, app_model_config_snapshot_cache
 from core.file.upload_file_parser import UploadFileParser
 from libs.helper import generate_string
+from libs.prefetch import prefetchable, prefetch
 from extensions.ext_database import db
 from .account import Account, Tenant
 
@@ -106,6 +108,14 @@ class AppModelConfig(db.Model):
         app = db.session.query(App).filter(App.id == self.app_id).first()
         return app
 
+    @property
+    def snapshot(self) -> AppModelConfigSnapshot:
+        """
+        Parsed, read-only config shared by the requests of the same config version.
+        The *_dict / *_list properties parse their column on each access, use them to get values to modify.
+        """
+        return app_model_config_snapshot_cache.get(self)
+
     @property
     def model_dict(self) -> dict:
         return json.loads(self.model) if self.model else None
@@ -408,18 +418,22 @@ class Conversation(db.Model):
                 return ''
 
     @property
+    @prefetchable
     def annotated(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).count() > 0
 
     @property
+    @prefetchable
     def annotation(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).first()
 
     @property
+    @prefetchable
     def message_count(self):
         return db.session.query(Message).filter(Message.conversation_id == self.id).count()
 
     @property
+    @prefetchable
     def user_feedback_stats(self):
         like = db.session.query(MessageFeedback) \
             .filter(MessageFeedback.conversation_id == self.id,
@@ -434,6 +448,7 @@ class Conversation(db.Model):
         return {'like': like, 'dislike': dislike}
 
     @property
+    @prefetchable
     def admin_feedback_stats(self):
         like = db.session.query(MessageFeedback) \
             .filter(MessageFeedback.conversation_id == self.id,
@@ -448,8 +463,10 @@ class Conversation(db.Model):
         return {'like': like, 'dislike': dislike}
 
     @property
+    @prefetchable
     def first_message(self):
-        return db.session.query(Message).filter(Message.conversation_id == self.id).first()
+        return db.session.query(Message).filter(Message.conversation_id == self.id) \
+            .order_by(Message.created_at.asc()).first()
 
     @property
     def app(self):
@@ -468,6 +485,72 @@ class Conversation(db.Model):
     def in_debug_mode(self):
         return self.override_model_configs is not None
 
+    @classmethod
+    def prefetch(cls, conversations: list['Conversation'], *attributes: str):
+        """
+        Batch load the aggregates of a page of conversations before they are marshalled.
+
+        Usage: Conversation.prefetch(conversations, 'message_count', 'user_feedback_stats')
+        """
+        prefetch(conversations, {
+            'annotated': cls._load_annotated,
+            'annotation': cls._load_annotation,
+            'message_count': cls._load_message_count,
+            'user_feedback_stats': lambda ids: cls._load_feedback_stats(ids, 'user'),
+            'admin_feedback_stats': lambda ids: cls._load_feedback_stats(ids, 'admin'),
+            'first_message': cls._load_first_message,
+        }, attributes)
+
+    @staticmethod
+    def _load_annotated(ids: list[str]) -> dict:
+        annotated_ids = {
+            row.conversation_id for row in db.session.query(MessageAnnotation.conversation_id)
+            .filter(MessageAnnotation.conversation_id.in_(ids)).distinct().all()
+        }
+        return {conversation_id: conversation_id in annotated_ids for conversation_id in ids}
+
+    @staticmethod
+    def _load_annotation(ids: list[str]) -> dict:
+        annotations = dict.fromkeys(ids)
+        for annotation in db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id.in_(ids)).all():
+            if annotations[annotation.conversation_id] is None:
+                annotations[annotation.conversation_id] = annotation
+        return annotations
+
+    @staticmethod
+    def _load_message_count(ids: list[str]) -> dict:
+        message_counts = dict.fromkeys(ids, 0)
+        message_counts.update(
+            db.session.query(Message.conversation_id, func.count(Message.id))
+            .filter(Message.conversation_id.in_(ids))
+            .group_by(Message.conversation_id).all()
+        )
+        return message_counts
+
+    @staticmethod
+    def _load_feedback_stats(ids: list[str], from_source: str) -> dict:
+        stats = {conversation_id: {'like': 0, 'dislike': 0} for conversation_id in ids}
+        rows = db.session.query(MessageFeedback.conversation_id, MessageFeedback.rating,
+                                func.count(MessageFeedback.id)) \
+            .filter(MessageFeedback.conversation_id.in_(ids),
+                    MessageFeedback.from_source == from_source,
+                    MessageFeedback.rating.in_(['like', 'dislike'])) \
+            .group_by(MessageFeedback.conversation_id, MessageFeedback.rating).all()
+        for conversation_id, rating, count in rows:
+            stats[conversation_id][rating] = count
+        return stats
+
+    @staticmethod
+    def _load_first_message(ids: list[str]) -> dict:
+        first_messages = dict.fromkeys(ids)
+        first_messages.update(
+            (message.conversation_id, message) for message in db.session.query(Message)
+            .filter(Message.conversation_id.in_(ids))
+            .distinct(Message.conversation_id)
+            .order_by(Message.conversation_id, Message.created_at.asc()).all()
+        )
+        return first_messages
+
 
 class Message(db.Model):
     __tablename__ = 'messages'
@@ -506,23 +589,27 @@ class Message(db.Model):
     agent_based = db.Column(db.Boolean, nullable=False, server_default=db.text('false'))
 
     @property
+    @prefetchable
     def user_feedback(self):
         feedback = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id,
                                                             MessageFeedback.from_source == 'user').first()
         return feedback
 
     @property
+    @prefetchable
     def admin_feedback(self):
         feedback = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id,
                                                             MessageFeedback.from_source == 'admin').first()
         return feedback
 
     @property
+    @prefetchable
     def feedbacks(self):
         feedbacks = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id).all()
         return feedbacks
 
     @property
+    @prefetchable
     def annotation(self):
         annotation = db.session.query(MessageAnnotation).filter(MessageAnnotation.message_id == self.id).first()
         return annotation
@@ -587,6 +674,44 @@ class Message(db.Model):
 
         return files
 
+    @classmethod
+    def prefetch(cls, messages: list['Message'], *attributes: str):
+        """
+        Batch load the feedbacks and annotations of a page of messages before they are marshalled.
+
+        Usage: Message.prefetch(messages, 'user_feedback', 'annotation')
+        """
+        prefetch(messages, {
+            'user_feedback': lambda ids: cls._load_feedback(ids, 'user'),
+            'admin_feedback': lambda ids: cls._load_feedback(ids, 'admin'),
+            'feedbacks': cls._load_feedbacks,
+            'annotation': cls._load_annotation,
+        }, attributes)
+
+    @staticmethod
+    def _load_feedback(ids: list[str], from_source: str) -> dict:
+        feedbacks = dict.fromkeys(ids)
+        for feedback in db.session.query(MessageFeedback).filter(MessageFeedback.message_id.in_(ids),
+                                                                 MessageFeedback.from_source == from_source).all():
+            if feedbacks[feedback.message_id] is None:
+                feedbacks[feedback.message_id] = feedback
+        return feedbacks
+
+    @staticmethod
+    def _load_feedbacks(ids: list[str]) -> dict:
+        feedbacks = {message_id: [] for message_id in ids}
+        for feedback in db.session.query(MessageFeedback).filter(MessageFeedback.message_id.in_(ids)).all():
+            feedbacks[feedback.message_id].append(feedback)
+        return feedbacks
+
+    @staticmethod
+    def _load_annotation(ids: list[str]) -> dict:
+        annotations = dict.fromkeys(ids)
+        for annotation in db.session.query(MessageAnnotation).filter(MessageAnnotation.message_id.in_(ids)).all():
+            if annotations[annotation.message_id] is None:
+                annotations[annotation.message_id] = annotation
+        return annotations
+
 
 class MessageFeedback(db.Model):
     __tablename__ = 'message_feedbacks'
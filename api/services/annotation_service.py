@@ -8,6 +8,7 @@ from sqlalchemy import or_
 from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import NotFound
 
+from core.app_model_config_snapshot import app_model_config_snapshot_cache
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from models.model import MessageAnnotation, Message, App, AppAnnotationHitHistory, AppAnnotationSetting
@@ -412,6 +413,7 @@ class AppAnnotationService:
         annotation_setting.updated_at = datetime.datetime.utcnow()
         db.session.add(annotation_setting)
         db.session.commit()
+        app_model_config_snapshot_cache.invalidate(app_id)
 
         collection_binding_detail = annotation_setting.collection_binding_detail
 
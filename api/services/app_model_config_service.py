@@ -5,9 +5,12 @@ from core.external_data_tool.factory import ExternalDataToolFactory
 from core.moderation.factory import ModerationFactory
 from core.prompt.prompt_transform import AppMode
 from core.agent.agent_executor import PlanningStrategy
+from core.app_model_config_snapshot import app_model_config_snapshot_cache
 from core.model_providers.model_provider_factory import ModelProviderFactory
 from core.model_providers.models.entity.model_params import ModelType, ModelMode
+from extensions.ext_database import db
 from models.account import Account
+from models.model import App, AppModelConfig
 from services.dataset_service import DatasetService
 
 
@@ -15,6 +18,25 @@ SUPPORT_TOOLS = ["dataset", "google_search", "web_reader", "wikipedia", "current
 
 
 class AppModelConfigService:
+    @classmethod
+    def update_app_model_config(cls, app: App, model_configuration: dict) -> AppModelConfig:
+        """Save a validated configuration as the new config of the app."""
+        new_app_model_config = AppModelConfig(
+            app_id=app.id,
+        )
+        new_app_model_config = new_app_model_config.from_model_config_dict(model_configuration)
+
+        db.session.add(new_app_model_config)
+        db.session.flush()
+
+        app.app_model_config_id = new_app_model_config.id
+        db.session.commit()
+
+        # the snapshots of the previous configs are no longer read by new requests
+        app_model_config_snapshot_cache.invalidate(app.id)
+
+        return new_app_model_config
+
     @classmethod
     def is_dataset_exists(cls, account: Account, dataset_id: str) -> bool:
         # verify if the dataset ID exists
@@ -1,6 +1,5 @@
 import json
 import logging
-import threading
 import time
 import uuid
 from typing import Generator, Union, Any, Optional, List
@@ -13,6 +12,7 @@ from core.completion import Completion
 from core.conversation_message_task import PubHandler, ConversationTaskStoppedException, \
     ConversationTaskInterruptException
 from core.file.message_file_parser import MessageFileParser
+from core.generate_task_scheduler import get_generate_task_scheduler
 from core.model_providers.error import LLMBadRequestError, LLMAPIConnectionError, LLMAPIUnavailableError, \
     LLMRateLimitError, \
     LLMAuthorizationError, ProviderTokenNotInitError, QuotaExceededError, ModelCurrentlyNotSupportError
@@ -152,8 +152,10 @@ class CompletionService:
 
         user = cls.get_real_user_instead_of_proxy_obj(user)
 
-        generate_worker_thread = threading.Thread(target=cls.generate_worker, kwargs={
-            'flask_app': current_app._get_current_object(),
+        flask_app = current_app._get_current_object()
+        # the scheduler pings the stream and stops the task after 10 minutes
+        get_generate_task_scheduler(flask_app).submit(cls.generate_worker, kwargs={
+            'flask_app': flask_app,
             'generate_task_id': generate_task_id,
             'detached_app_model': app_model,
             'app_model_config': app_model_config.copy(),
@@ -167,13 +169,7 @@ class CompletionService:
             'retriever_from': args['retriever_from'] if 'retriever_from' in args else 'dev',
             'auto_generate_name': auto_generate_name,
             'from_source': from_source
-        })
-
-        generate_worker_thread.start()
-
-        # wait for 10 minutes to close the thread
-        cls.countdown_and_close(current_app._get_current_object(), generate_worker_thread, pubsub, user,
-                                generate_task_id)
+        }, user=user, task_id=generate_task_id, pubsub=pubsub)
 
         return cls.compact_response(pubsub, streaming)
 
@@ -236,39 +232,6 @@ class CompletionService:
             finally:
                 db.session.remove()
 
-    @classmethod
-    def countdown_and_close(cls, flask_app: Flask, worker_thread, pubsub, detached_user,
-                            generate_task_id) -> threading.Thread:
-        # wait for 10 minutes to close the thread
-        timeout = 600
-
-        def close_pubsub():
-            with flask_app.app_context():
-                try:
-                    user = db.session.merge(detached_user)
-
-                    sleep_iterations = 0
-                    while sleep_iterations < timeout and worker_thread.is_alive():
-                        if sleep_iterations > 0 and sleep_iterations % 10 == 0:
-                            PubHandler.ping(user, generate_task_id)
-
-                        time.sleep(1)
-                        sleep_iterations += 1
-
-                    if worker_thread.is_alive():
-                        PubHandler.stop(user, generate_task_id)
-                        try:
-                            pubsub.close()
-                        except Exception:
-                            pass
-                finally:
-                    db.session.remove()
-
-        countdown_thread = threading.Thread(target=close_pubsub)
-        countdown_thread.start()
-
-        return countdown_thread
-
     @classmethod
     def generate_more_like_this(cls, app_model: App, user: Union[Account, EndUser],
                                 message_id: str, streaming: bool = True,
@@ -313,8 +276,10 @@ class CompletionService:
 
         user = cls.get_real_user_instead_of_proxy_obj(user)
 
-        generate_worker_thread = threading.Thread(target=cls.generate_worker, kwargs={
-            'flask_app': current_app._get_current_object(),
+        flask_app = current_app._get_current_object()
+        # the scheduler pings the stream and stops the task after 10 minutes
+        get_generate_task_scheduler(flask_app).submit(cls.generate_worker, kwargs={
+            'flask_app': flask_app,
             'generate_task_id': generate_task_id,
             'detached_app_model': app_model,
             'app_model_config': app_model_config.copy(),
@@ -327,13 +292,7 @@ class CompletionService:
             'is_model_config_override': True,
             'retriever_from': retriever_from,
             'auto_generate_name': False
-        })
-
-        generate_worker_thread.start()
-
-        # wait for 10 minutes to close the thread
-        cls.countdown_and_close(current_app._get_current_object(), generate_worker_thread, pubsub, user,
-                                generate_task_id)
+        }, user=user, task_id=generate_task_id, pubsub=pubsub)
 
         return cls.compact_response(pubsub, streaming)
 
@@ -345,7 +304,7 @@ class CompletionService:
         filtered_inputs = {}
 
         # Filter input variables from form configuration, handle required fields, default values, and option values
-        input_form_config = app_model_config.user_input_form_list
+        input_form_config = app_model_config.snapshot.user_input_form_list
         for config in input_form_config:
             input_config = list(config.values())[0]
             variable = input_config["variable"]
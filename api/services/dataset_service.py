@@ -55,6 +55,7 @@ class DatasetService:
             max_per_page=100,
             error_out=False
         )
+        Dataset.prefetch(datasets.items, 'app_count', 'document_count', 'word_count')
 
         return datasets.items, datasets.total
 
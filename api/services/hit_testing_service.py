@@ -6,9 +6,7 @@ from typing import List
 
 import numpy as np
 from flask import current_app
-from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
-from sklearn.manifold import TSNE
 
 from core.embedding.cached_embedding import CacheEmbedding
 from core.model_providers.model_factory import ModelFactory
@@ -119,31 +117,32 @@ class HitTestingService:
         return cls.compact_retrieve_response(dataset, embeddings, query, all_documents)
 
     @classmethod
-    def compact_retrieve_response(cls, dataset: Dataset, embeddings: Embeddings, query: str, documents: List[Document]):
+    def compact_retrieve_response(cls, dataset: Dataset, embeddings: CacheEmbedding, query: str,
+                                  documents: List[Document]):
+        # the query and the segments were embedded by retrieval and indexing, so the vectors come from the cache
         text_embeddings = [
             embeddings.embed_query(query)
         ]
 
         text_embeddings.extend(embeddings.embed_documents([document.page_content for document in documents]))
 
-        tsne_position_data = cls.get_tsne_positions_from_embeddings(text_embeddings)
+        tsne_position_data = cls.get_positions_from_embeddings(text_embeddings)
 
         query_position = tsne_position_data.pop(0)
 
-        i = 0
-        records = []
-        for document in documents:
-            index_node_id = document.metadata['doc_id']
-
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == dataset.id,
-                DocumentSegment.enabled == True,
-                DocumentSegment.status == 'completed',
-                DocumentSegment.index_node_id == index_node_id
-            ).first()
+        index_node_ids = [document.metadata['doc_id'] for document in documents]
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == dataset.id,
+            DocumentSegment.enabled == True,
+            DocumentSegment.status == 'completed',
+            DocumentSegment.index_node_id.in_(index_node_ids)
+        ).all() if index_node_ids else []
+        segment_map = {segment.index_node_id: segment for segment in segments}
 
+        records = []
+        for i, document in enumerate(documents):
+            segment = segment_map.get(document.metadata['doc_id'])
             if not segment:
-                i += 1
                 continue
 
             record = {
@@ -154,8 +153,6 @@ class HitTestingService:
 
             records.append(record)
 
-            i += 1
-
         return {
             "query": {
                 "content": query,
@@ -165,26 +162,38 @@ class HitTestingService:
         }
 
     @classmethod
-    def get_tsne_positions_from_embeddings(cls, embeddings: list):
+    def get_positions_from_embeddings(cls, embeddings: list):
+        """
+        Project the embeddings to 2-D with PCA.
+
+        Unlike t-SNE, PCA is deterministic and takes milliseconds for a page of results,
+        so it runs inline with the hit testing request.
+        """
         embedding_length = len(embeddings)
         if embedding_length <= 1:
             return [{'x': 0, 'y': 0}]
 
-        concatenate_data = np.array(embeddings).reshape(embedding_length, -1)
-        # concatenate_data = np.concatenate(embeddings)
+        concatenate_data = np.array(embeddings, dtype=np.float64).reshape(embedding_length, -1)
+        centered_data = concatenate_data - concatenate_data.mean(axis=0)
+
+        # principal axes are the right singular vectors of the centered data
+        _, _, vt = np.linalg.svd(centered_data, full_matrices=False)
+        components = vt[:2]
 
-        perplexity = embedding_length / 2 + 1
-        if perplexity >= embedding_length:
-            perplexity = max(embedding_length - 1, 1)
+        # the sign of a singular vector is arbitrary, fix it so the same results give the same layout
+        for component in components:
+            if component[np.argmax(np.abs(component))] < 0:
+                component *= -1
 
-        tsne = TSNE(n_components=2, perplexity=perplexity, early_exaggeration=12.0)
-        data_tsne = tsne.fit_transform(concatenate_data)
+        data_pca = centered_data @ components.T
+        if data_pca.shape[1] < 2:
+            data_pca = np.pad(data_pca, ((0, 0), (0, 2 - data_pca.shape[1])))
 
-        tsne_position_data = []
-        for i in range(len(data_tsne)):
-            tsne_position_data.append({'x': float(data_tsne[i][0]), 'y': float(data_tsne[i][1])})
+        position_data = []
+        for i in range(len(data_pca)):
+            position_data.append({'x': float(data_pca[i][0]), 'y': float(data_pca[i][1])})
 
-        return tsne_position_data
+        return position_data
 
     @classmethod
     def hit_testing_args_check(cls, args):
@@ -60,6 +60,7 @@ class MessageService:
                 has_more = True
 
         history_messages = list(reversed(history_messages))
+        Message.prefetch(history_messages, 'user_feedback')
 
         return InfiniteScrollPagination(
             data=history_messages,
@@ -7,6 +7,7 @@ from typing import Optional
 
 import requests
 
+from core.helper import encrypter
 from core.model_providers.model_factory import ModelFactory
 from extensions.ext_database import db
 from core.model_providers.model_provider_factory import ModelProviderFactory
@@ -234,6 +235,8 @@ class ProviderService:
             db.session.add(provider)
             db.session.commit()
 
+        encrypter.invalidate_decrypted_tokens(tenant_id)
+
     def delete_custom_provider(self, tenant_id: str, provider_name: str) -> None:
         """
         delete custom provider.
@@ -259,6 +262,8 @@ class ProviderService:
             db.session.delete(provider)
             db.session.commit()
 
+            encrypter.invalidate_decrypted_tokens(tenant_id)
+
     def custom_provider_model_config_validate(self,
                                               provider_name: str,
                                               model_name: str,
@@ -363,6 +368,8 @@ class ProviderService:
             db.session.add(provider_model)
             db.session.commit()
 
+        encrypter.invalidate_decrypted_tokens(tenant_id)
+
     def delete_custom_provider_model(self,
                                      tenant_id: str,
                                      provider_name: str,
@@ -390,6 +397,8 @@ class ProviderService:
             db.session.delete(provider_model)
             db.session.commit()
 
+            encrypter.invalidate_decrypted_tokens(tenant_id)
+
     def switch_preferred_provider(self, tenant_id: str, provider_name: str, preferred_provider_type: str) -> None:
         """
         switch preferred provider.
@@ -6,6 +6,7 @@ import click
 from celery import shared_task
 from werkzeug.exceptions import NotFound
 
+from core.app_model_config_snapshot import app_model_config_snapshot_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -60,6 +61,7 @@ def disable_annotation_reply_task(job_id: str, app_id: str, tenant_id: str):
         # delete annotation setting
         db.session.delete(app_annotation_setting)
         db.session.commit()
+        app_model_config_snapshot_cache.invalidate(app_id)
 
         end_at = time.perf_counter()
         logging.info(
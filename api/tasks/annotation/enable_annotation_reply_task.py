@@ -7,6 +7,7 @@ from celery import shared_task
 from langchain.schema import Document
 from werkzeug.exceptions import NotFound
 
+from core.app_model_config_snapshot import app_model_config_snapshot_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -91,6 +92,7 @@ def enable_annotation_reply_task(job_id: str, app_id: str, user_id: str, tenant_
                                     fg='red'))
                 index.add_texts(documents)
         db.session.commit()
+        app_model_config_snapshot_cache.invalidate(app_id)
         redis_client.setex(enable_app_annotation_job_key, 600, 'completed')
         end_at = time.perf_counter()
         logging.info(
@@ -0,0 +1,40 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+
+from core.index.full_text_index.full_text_index import FullTextIndex
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import Dataset
+
+
+@shared_task(queue='dataset')
+def build_dataset_full_text_index_task(dataset_id: str):
+    """
+    Async build the full-text index of a dataset indexed before the full-text index existed
+    :param dataset_id:
+    Usage: build_dataset_full_text_index_task.delay(dataset_id)
+    """
+    logging.info(click.style('Start build dataset full-text index: {}'.format(dataset_id), fg='green'))
+    start_at = time.perf_counter()
+
+    indexing_cache_key = 'dataset_{}_full_text_indexing'.format(dataset_id)
+
+    try:
+        dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
+        if not dataset:
+            logging.info(click.style('Dataset {} not found, pass.'.format(dataset_id), fg='cyan'))
+            return
+
+        segment_count = FullTextIndex(dataset).build()
+
+        end_at = time.perf_counter()
+        logging.info(click.style('Built dataset full-text index: {} with {} segments latency: {}'.format(
+            dataset_id, segment_count, end_at - start_at), fg='green'))
+    except Exception:
+        logging.exception("build dataset full-text index failed")
+        db.session.rollback()
+    finally:
+        redis_client.delete(indexing_cache_key)
@@ -6,6 +6,7 @@ from celery import shared_task
 from langchain.schema import Document
 
 from core.index.index import IndexBuilder
+from core.index.vector_index.base import clear_rebuild_checkpoints
 from extensions.ext_database import db
 from models.dataset import DocumentSegment, Dataset
 from models.dataset import Document as DatasetDocument
@@ -30,6 +31,9 @@ def deal_dataset_vector_index_task(dataset_id: str, action: str):
         if not dataset:
             raise Exception('Dataset not found')
 
+        # the vector index is replaced here, a later rebuild must not resume an interrupted one
+        clear_rebuild_checkpoints(dataset_id)
+
         if action == "remove":
             index = IndexBuilder.get_index(dataset, 'high_quality', ignore_high_quality_check=True)
             index.delete_by_group_id(dataset.id)
@@ -0,0 +1,116 @@
+"""
+Benchmark of the storage reads against a local S3 stand-in (moto server) and local storage.
+
+Compares the previous per-call `contextlib.closing(client)` reads with the shared pooled client,
+full reads with ranged reads, and downloading a local file to a temp dir with `local_file`.
+
+Requires moto with server support (`pip install "moto[server]"`), run from the api directory:
+
+    python -m tests.benchmarks.storage_benchmark
+"""
+import os
+import shutil
+import tempfile
+import time
+from contextlib import closing
+
+from flask import Flask
+from moto.server import ThreadedMotoServer
+
+from extensions.ext_storage import Storage
+
+BUCKET_NAME = 'storage-benchmark'
+PORT = 5055
+SMALL_OBJECTS = 200
+LARGE_OBJECT_SIZE = 32 * 1024 * 1024
+
+
+def report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    print('{:<36} p50 {:>8.2f} ms  p99 {:>8.2f} ms  total {:>9.2f} ms'.format(
+        name,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        sum(latencies) * 1000
+    ))
+
+
+def timed(fn, repeat: int) -> list:
+    latencies = []
+    for i in range(repeat):
+        start_at = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start_at)
+    return latencies
+
+
+def create_storage(config: dict) -> Storage:
+    app = Flask(__name__)
+    app.config.update(config)
+    storage = Storage()
+    storage.init_app(app)
+    return storage
+
+
+def benchmark_s3():
+    server = ThreadedMotoServer(port=PORT, verbose=False)
+    server.start()
+
+    try:
+        storage = create_storage({
+            'STORAGE_TYPE': 's3',
+            'S3_BUCKET_NAME': BUCKET_NAME,
+            'S3_ACCESS_KEY': 'benchmark',
+            'S3_SECRET_KEY': 'benchmark',
+            'S3_ENDPOINT': f'http://127.0.0.1:{PORT}',
+            'S3_REGION': 'us-east-1',
+            'S3_MAX_POOL_CONNECTIONS': 50
+        })
+        storage.client.create_bucket(Bucket=BUCKET_NAME)
+
+        for i in range(SMALL_OBJECTS):
+            storage.save(f'small/{i}', os.urandom(16 * 1024))
+        storage.save('large', os.urandom(LARGE_OBJECT_SIZE))
+
+        def load_once_with_closing(i: int):
+            # the previous implementation, closing the shared client tears down its connection pool
+            with closing(storage.client) as client:
+                client.get_object(Bucket=BUCKET_NAME, Key=f'small/{i}')['Body'].read()
+
+        print('== s3 (moto server) ==')
+        report('load_once, closing client per call', timed(load_once_with_closing, SMALL_OBJECTS))
+        report('load_once, pooled client', timed(lambda i: storage.load_once(f'small/{i}'), SMALL_OBJECTS))
+        report('load_once, 32MB object', timed(lambda i: storage.load_once('large'), 5))
+        report('load_range, first 64KB of 32MB', timed(lambda i: storage.load_range('large', 0, 65535), 5))
+    finally:
+        server.stop()
+
+
+def benchmark_local():
+    folder = tempfile.mkdtemp(prefix='storage_benchmark_')
+    try:
+        storage = create_storage({
+            'STORAGE_TYPE': 'local',
+            'STORAGE_LOCAL_PATH': folder
+        })
+        storage.save('large.pdf', os.urandom(LARGE_OBJECT_SIZE))
+
+        def download(i: int):
+            # the previous FileExtractor.load, copying the file to a temp dir first
+            with tempfile.TemporaryDirectory() as temp_dir:
+                storage.download('large.pdf', os.path.join(temp_dir, 'large.pdf'))
+
+        def local_file(i: int):
+            with storage.local_file('large.pdf'):
+                pass
+
+        print('== local ==')
+        report('download to temp dir, 32MB', timed(download, 10))
+        report('local_file, 32MB', timed(local_file, 10))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    benchmark_s3()
+    benchmark_local()
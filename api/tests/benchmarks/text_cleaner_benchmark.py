@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of the ingestion text cleaning, comparing the previous sequence of
+`re.sub` calls with the precompiled `TextCleaner`.
+
+Run from the api directory:
+
+    python -m tests.benchmarks.text_cleaner_benchmark
+"""
+import random
+import re
+import string
+import time
+
+from core.cleaner.text_cleaner import TextCleaner, filter_string
+
+RULES = {
+    'pre_processing_rules': [
+        {'id': 'remove_extra_spaces', 'enabled': True},
+        {'id': 'remove_urls_emails', 'enabled': True}
+    ]
+}
+
+
+def legacy_filter_string(text: str) -> str:
+    text = re.sub(r'<\|', '<', text)
+    text = re.sub(r'\|>', '>', text)
+    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F\x80-\xFF]', '', text)
+    return text
+
+
+def legacy_clean(text: str, rules: dict) -> str:
+    for pre_processing_rule in rules['pre_processing_rules']:
+        if pre_processing_rule["id"] == "remove_extra_spaces" and pre_processing_rule["enabled"] is True:
+            text = re.sub(r'\n{3,}', '\n\n', text)
+            text = re.sub(r'[\t\f\r\x20\u00a0\u1680\u180e\u2000-\u200a\u202f\u205f\u3000]{2,}', ' ', text)
+        elif pre_processing_rule["id"] == "remove_urls_emails" and pre_processing_rule["enabled"] is True:
+            text = re.sub(r'([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)', '', text)
+            text = re.sub(r'https?://[^\s]+', '', text)
+    return text
+
+
+def generate_page(rng: random.Random, words: int, noisy: bool) -> str:
+    fragments = ['\n\n', '数据集', 'café']
+    if noisy:
+        fragments += [
+            'https://example.com/path?q=1', 'mail@example.com', '<|endoftext|>', '\x00', '\xa0\xa0',
+            '\n\n\n\n', '   ', '\t\t'
+        ]
+
+    tokens = []
+    for _ in range(words):
+        if rng.random() < 0.05:
+            tokens.append(rng.choice(fragments))
+        else:
+            tokens.append(''.join(rng.choices(string.ascii_letters, k=rng.randint(2, 10))))
+    return ' '.join(tokens)
+
+
+def run(name: str, fn, pages: list, rounds: int = 5) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start_at = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start_at)
+
+    total_bytes = sum(len(page.encode()) for page in pages)
+    print('{:<24} {:>8.2f} ms {:>8.1f} MB/s'.format(name, best * 1000, total_bytes / best / 1024 / 1024))
+    return best
+
+
+def main():
+    rng = random.Random(42)
+    corpora = {
+        'short clean pages': [generate_page(rng, 200, noisy=False) for _ in range(2000)],
+        'long clean pages': [generate_page(rng, 20000, noisy=False) for _ in range(20)],
+        'short noisy pages': [generate_page(rng, 200, noisy=True) for _ in range(2000)],
+        'long noisy pages': [generate_page(rng, 20000, noisy=True) for _ in range(20)],
+    }
+
+    for corpus_name, pages in corpora.items():
+        print('== {} ({} pages) =='.format(corpus_name, len(pages)))
+
+        cleaner = TextCleaner(RULES)
+        for page in pages:
+            assert filter_string(page) == legacy_filter_string(page)
+            assert cleaner.clean(page) == legacy_clean(page, RULES)
+
+        legacy = run('legacy', lambda page: legacy_clean(legacy_filter_string(page), RULES), pages)
+        compiled = run('text cleaner', lambda page: cleaner.clean(filter_string(page)), pages)
+        print('speedup {:.2f}x'.format(legacy / compiled))
+
+
+if __name__ == '__main__':
+    main()
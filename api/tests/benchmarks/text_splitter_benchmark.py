@@ -0,0 +1,103 @@
+"""
+Splitting time of large documents with the splitters of IndexingRunner, comparing splitters that
+encode every candidate split with tiktoken, as before, with the splitters measuring splits by their
+token offsets in the document encoded once. Both must return the same chunks.
+
+Run from the api directory, the gpt2 encoding is downloaded by tiktoken on first use:
+
+    python -m tests.benchmarks.text_splitter_benchmark [--size-mb 10]
+"""
+import argparse
+import random
+import time
+
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from core.spiltter.fixed_text_splitter import EnhanceRecursiveCharacterTextSplitter, FixedRecursiveCharacterTextSplitter
+
+SEPARATORS = ["\n\n", "。", ".", " ", ""]
+
+ENGLISH_WORDS = ['the', 'dataset', 'segment', 'retrieval', 'model', 'token', 'index', 'vector', 'query', 'answer',
+                 'document', 'embedding', 'search', 'keyword', 'application', 'workflow', 'of', 'and', 'to', 'in']
+CHINESE_WORDS = ['数据集', '分段', '检索', '模型', '向量', '索引', '文档', '问题', '回答', '应用', '的', '和', '在']
+
+
+def generate_document(size: int) -> str:
+    rng = random.Random(42)
+    paragraphs = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.3:
+            sentences = [''.join(rng.choices(CHINESE_WORDS, k=rng.randint(5, 30))) + '。'
+                         for _ in range(rng.randint(1, 20))]
+            paragraph = ''.join(sentences)
+        else:
+            sentences = [' '.join(rng.choices(ENGLISH_WORDS, k=rng.randint(5, 30))).capitalize() + '.'
+                         for _ in range(rng.randint(1, 20))]
+            paragraph = ' '.join(sentences)
+        if rng.random() < 0.01:
+            # long line without separators, e.g. an encoded table
+            paragraph += ' ' + ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=rng.randint(2000, 8000)))
+
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+
+    return '\n\n'.join(paragraphs)
+
+
+def run(name: str, previous, current, text: str):
+    start_at = time.perf_counter()
+    previous_chunks = previous.split_text(text)
+    previous_seconds = time.perf_counter() - start_at
+
+    start_at = time.perf_counter()
+    current_chunks = current.split_text(text)
+    current_seconds = time.perf_counter() - start_at
+
+    assert current_chunks == previous_chunks, f'{name}: chunks differ'
+    print('{:<12} {:>7} chunks  encode every split {:>8.2f} s  token offsets {:>8.2f} s  speedup {:>5.1f}x'.format(
+        name, len(current_chunks), previous_seconds, current_seconds, previous_seconds / current_seconds
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=float, default=10)
+    parser.add_argument('--max-tokens', type=int, default=500)
+    args = parser.parse_args()
+
+    text = generate_document(int(args.size_mb * 1024 * 1024))
+    encoding = tiktoken.get_encoding('gpt2')
+
+    def encode_length(split: str) -> int:
+        return len(encoding.encode(split, allowed_special=set(), disallowed_special='all'))
+
+    # automatic segmentation
+    run(
+        'automatic',
+        RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=args.max_tokens, chunk_overlap=0, separators=SEPARATORS
+        ),
+        EnhanceRecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=args.max_tokens, chunk_overlap=0, separators=SEPARATORS
+        ),
+        text
+    )
+
+    # custom segmentation, splitting on a fixed separator first
+    run(
+        'custom',
+        FixedRecursiveCharacterTextSplitter(
+            length_function=encode_length, chunk_size=args.max_tokens, chunk_overlap=0,
+            fixed_separator='\n', separators=SEPARATORS
+        ),
+        FixedRecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=args.max_tokens, chunk_overlap=0, fixed_separator='\n', separators=SEPARATORS
+        ),
+        text
+    )
+
+
+if __name__ == '__main__':
+    main()
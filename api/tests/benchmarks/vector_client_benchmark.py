@@ -0,0 +1,105 @@
+"""
+Query latency of a Qdrant vector store with a client constructed per query, as the
+vector indexes used to do, compared with the shared client of the vector client registry.
+
+Runs against a local Qdrant in path mode by default, pass a url to use a server instead:
+
+    python -m tests.benchmarks.vector_client_benchmark [--url http://localhost:6333]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+import qdrant_client
+from qdrant_client.http import models
+
+from core.vector_store.client_registry import vector_client_registry
+
+COLLECTION_NAME = 'vector_client_benchmark'
+DIMENSION = 256
+
+
+def percentile(latencies: list, p: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+
+def prepare_collection(params: dict, points: int):
+    client = qdrant_client.QdrantClient(**params)
+    client.recreate_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=DIMENSION, distance=models.Distance.COSINE)
+    )
+
+    rng = random.Random(42)
+    for i in range(0, points, 256):
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=[
+                models.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=[rng.random() for _ in range(DIMENSION)],
+                    payload={'group_id': 'benchmark'}
+                )
+                for _ in range(min(256, points - i))
+            ]
+        )
+
+    client.close()
+
+
+def run(name: str, get_client, release_client, queries: list) -> list:
+    latencies = []
+    for query in queries:
+        start_at = time.perf_counter()
+        client = get_client()
+        client.search(collection_name=COLLECTION_NAME, query_vector=query, limit=4)
+        latencies.append((time.perf_counter() - start_at) * 1000)
+        release_client(client)
+
+    print('{:<24} p50 {:>8.2f} ms  p99 {:>8.2f} ms  mean {:>8.2f} ms'.format(
+        name, percentile(latencies, 0.5), percentile(latencies, 0.99), statistics.mean(latencies)
+    ))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='Qdrant server url, a local path mode storage is used when omitted')
+    parser.add_argument('--api-key')
+    parser.add_argument('--points', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    if args.url:
+        params = {'url': args.url, 'api_key': args.api_key}
+    else:
+        params = {'path': tempfile.mkdtemp(prefix='qdrant_benchmark_')}
+
+    prepare_collection(params, args.points)
+
+    rng = random.Random(7)
+    queries = [[rng.random() for _ in range(DIMENSION)] for _ in range(args.queries)]
+
+    # a path mode storage is locked by its client, so the per query client has to be closed
+    run('client per query', lambda: qdrant_client.QdrantClient(**params), lambda client: client.close(), queries)
+    run(
+        'shared client',
+        lambda: vector_client_registry.get(
+            'qdrant', params,
+            factory=lambda: qdrant_client.QdrantClient(**params),
+            health_check=lambda client: client.get_collections(),
+            close=lambda client: client.close()
+        ),
+        lambda client: None,
+        queries
+    )
+
+    vector_client_registry.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+from core.data_loader.loader.notion import NotionLoader
+from core.data_loader.loader.notion_fetcher import NotionBlockFetcher, RateLimiter
+
+PAGE_ID = 'page'
+# the fake api returns at most 2 blocks per request, so every list is paginated
+FAKE_PAGE_SIZE = 2
+
+
+def rich_text(content: str) -> List[dict]:
+    return [{'type': 'text', 'text': {'content': content}, 'plain_text': content}]
+
+
+def block(block_id: str, block_type: str, content: str = '', has_children: bool = False,
+          last_edited_time: str = '2023-10-01T00:00:00.000Z') -> dict:
+    return {
+        'object': 'block',
+        'id': block_id,
+        'type': block_type,
+        'has_children': has_children,
+        'last_edited_time': last_edited_time,
+        block_type: {'rich_text': rich_text(content)} if content else {}
+    }
+
+
+def table_row(block_id: str, cells: List[str]) -> dict:
+    return {
+        'object': 'block',
+        'id': block_id,
+        'type': 'table_row',
+        'has_children': False,
+        'last_edited_time': '2023-10-01T00:00:00.000Z',
+        'table_row': {'cells': [rich_text(cell) for cell in cells]}
+    }
+
+
+class FakeNotionApi:
+    """Serves the children of blocks like the notion api, paginated with start_cursor."""
+
+    def __init__(self, children: Dict[str, List[dict]]):
+        self.children = children
+        self.requests = Counter()
+        self.rate_limited = set()
+        self._lock = threading.Lock()
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                if len(parts) != 4 or parts[1] != 'blocks' or parts[3] != 'children':
+                    return self._send(404, {'object': 'error'})
+
+                block_id = parts[2]
+                with api._lock:
+                    api.requests[block_id] += 1
+                    if block_id in api.rate_limited:
+                        api.rate_limited.remove(block_id)
+                        return self._send(429, {'object': 'error', 'code': 'rate_limited'}, {'Retry-After': '0'})
+
+                if block_id not in api.children:
+                    return self._send(404, {'object': 'error', 'code': 'object_not_found'})
+
+                start = int(parse_qs(url.query).get('start_cursor', ['0'])[0])
+                results = api.children[block_id][start:start + FAKE_PAGE_SIZE]
+                has_more = start + FAKE_PAGE_SIZE < len(api.children[block_id])
+                self._send(200, {
+                    'object': 'list',
+                    'results': results,
+                    'has_more': has_more,
+                    'next_cursor': str(start + FAKE_PAGE_SIZE) if has_more else None
+                })
+
+            def _send(self, status: int, body: dict, headers: Optional[dict] = None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self._server.server_port}/v1'
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class InMemoryBlockCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, page_id: str, last_edited_time: str) -> Optional[Dict[str, List[dict]]]:
+        data = self.entries.get((page_id, last_edited_time))
+        return json.loads(data) if data else None
+
+    def set(self, page_id: str, last_edited_time: str, children: Dict[str, List[dict]]):
+        self.entries[(page_id, last_edited_time)] = json.dumps(children)
+
+
+@pytest.fixture
+def notion_api():
+    api = FakeNotionApi({
+        PAGE_ID: [
+            block('heading', 'heading_1', 'Title'),
+            block('intro', 'paragraph', 'Intro', has_children=True),
+            block('table', 'table', has_children=True),
+            block('sub_page', 'child_page', has_children=True),
+            block('outro', 'paragraph', 'Outro'),
+        ],
+        'intro': [
+            block('nested', 'bulleted_list_item', 'Nested', has_children=True),
+        ],
+        'nested': [
+            block('deeper', 'paragraph', 'Deeper'),
+        ],
+        'table': [
+            table_row('row_0', ['Name', 'Age']),
+            table_row('row_1', ['Alice', '30']),
+            table_row('row_2', ['Bob', '40']),
+        ],
+    })
+    yield api
+    api.close()
+
+
+def create_fetcher(api: FakeNotionApi, cache=None) -> NotionBlockFetcher:
+    return NotionBlockFetcher(
+        access_token='secret',
+        session=requests.Session(),
+        rate_limiter=RateLimiter(0),
+        max_workers=4,
+        cache=cache,
+        base_url=api.base_url
+    )
+
+
+def test_load_page(notion_api):
+    loader = NotionLoader(
+        notion_access_token='secret',
+        notion_workspace_id='workspace',
+        notion_obj_id=PAGE_ID,
+        notion_page_type='page'
+    )
+
+    with patch.object(loader, '_get_fetcher', return_value=create_fetcher(notion_api)):
+        documents = loader.load()
+
+    assert [document.page_content for document in documents] == [
+        'Title\n\n',
+        'Title\nIntro\n\n\tNested\n\n\t\tDeeper\n\n',
+        'Name:Alice\nAge:30\nName:Bob\nAge:40\n\n',
+        'Title\n\n\n',
+        'Title\nOutro\n\n',
+    ]
+    # the content of child pages is not fetched
+    assert notion_api.requests['sub_page'] == 0
+
+
+def test_fetch_tree_follows_pagination(notion_api):
+    children = create_fetcher(notion_api).fetch_tree(PAGE_ID)
+
+    assert [b['id'] for b in children[PAGE_ID]] == ['heading', 'intro', 'table', 'sub_page', 'outro']
+    assert [b['id'] for b in children['table']] == ['row_0', 'row_1', 'row_2']
+    assert notion_api.requests[PAGE_ID] == 3
+    assert notion_api.requests['table'] == 2
+
+
+def test_fetch_tree_reuses_unchanged_page(notion_api):
+    cache = InMemoryBlockCache()
+    first = create_fetcher(notion_api, cache).fetch_tree(PAGE_ID, '2023-10-01T00:00:00.000Z')
+    notion_api.requests.clear()
+
+    second = create_fetcher(notion_api, cache).fetch_tree(PAGE_ID, '2023-10-01T00:00:00.000Z')
+
+    assert second == first
+    assert not notion_api.requests
+
+
+def test_fetch_tree_refetches_edited_grandchild(notion_api):
+    cache = InMemoryBlockCache()
+    create_fetcher(notion_api, cache).fetch_tree(PAGE_ID, '2023-10-01T00:00:00.000Z')
+
+    # editing a block only changes its own last_edited_time and the page's, not the one of its parents
+    notion_api.children['nested'] = [
+        block('deeper', 'paragraph', 'Edited', last_edited_time='2023-10-02T00:00:00.000Z'),
+    ]
+
+    children = create_fetcher(notion_api, cache).fetch_tree(PAGE_ID, '2023-10-02T00:00:00.000Z')
+
+    assert children['nested'][0]['paragraph']['rich_text'][0]['plain_text'] == 'Edited'
+
+
+def test_fetch_tree_does_not_cache_synced_blocks(notion_api):
+    cache = InMemoryBlockCache()
+    notion_api.children['intro'].append(block('synced', 'synced_block'))
+
+    create_fetcher(notion_api, cache).fetch_tree(PAGE_ID, '2023-10-01T00:00:00.000Z')
+
+    assert not cache.entries
+
+
+def test_request_retries_rate_limited(notion_api):
+    notion_api.rate_limited.add('table')
+
+    children = create_fetcher(notion_api).fetch_tree(PAGE_ID)
+
+    assert len(children['table']) == 3
+    assert notion_api.requests['table'] == 3
+
+
+def test_request_raises_on_error(notion_api):
+    with pytest.raises(requests.HTTPError):
+        create_fetcher(notion_api).get_children('missing')
@@ -0,0 +1,80 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+from core.model_providers import tokenizer as tokenizer_module
+from core.model_providers.tokenizer import Tokenizer, get_tokenizer
+
+
+def create_encoding(name: str = 'cl100k_base') -> MagicMock:
+    encoding = MagicMock()
+    encoding.name = name
+    # one token per word
+    encoding.encode_ordinary.side_effect = lambda text: text.split()
+    encoding.encode_ordinary_batch.side_effect = lambda texts: [text.split() for text in texts]
+    return encoding
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    with patch.object(tokenizer_module, '_lru_cache', None), patch.object(tokenizer_module, '_tokenizers', {}):
+        yield
+
+
+@pytest.fixture
+def app_context():
+    app = Flask(__name__)
+    app.config['TOKENIZER_CACHE_LRU_SIZE'] = 10
+    with app.app_context():
+        yield
+
+
+def test_count_batch_encodes_distinct_texts_once(app_context):
+    encoding = create_encoding()
+    tokenizer = Tokenizer(encoding)
+
+    assert tokenizer.count_batch(['a b', '', 'c', 'a b']) == [2, 0, 1, 2]
+    encoding.encode_ordinary_batch.assert_called_once_with(['a b', 'c'])
+
+
+def test_count_batch_reuses_memoized_counts(app_context):
+    encoding = create_encoding()
+    tokenizer = Tokenizer(encoding)
+    tokenizer.count_batch(['a b', 'c'])
+
+    assert tokenizer.count_batch(['c', 'd e f']) == [1, 3]
+    # a single missing text is not encoded in a batch
+    encoding.encode_ordinary_batch.assert_called_once_with(['a b', 'c'])
+    encoding.encode_ordinary.assert_called_once_with('d e f')
+
+    # the memo is keyed by encoding, another encoding counts the text again
+    other_encoding = create_encoding('gpt2')
+    assert Tokenizer(other_encoding).count('c') == 1
+    other_encoding.encode_ordinary.assert_called_once_with('c')
+
+
+def test_count_batch_without_app_context():
+    encoding = create_encoding()
+    tokenizer = Tokenizer(encoding)
+
+    assert tokenizer.count_batch(['a b']) == [2]
+    assert tokenizer.count_batch(['a b']) == [2]
+    assert encoding.encode_ordinary.call_count == 2
+    encoding.encode_ordinary_batch.assert_not_called()
+
+
+def test_get_tokenizer_is_created_once_per_model():
+    with patch('tiktoken.encoding_for_model', side_effect=lambda model_name: create_encoding()) as encoding_for_model:
+        assert get_tokenizer('text-embedding-ada-002') is get_tokenizer('text-embedding-ada-002')
+        encoding_for_model.assert_called_once_with('text-embedding-ada-002')
+
+
+def test_get_tokenizer_falls_back_for_unknown_models():
+    with patch('tiktoken.encoding_for_model', side_effect=KeyError), \
+            patch('tiktoken.get_encoding', side_effect=create_encoding) as get_encoding:
+        assert get_tokenizer('unknown-model').encoding.name == 'cl100k_base'
+        get_encoding.assert_called_once_with('cl100k_base')
+
+        get_tokenizer()
+        get_encoding.assert_called_with('gpt2')
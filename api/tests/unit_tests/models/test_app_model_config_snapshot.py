@@ -0,0 +1,129 @@
+import copy
+import datetime
+import json
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+from flask import Flask
+
+from core.app_model_config_snapshot import AppModelConfigSnapshotCache
+from models.model import AppModelConfig
+
+MODEL = {'provider': 'openai', 'name': 'gpt-3.5-turbo', 'mode': 'chat', 'completion_params': {'max_tokens': 512}}
+
+
+def create_app_model_config(id: str = 'config-id') -> AppModelConfig:
+    app_model_config = AppModelConfig(id=id, app_id='app-id', updated_at=datetime.datetime(2023, 10, 1))
+    app_model_config.model = json.dumps(MODEL)
+    app_model_config.user_input_form = json.dumps([{'text-input': {'variable': 'name', 'required': True}}])
+    app_model_config.agent_mode = json.dumps({'enabled': True, 'strategy': 'router', 'tools': []})
+    return app_model_config
+
+
+@pytest.fixture(autouse=True)
+def annotation_reply():
+    # annotation_reply_dict queries the annotation setting of the app
+    with patch.object(AppModelConfig, 'annotation_reply_dict', new_callable=PropertyMock,
+                      return_value={'enabled': False}) as mock:
+        yield mock
+
+
+@pytest.fixture
+def app_context():
+    app = Flask(__name__)
+    app.config['APP_MODEL_CONFIG_CACHE_SIZE'] = 10
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def redis():
+    redis = MagicMock()
+    redis.hget.return_value = None
+    with patch('core.app_model_config_snapshot.redis_client', redis):
+        yield redis
+
+
+def test_snapshot_is_read_only():
+    snapshot = AppModelConfigSnapshotCache().get(create_app_model_config(id=None))
+
+    assert snapshot.model_dict == MODEL
+    assert snapshot.dataset_configs_dict == {'retrieval_model': 'single'}
+    with pytest.raises(TypeError):
+        snapshot.model_dict['name'] = 'gpt-4'
+    with pytest.raises(TypeError):
+        snapshot.model_dict['completion_params'].update({'temperature': 1})
+    with pytest.raises(TypeError):
+        snapshot.user_input_form_list.append({})
+    with pytest.raises(AttributeError):
+        snapshot.model_dict = {}
+
+    # copies can be modified and serialized
+    model_dict = copy.deepcopy(snapshot.model_dict)
+    model_dict['completion_params']['temperature'] = 0.9
+    assert json.loads(json.dumps(snapshot.user_input_form_list)) == [
+        {'text-input': {'variable': 'name', 'required': True}}
+    ]
+
+
+def test_config_snapshot_follows_column_changes():
+    cache = AppModelConfigSnapshotCache()
+    app_model_config = create_app_model_config(id=None)
+
+    snapshot = cache.get(app_model_config)
+    assert cache.get(app_model_config) is snapshot
+
+    app_model_config.model = json.dumps({**MODEL, 'name': 'gpt-4'})
+
+    assert cache.get(app_model_config).model_dict['name'] == 'gpt-4'
+
+
+def test_config_snapshot_is_shared(app_context, redis, annotation_reply):
+    cache = AppModelConfigSnapshotCache()
+
+    snapshot = cache.get(create_app_model_config())
+    # another instance of the same config version, e.g. loaded by the next request
+    assert cache.get(create_app_model_config()) is snapshot
+
+    assert annotation_reply.call_count == 1
+    assert redis.hget.call_count == 1
+    saved = redis.pipeline.return_value.hset.call_args[0][2]
+
+    cache.invalidate('app-id')
+    redis.delete.assert_called_once_with('app_model_config_snapshot:app-id')
+
+    # another process loads the snapshot from redis without parsing the config
+    redis.hget.return_value = saved.encode()
+    reloaded = cache.get(create_app_model_config())
+
+    assert reloaded is not snapshot
+    assert reloaded.model_dict == MODEL
+    assert annotation_reply.call_count == 1
+
+
+def test_config_copy_shares_snapshot(app_context, redis, annotation_reply):
+    cache = AppModelConfigSnapshotCache()
+    app_model_config = create_app_model_config()
+
+    with patch('models.model.app_model_config_snapshot_cache', cache):
+        snapshot = app_model_config.snapshot
+        # the generate worker of every chat turn gets a copy, without updated_at
+        copied = app_model_config.copy()
+        assert copied.updated_at is None
+        assert copied.snapshot is snapshot
+        assert create_app_model_config().copy().snapshot is snapshot
+
+    assert annotation_reply.call_count == 1
+
+
+def test_modified_config_is_not_shared(app_context, redis):
+    cache = AppModelConfigSnapshotCache()
+    snapshot = cache.get(create_app_model_config())
+
+    app_model_config = create_app_model_config()
+    app_model_config.model = json.dumps({**MODEL, 'name': 'gpt-4'})
+    modified = cache.get(app_model_config)
+
+    assert modified is not snapshot
+    assert modified.model_dict['name'] == 'gpt-4'
+    assert snapshot.model_dict['name'] == 'gpt-3.5-turbo'
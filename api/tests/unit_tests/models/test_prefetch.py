@@ -0,0 +1,115 @@
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from extensions.ext_database import db
+from models.dataset import Dataset, Document
+from models.model import Conversation, Message
+
+PAGE_SIZE = 100
+
+
+def mock_session(*results: list) -> MagicMock:
+    """Stands in for db.session, every query returns the next of `results`, then no rows."""
+    session = MagicMock()
+    query = session.query.return_value
+    for method in ['filter', 'group_by', 'distinct', 'order_by']:
+        getattr(query, method).return_value = query
+    query.all.side_effect = list(results) + [[]] * 20
+    return session
+
+
+def create_page(model_class) -> list:
+    return [model_class(id=str(uuid.uuid4())) for _ in range(PAGE_SIZE)]
+
+
+def test_conversation_page_queries():
+    conversations = create_page(Conversation)
+    attributes = ['annotated', 'annotation', 'message_count',
+                  'user_feedback_stats', 'admin_feedback_stats', 'first_message']
+    session = mock_session()
+
+    with patch.object(db, 'session', session):
+        Conversation.prefetch(conversations, *attributes)
+        for conversation in conversations:
+            for attribute in attributes:
+                getattr(conversation, attribute)
+            conversation.summary_or_query
+
+    # one query per attribute for the whole page, none while marshalling
+    assert session.query.call_count == len(attributes)
+
+
+def test_conversation_prefetched_values():
+    conversations = create_page(Conversation)
+    first, second = conversations[0], conversations[1]
+    session = mock_session(
+        [(first.id, 3)],
+        [(first.id, 'like', 2), (second.id, 'dislike', 1)],
+        [MagicMock(conversation_id=first.id)]
+    )
+
+    with patch.object(db, 'session', session):
+        Conversation.prefetch(conversations, 'message_count', 'user_feedback_stats', 'annotated')
+
+    assert first.message_count == 3
+    assert second.message_count == 0
+    assert first.user_feedback_stats == {'like': 2, 'dislike': 0}
+    assert second.user_feedback_stats == {'like': 0, 'dislike': 1}
+    assert conversations[2].user_feedback_stats == {'like': 0, 'dislike': 0}
+    assert first.annotated is True
+    assert second.annotated is False
+
+
+def test_message_page_queries():
+    messages = create_page(Message)
+    feedback = MagicMock(message_id=messages[0].id)
+    session = mock_session([feedback])
+
+    with patch.object(db, 'session', session):
+        Message.prefetch(messages, 'user_feedback', 'admin_feedback', 'feedbacks', 'annotation')
+        for message in messages:
+            message.user_feedback, message.admin_feedback, message.feedbacks, message.annotation
+
+    assert session.query.call_count == 4
+    assert messages[0].user_feedback is feedback
+    assert messages[1].user_feedback is None
+    assert messages[1].feedbacks == []
+
+
+def test_dataset_and_document_page_queries():
+    datasets = create_page(Dataset)
+    documents = create_page(Document)
+    session = mock_session([(datasets[0].id, 5)], [], [(datasets[0].id, 1200)], [], [(documents[0].id, 7)])
+
+    with patch.object(db, 'session', session):
+        Dataset.prefetch(datasets, 'app_count', 'document_count', 'word_count')
+        Document.prefetch(documents, 'segment_count', 'hit_count')
+        for dataset in datasets:
+            dataset.app_count, dataset.document_count, dataset.word_count
+        for document in documents:
+            document.segment_count, document.hit_count
+
+    assert session.query.call_count == 5
+    assert datasets[0].app_count == 5
+    assert datasets[0].word_count == 1200
+    assert datasets[1].word_count is None
+    assert datasets[1].document_count == 0
+    assert documents[0].hit_count == 7
+    assert documents[1].hit_count is None
+
+
+def test_not_prefetched_attribute_runs_its_query():
+    conversation = Conversation(id=str(uuid.uuid4()))
+    session = mock_session()
+
+    with patch.object(db, 'session', session):
+        conversation.message_count
+
+    assert session.query.call_count == 1
+
+
+def test_prefetch_unknown_attribute():
+    with pytest.raises(ValueError):
+        Conversation.prefetch(create_page(Conversation), 'app')
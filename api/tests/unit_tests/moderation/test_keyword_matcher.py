@@ -0,0 +1,62 @@
+import random
+
+from core.moderation.keywords.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+ALPHABET = 'abAB敏感词 '
+
+
+def contains_any(keywords: list, text: str) -> bool:
+    return any(keyword.lower() in text.lower() for keyword in keywords)
+
+
+def random_text(rng: random.Random, max_length: int) -> str:
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+def test_search_matches_substring_check():
+    rng = random.Random(0)
+    for _ in range(300):
+        keywords = [random_text(rng, 4) or 'a' for _ in range(rng.randint(1, 10))]
+        matcher = KeywordMatcher(keywords)
+        for _ in range(20):
+            text = random_text(rng, 30)
+            assert matcher.search(text) == contains_any(keywords, text)
+
+
+def test_stream_finds_keyword_on_the_completing_piece():
+    stream = KeywordMatcher(['forbidden', '敏感词']).stream()
+
+    assert not stream.feed('this is for')
+    assert not stream.feed('bid')
+    assert stream.feed('DEN and more')
+    # stays matched
+    assert stream.feed('clean')
+
+    stream = KeywordMatcher(['forbidden', '敏感词']).stream()
+    assert not stream.feed('敏感')
+    assert stream.feed('词')
+
+
+def test_stream_matches_search_of_the_whole_text():
+    rng = random.Random(1)
+    for _ in range(300):
+        keywords = [random_text(rng, 4) or 'b' for _ in range(rng.randint(1, 10))]
+        matcher = KeywordMatcher(keywords)
+        stream = matcher.stream()
+        text = ''
+        for _ in range(10):
+            piece = random_text(rng, 5)
+            text += piece
+            assert stream.feed(piece) == contains_any(keywords, text)
+
+
+def test_empty_keyword_matches_every_text():
+    matcher = get_keyword_matcher('word\n')
+
+    assert matcher.search('')
+    assert matcher.stream().matched
+
+
+def test_matcher_is_compiled_once_per_keywords():
+    assert get_keyword_matcher('a\nb') is get_keyword_matcher('a\nb')
+    assert get_keyword_matcher('a\nb') is not get_keyword_matcher('a\nc')
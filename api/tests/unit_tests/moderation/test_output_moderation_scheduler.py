@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import List, Optional
+
+import pytest
+from flask import Flask
+
+from core.moderation.output_moderation_scheduler import OutputModerationScheduler
+
+BUFFER_SIZE = 10
+
+
+class FakeHandler:
+    """Records the moderations of an OutputModerationHandler, each blocks until `release` is set."""
+
+    def __init__(self, tenant_id: str, batch_key: Optional[str] = None, buffer: str = 'x' * BUFFER_SIZE,
+                 release: Optional[threading.Event] = None):
+        self.tenant_id = tenant_id
+        self.app_id = 'app'
+        self.batch_key = batch_key
+        self.buffer = buffer
+        self.moderated_length = 0
+        self.running = True
+        self.release = release
+        self.moderated_buffers = []
+        self.batches = []
+        self.done = threading.Event()
+
+    def get_batch_key(self) -> Optional[str]:
+        return self.batch_key
+
+    def should_moderate(self, buffer_size: int) -> bool:
+        return self.running and len(self.buffer) - self.moderated_length >= buffer_size
+
+    def moderation(self, tenant_id: str, app_id: str, moderation_buffer: str):
+        if self.release:
+            self.release.wait(5)
+        return None
+
+    def moderation_batch(self, tenant_id: str, app_id: str, moderation_buffers: List[str]):
+        self.batches.append(moderation_buffers)
+        return [None] * len(moderation_buffers)
+
+    def on_moderation_result(self, moderation_buffer: str, result):
+        self.moderated_buffers.append(moderation_buffer)
+        self.done.set()
+
+
+@pytest.fixture
+def create_scheduler():
+    schedulers = []
+
+    def create(max_tenant_concurrency: int) -> OutputModerationScheduler:
+        scheduler = OutputModerationScheduler(Flask(__name__), max_workers=8,
+                                              max_tenant_concurrency=max_tenant_concurrency, buffer_size=BUFFER_SIZE)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield create
+
+    for scheduler in schedulers:
+        scheduler._executor.shutdown(wait=True)
+
+
+def test_queued_outputs_with_the_same_config_are_batched(create_scheduler):
+    scheduler = create_scheduler(max_tenant_concurrency=1)
+    release = threading.Event()
+    blocking = FakeHandler('tenant', release=release)
+    same_config = [FakeHandler('tenant', batch_key='openai', buffer=f'{i}' * BUFFER_SIZE) for i in range(3)]
+    other_config = FakeHandler('tenant', batch_key='other')
+
+    scheduler.submit(blocking)
+    for handler in same_config + [other_config]:
+        scheduler.submit(handler)
+    release.set()
+
+    for handler in same_config + [other_config]:
+        assert handler.done.wait(5)
+
+    assert same_config[0].batches == [[handler.buffer for handler in same_config]]
+    assert other_config.batches == []
+    assert other_config.moderated_buffers == [other_config.buffer]
+
+
+def test_tenant_concurrency_is_limited(create_scheduler):
+    scheduler = create_scheduler(max_tenant_concurrency=2)
+    release = threading.Event()
+    handlers = [FakeHandler('tenant', release=release) for _ in range(4)]
+    other_tenant = FakeHandler('other tenant')
+
+    for handler in handlers:
+        scheduler.submit(handler)
+    # the moderations of another tenant are not held back
+    scheduler.submit(other_tenant)
+    assert other_tenant.done.wait(5)
+
+    time.sleep(0.1)
+    assert scheduler._running['tenant'] == 2
+    assert len(scheduler._queues['tenant']) == 2
+
+    release.set()
+    for handler in handlers:
+        assert handler.done.wait(5)
+
+
+def test_output_is_queued_once_and_moderated_again_when_grown(create_scheduler):
+    scheduler = create_scheduler(max_tenant_concurrency=1)
+    release = threading.Event()
+    handler = FakeHandler('tenant', release=release)
+
+    scheduler.submit(handler)
+    time.sleep(0.1)
+    # grows while being moderated, is not queued twice
+    handler.buffer += 'y' * BUFFER_SIZE
+    scheduler.submit(handler)
+    scheduler.submit(handler)
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while len(handler.moderated_buffers) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    time.sleep(0.1)
+    assert handler.moderated_buffers == ['x' * BUFFER_SIZE, 'x' * BUFFER_SIZE + 'y' * BUFFER_SIZE]
+
+
+def test_stopped_outputs_are_not_moderated(create_scheduler):
+    scheduler = create_scheduler(max_tenant_concurrency=1)
+    release = threading.Event()
+    blocking = FakeHandler('tenant', release=release)
+    stopped = FakeHandler('tenant')
+
+    scheduler.submit(blocking)
+    scheduler.submit(stopped)
+    stopped.running = False
+    release.set()
+
+    assert blocking.done.wait(5)
+    scheduler._executor.shutdown(wait=True)
+    assert stopped.moderated_buffers == []
@@ -0,0 +1,97 @@
+import random
+from unittest.mock import patch
+
+import pytest
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from core.spiltter.fixed_text_splitter import EnhanceRecursiveCharacterTextSplitter, FixedRecursiveCharacterTextSplitter
+from core.spiltter.token_offset_counter import TokenOffsetCounter
+
+# pre-token patterns of gpt2 and cl100k_base
+PATTERNS = {
+    'gpt2': r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+    'cl100k_base': r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*"""
+                   r"""|\s*[\r\n]+|\s+(?!\S)|\s+""",
+}
+
+MERGED_WORDS = ['the', ' the', 'token', 'chunk', 'hello', ' world', 'ing', "'s", '数据', '分段', '\n\n', '  ', '。']
+
+TEXT_PARTS = ['the', 'token', 'chunk', 'hello', 'World', "it's", '数据集', '分段文本', '123', '4567', '...', '。', '.',
+              ',', ' ', '  ', '   ', '\n', '\n\n', '\n \n', '\t', '\r\n', 'é', '🙂', "'", "'ll"]
+
+SEPARATORS = ["\n\n", "。", ".", " ", ""]
+
+
+def create_encoding(name: str) -> tiktoken.Encoding:
+    """Small bpe with the pre-token pattern of a real encoding, so the tests need no vocabulary download."""
+    mergeable_ranks = {bytes([i]): i for i in range(256)}
+    for word in MERGED_WORDS:
+        data = word.encode()
+        for length in range(2, len(data) + 1):
+            for i in range(len(data) - length + 1):
+                mergeable_ranks.setdefault(data[i:i + length], len(mergeable_ranks))
+
+    return tiktoken.Encoding(
+        name=name,
+        pat_str=PATTERNS[name],
+        mergeable_ranks=mergeable_ranks,
+        special_tokens={'<|endoftext|>': len(mergeable_ranks)}
+    )
+
+
+def random_texts(seed: int, count: int, max_parts: int) -> list:
+    rng = random.Random(seed)
+    return [''.join(rng.choice(TEXT_PARTS) for _ in range(rng.randint(1, max_parts))) for _ in range(count)]
+
+
+@pytest.fixture(params=list(PATTERNS.keys()))
+def encoding(request):
+    encoding = create_encoding(request.param)
+    with patch('tiktoken.get_encoding', return_value=encoding):
+        yield encoding
+
+
+def test_counter_counts_every_substring(encoding):
+    rng = random.Random(1)
+    for text in random_texts(1, 100, 300):
+        counter = TokenOffsetCounter(encoding, text)
+        for _ in range(50):
+            start = rng.randint(0, len(text))
+            end = rng.randint(start, len(text))
+            assert counter.count(start, end) == len(encoding.encode_ordinary(text[start:end]))
+
+
+@pytest.mark.parametrize('chunk_overlap', [0, 10])
+def test_recursive_splitter_chunks_are_unchanged(encoding, chunk_overlap):
+    splitter = EnhanceRecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=60, chunk_overlap=chunk_overlap, separators=SEPARATORS
+    )
+    original = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=60, chunk_overlap=chunk_overlap, separators=SEPARATORS
+    )
+
+    for text in random_texts(2, 100, 2000):
+        assert splitter.split_text(text) == original.split_text(text)
+
+
+@pytest.mark.parametrize('fixed_separator', ['\n\n', '。', ''])
+def test_fixed_splitter_chunks_are_unchanged(encoding, fixed_separator):
+    splitter = FixedRecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=60, chunk_overlap=0, fixed_separator=fixed_separator, separators=SEPARATORS
+    )
+    # built with a length function, the splitter encodes every split
+    original = FixedRecursiveCharacterTextSplitter(
+        length_function=lambda text: len(encoding.encode(text)),
+        chunk_size=60, chunk_overlap=0, fixed_separator=fixed_separator, separators=SEPARATORS
+    )
+
+    for text in random_texts(3, 100, 2000):
+        assert splitter.split_text(text) == original.split_text(text)
+
+
+def test_special_tokens_still_raise(encoding):
+    splitter = EnhanceRecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=60, chunk_overlap=0)
+
+    with pytest.raises(ValueError):
+        splitter.split_text('hello <|endoftext|> world')
@@ -0,0 +1,96 @@
+import uuid
+from typing import List
+from unittest.mock import patch, MagicMock
+
+import qdrant_client
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from qdrant_client.http import models
+
+from core.index.vector_index.qdrant_vector_index import QdrantVectorIndex, QdrantConfig
+from core.vector_store.qdrant_vector_store import QdrantVectorStore
+
+COLLECTION_NAME = 'Vector_index_test_Node'
+DIMENSION = 4
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [float(len(text) % 7 + 1), 1.0, 2.0, 3.0]
+
+
+def create_vector_store(texts_count: int) -> (QdrantVectorStore, List[str]):
+    client = qdrant_client.QdrantClient(location=':memory:')
+    client.recreate_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=DIMENSION, distance=models.Distance.COSINE)
+    )
+
+    dataset = MagicMock(id='dataset_id', collection_binding_id=None)
+    dataset.index_struct_dict = {'type': 'qdrant', 'vector_store': {'class_prefix': COLLECTION_NAME}}
+    vector_index = QdrantVectorIndex(
+        dataset=dataset,
+        config=QdrantConfig(endpoint='', api_key=None, root_path=None),
+        embeddings=FakeEmbeddings()
+    )
+
+    ids = [str(uuid.uuid4()) for _ in range(texts_count)]
+    with patch.object(QdrantVectorIndex, '_get_client', return_value=client), \
+            patch.object(QdrantVectorIndex, '_get_full_text_index'):
+        vector_index.add_texts(
+            [Document(page_content=f'text {i}', metadata={'doc_id': doc_id}) for i, doc_id in enumerate(ids)]
+        )
+        vector_store = vector_index._get_vector_store()
+
+    return vector_store, ids
+
+
+def count_points(vector_store: QdrantVectorStore) -> int:
+    return vector_store.client.count(collection_name=COLLECTION_NAME, exact=True).count
+
+
+def test_delete_by_ids():
+    vector_store, ids = create_vector_store(2500)
+
+    vector_store.delete_by_ids(ids[:2400])
+
+    assert count_points(vector_store) == 100
+    for doc_id in ids[2400:]:
+        assert vector_store.text_exists(doc_id)
+    assert not vector_store.text_exists(ids[0])
+
+
+def test_delete_by_ids_in_batches():
+    vector_store, ids = create_vector_store(250)
+
+    with patch.object(vector_store.client, 'delete', wraps=vector_store.client.delete) as mock_delete:
+        vector_store.delete_by_ids(ids, batch_size=100)
+
+    assert mock_delete.call_count == 3
+    assert count_points(vector_store) == 0
+
+
+def test_delete_by_ids_empty():
+    vector_store, ids = create_vector_store(10)
+
+    with patch.object(vector_store.client, 'delete', wraps=vector_store.client.delete) as mock_delete:
+        vector_store.delete_by_ids([])
+
+    mock_delete.assert_not_called()
+    assert count_points(vector_store) == 10
+
+
+def test_delete_by_ids_with_random_point_ids():
+    vector_store, _ = create_vector_store(0)
+    doc_ids = [str(uuid.uuid4()) for _ in range(5)]
+    # points indexed before the point ids were the doc ids
+    vector_store.add_documents(
+        [Document(page_content=f'text {i}', metadata={'doc_id': doc_id}) for i, doc_id in enumerate(doc_ids)]
+    )
+
+    vector_store.delete_by_ids(doc_ids[:3])
+
+    assert count_points(vector_store) == 2